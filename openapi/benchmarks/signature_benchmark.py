@@ -0,0 +1,187 @@
+'''
+签名及请求构建的性能基准，使用本地MockTransport，无需访问api网关。
+
+    python -m openapi.benchmarks.signature_benchmark
+    python -m openapi.benchmarks.signature_benchmark --save baseline.json
+    python -m openapi.benchmarks.signature_benchmark --compare baseline.json --tolerance 0.2
+
+--compare时任一用例的ops/sec低于基准的(1 - tolerance)倍则以状态码1退出
+'''
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import httpx
+
+from typing import Callable, Dict, List, NamedTuple
+
+from openapi.sdk import OpenApiClient, ConnectionPool, RequestOption, SignedByHeader, SignedByQuery, Signer
+from openapi.sdk import StdJsonCodec
+from openapi.sdk.codec import default_codec
+from openapi.sdk import utility
+from openapi.sdk.utility import HttpMethod, SignatureOption, generate_signature, resolve_error
+
+BASE_URL = "http://gateway.mock"
+ACCESS_ID = "bench-access-id"
+SECRET_KEY = "bench-secret-key"
+
+ERROR_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Error>
+  <Code>SIGNATURE_NOT_MATCH</Code>
+  <Message>signature not match</Message>
+  <ClientIP>192.168.1.1</ClientIP>
+  <StringToSignBytes>47 45 54 0a 61 70 70 6c 69 63 61 74 69 6f 6e</StringToSignBytes>
+  <SignatureProvided>t2BY9A+qCgFX3mKX81QKnQKEs1E=</SignatureProvided>
+  <StringToSign>GET
+application/json; charset=UTF-8
+Thu, 01 Jan 2024 00:00:00 GMT
+/api/items?id=1</StringToSign>
+  <AccessKeyId>bench-access-id</AccessKeyId>
+</Error>"""
+
+
+class BenchResult(NamedTuple):
+    name: str
+    ops_per_sec: float
+    # 单次调用期间分配内存的峰值，单位字节
+    peak_bytes_per_call: float
+
+
+def _measure(name: str, func: Callable[[], object], duration: float) -> BenchResult:
+    # 预热，填充缓存
+    for _ in range(100):
+        func()
+
+    count = 0
+    batch = 100
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            func()
+        count += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            break
+    ops = count / elapsed
+
+    samples = 200
+    tracemalloc.start()
+    try:
+        peak_total = 0
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - current
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name, ops, peak_total / samples)
+
+
+def _large_query_url(count: int) -> str:
+    query = "&".join("param%03d=value%03d" % (i, i) for i in reversed(range(count)))
+    return BASE_URL + "/api/items?x-iwop-integration-id=1&" + query
+
+
+def _cases() -> Dict[str, Callable[[], object]]:
+    headers = httpx.Headers({
+        "x-iwop-integration-id": "10001",
+        "X-iwop-before": "wq666",
+        "Content-Type": "application/json; charset=UTF-8"
+    })
+    url = BASE_URL + "/api/items?integratedProjectId=10001&start=0&limit=20"
+    header_option = SignatureOption(ACCESS_ID, SECRET_KEY, url, HttpMethod.GET, "application/json", headers)
+    signer = Signer(ACCESS_ID, SECRET_KEY)
+    by_header = SignedByHeader()
+    by_query = SignedByQuery()
+
+    large_url = _large_query_url(200)
+    get_resource = vars(utility)["__get_resource"]
+    canonicalize = vars(utility)["__canonicalize"].__wrapped__
+
+    pool = ConnectionPool(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"data": []})))
+    client = OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool)
+    request_option = RequestOption.new_builder() \
+        .add_query({"integratedProjectId": "10001", "start": 0, "limit": 20}) \
+        .add_header({"x-iwop-integration-id": "10001"}) \
+        .build()
+
+    template = client.template(HttpMethod.GET, "/api/items/{id}", RequestOption.new_builder()
+                               .add_query({"integratedProjectId": "10001"})
+                               .add_header({"x-iwop-integration-id": "10001"})
+                               .build())
+
+    payload = json.dumps({"data": [{"id": i, "name": "item-%d" % i, "tags": ["a", "b"]} for i in range(200)]}).encode()
+    std_codec = StdJsonCodec()
+    presign_items = [(HttpMethod.GET, "/files/%d" % i, {"token": "t%d" % i}) for i in range(100)]
+    codec = default_codec()
+
+    def round_trip():
+        with client.get("/api/items", request_option) as result:
+            result.get_json_object()
+
+    return {
+        "generate_signature[header]": lambda: generate_signature(by_header, header_option, signer),
+        "generate_signature[query]": lambda: generate_signature(by_query, header_option, signer),
+        "get_resource[200 params, cached]": lambda: get_resource(large_url),
+        "get_resource[200 params, uncached]": lambda: canonicalize(large_url),
+        "create_request": lambda: client._create_request(HttpMethod.GET, "/api/items", request_option),
+        "create_request[template]": lambda: template._prepare({"id": 10001}, None, None, None)[2](None),
+        "with_query": lambda: request_option.with_query(start=20),
+        "request[mock transport]": round_trip,
+        "resolve_error": lambda: resolve_error(ERROR_XML).string_to_sign,
+        "presign[100 urls]": lambda: client.presign(presign_items, 600),
+        "json_decode[json]": lambda: std_codec.decode(payload),
+        "json_decode[%s]" % codec.name: lambda: codec.decode(payload),
+    }
+
+
+def run(duration: float, pattern: str = "") -> List[BenchResult]:
+    return [_measure(name, func, duration) for name, func in _cases().items() if pattern in name]
+
+
+def _print(results: List[BenchResult]):
+    print("%-40s %14s %16s" % ("case", "ops/sec", "peak B/call"))
+    for r in results:
+        print("%-40s %14.0f %16.0f" % (r.name, r.ops_per_sec, r.peak_bytes_per_call))
+
+
+def _compare(results: List[BenchResult], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    for r in results:
+        base = baseline.get(r.name)
+        if not base:
+            continue
+        ratio = r.ops_per_sec / base["ops_per_sec"]
+        if ratio < 1 - tolerance:
+            ok = False
+            print("REGRESSION %s: %.0f ops/sec, baseline %.0f (%.0f%%)" %
+                  (r.name, r.ops_per_sec, base["ops_per_sec"], ratio * 100))
+    return ok
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="openapi sdk signature benchmark")
+    parser.add_argument("--duration", type=float, default=1.0, help="每个用例的计时时长，单位秒")
+    parser.add_argument("-k", dest="pattern", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--save", help="将结果保存为json基准文件")
+    parser.add_argument("--compare", help="与json基准文件比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的ops/sec下降比例")
+    args = parser.parse_args(argv)
+
+    results = run(args.duration, args.pattern)
+    _print(results)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({r.name: r._asdict() for r in results}, f, indent=2)
+    if args.compare and not _compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,7 +1,24 @@
 from .open_api_client import OpenApiClient, AsyncOpenApiClient, RequestOption
 from .signed_by import SignedBy, SignatureMode, SignedByHeader, SignedByQuery, QuerySignatureParams
-from .error import ApiGatewayErrorData, OpenApiClientError, OpenApiResponseError
+from .error import ApiGatewayErrorData, OpenApiClientError, OpenApiResponseError, CircuitOpenError
 from .request_result import RequestResult, AsyncRequestResult
+from .pool import PoolOption, ConnectionPool, AsyncConnectionPool
+from .batch import BatchItem, BatchResult
+from .executor import RequestExecutor
+from .retry import RetryPolicy
+from .utility import Signer
+from .download import DownloadOption, DownloadResult
+from .content import FileContent
+from .hooks import RequestHooks, RequestInfo, LatencyAggregator, LatencyHistogram
+from .otel import OpenTelemetryHooks
+from .cache import ResponseCache, CacheBackend, MemoryCache, DiskCache
+from .ratelimit import RateLimit, RateLimiter
+from .circuit import CircuitBreaker, CircuitState
+from .paginate import PageStrategy, PageNumberStrategy, OffsetStrategy, CursorStrategy
+from .template import RequestTemplate, AsyncRequestTemplate
+from .codec import JsonCodec, StdJsonCodec, OrjsonCodec, MsgspecCodec
+from .compression import CompressionOption
+from .clock import SigningClock
 
 __all__ = [
     "OpenApiClient",
@@ -16,5 +33,42 @@ __all__ = [
     "OpenApiClientError",
     "OpenApiResponseError",
     "RequestResult",
-    "AsyncRequestResult"
+    "AsyncRequestResult",
+    "PoolOption",
+    "ConnectionPool",
+    "AsyncConnectionPool",
+    "BatchItem",
+    "BatchResult",
+    "RequestExecutor",
+    "RetryPolicy",
+    "Signer",
+    "DownloadOption",
+    "DownloadResult",
+    "FileContent",
+    "RequestHooks",
+    "RequestInfo",
+    "LatencyAggregator",
+    "LatencyHistogram",
+    "OpenTelemetryHooks",
+    "ResponseCache",
+    "CacheBackend",
+    "MemoryCache",
+    "DiskCache",
+    "RateLimit",
+    "RateLimiter",
+    "CircuitBreaker",
+    "CircuitState",
+    "CircuitOpenError",
+    "PageStrategy",
+    "PageNumberStrategy",
+    "OffsetStrategy",
+    "CursorStrategy",
+    "RequestTemplate",
+    "AsyncRequestTemplate",
+    "JsonCodec",
+    "StdJsonCodec",
+    "OrjsonCodec",
+    "MsgspecCodec",
+    "CompressionOption",
+    "SigningClock"
 ]
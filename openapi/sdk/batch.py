@@ -0,0 +1,110 @@
+import asyncio
+import httpx
+
+from collections import deque
+from typing import (NamedTuple, Optional, Union, Any, Iterable, Iterator, AsyncIterator, Callable,
+                    Awaitable, Deque, Tuple)
+
+from .error import OpenApiClientError, OpenApiResponseError, CircuitOpenError
+from .utility import HttpMethod
+
+# 批量请求中单个请求的错误，不会中断整个批次。熔断只影响对应的接口，其他接口的请求继续执行
+BATCH_ERRORS = (OpenApiResponseError, httpx.TransportError, CircuitOpenError)
+
+
+class BatchItem(NamedTuple):
+    method: HttpMethod
+    api_path: str
+    # RequestOption
+    option: Any
+
+
+BatchItemTypes = Union[BatchItem, Tuple[Union[HttpMethod, str], str, Any]]
+
+
+class BatchResult(NamedTuple):
+    # 请求在批次中的序号
+    index: int
+    item: BatchItem
+    # 请求成功时的结果，返回内容已读取到内存
+    result: Optional[Any]
+    # 请求失败时的异常
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def to_item(item: BatchItemTypes) -> BatchItem:
+    method, api_path, option = item
+    if not isinstance(method, HttpMethod):
+        method = HttpMethod[str(method).upper()]
+    return BatchItem(method, api_path, option)
+
+
+def enumerate_items(items: Iterable[BatchItemTypes]) -> Iterator[Tuple[int, BatchItem]]:
+    for index, item in enumerate(items):
+        yield index, to_item(item)
+
+
+def execute(send: Callable[[HttpMethod, str, Any], Any], index: int, item: BatchItem) -> BatchResult:
+    try:
+        result = send(item.method, item.api_path, item.option)
+        with result:
+            result.get_bytes()
+        return BatchResult(index, item, result, None)
+    except BATCH_ERRORS as e:
+        return BatchResult(index, item, None, e)
+
+
+async def _aexecute(send: Callable[[HttpMethod, str, Any], Awaitable[Any]],
+                    index: int, item: BatchItem) -> BatchResult:
+    try:
+        result = await send(item.method, item.api_path, item.option)
+        async with result:
+            await result.get_bytes()
+        return BatchResult(index, item, result, None)
+    except BATCH_ERRORS as e:
+        return BatchResult(index, item, None, e)
+
+
+async def run_batch(send: Callable[[HttpMethod, str, Any], Awaitable[Any]],
+                    items: Iterable[BatchItemTypes],
+                    concurrency: int, ordered: bool) -> AsyncIterator[BatchResult]:
+    '''
+    以最多concurrency个并发执行批量请求。每个请求都经过send完成签名和发送，
+    ordered为True时按提交顺序返回结果，否则按完成顺序返回结果
+    '''
+    if concurrency <= 0:
+        raise OpenApiClientError("concurrency必须大于0")
+
+    source = enumerate_items(items)
+    # 尚未返回给调用方的任务，数量不超过concurrency，形成背压
+    pending: Deque["asyncio.Task[BatchResult]"] = deque()
+
+    def fill():
+        while len(pending) < concurrency:
+            entry = next(source, None)
+            if entry is None:
+                return
+            task = asyncio.ensure_future(_aexecute(send, *entry))
+            pending.append(task)
+
+    try:
+        fill()
+        while pending:
+            if ordered:
+                task = pending.popleft()
+                await task
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                task = done.pop()
+                pending.remove(task)
+            fill()
+            yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import httpx
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple, Dict, Mapping, List, Iterator, AsyncIterator
+
+# 默认缓存时间，单位秒
+DEFAULT_TTL = 60.0
+# 内存缓存的默认最大条目数
+DEFAULT_MAX_ENTRIES = 256
+# 超过该长度的返回内容不缓存
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+_MAX_AGE = re.compile(r'max-age\s*=\s*(\d+)')
+# 带有这些头的请求由调用方自行处理缓存或只获取部分内容，不使用缓存
+_BYPASS_HEADERS = ("range", "if-none-match", "if-modified-since", "if-match", "if-unmodified-since")
+_STATUS_OK = 200
+
+
+class CacheEntry(NamedTuple):
+    status: int
+    headers: Tuple[Tuple[str, str], ...]
+    content: bytes
+    # 过期时间，time.time()的值
+    expires_at: float
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        '''
+        返回重新验证缓存时使用的条件请求头
+        '''
+        headers = httpx.Headers(list(self.headers))
+        validators = {}
+        if "etag" in headers:
+            validators["If-None-Match"] = headers["etag"]
+        if "last-modified" in headers:
+            validators["If-Modified-Since"] = headers["last-modified"]
+        return validators
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(self.status, headers=list(self.headers), content=self.content, request=request)
+
+
+def make_entry(status: int, headers: httpx.Headers, content: bytes, expires_at: float = 0.0) -> CacheEntry:
+    # 返回内容已经解压，不再保留编码相关的头
+    kept = tuple((name, value) for name, value in headers.multi_items()
+                 if name.lower() not in ("content-encoding", "content-length", "transfer-encoding"))
+    return CacheEntry(status, kept, content, expires_at)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    '''
+    先返回已经读取的原始数据块，再继续读取原来的response
+    '''
+    def __init__(self, chunks: List[bytes], rest: Iterator[bytes], response: httpx.Response):
+        self._chunks = chunks
+        self._rest = rest
+        self._response = response
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._chunks
+        yield from self._rest
+
+    def close(self):
+        self._response.close()
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: List[bytes], rest: AsyncIterator[bytes], response: httpx.Response):
+        self._chunks = chunks
+        self._rest = rest
+        self._response = response
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for chunk in self._chunks:
+            yield chunk
+        async for chunk in self._rest:
+            yield chunk
+
+    async def aclose(self):
+        await self._response.aclose()
+
+
+def _replay(response: httpx.Response, stream) -> httpx.Response:
+    return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                          request=response.request, extensions=response.extensions)
+
+
+def read_limited(response: httpx.Response, limit: int) -> Tuple[httpx.Response, bool]:
+    '''
+    最多读取limit字节的原始内容，返回可以从头读取的response以及内容是否在limit以内并且已经全部读取。
+    超出limit时停止读取，已读取的部分和剩余内容仍然可以继续以流的方式读取
+    '''
+    if response.is_stream_consumed:
+        return response, len(response.content) <= limit
+    chunks, size = [], 0
+    rest = response.iter_raw()
+    for chunk in rest:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return _replay(response, _ReplayStream(chunks, rest, response)), False
+    replay = _replay(response, _ReplayStream(chunks, iter(()), response))
+    replay.read()
+    return replay, True
+
+
+async def aread_limited(response: httpx.Response, limit: int) -> Tuple[httpx.Response, bool]:
+    if response.is_stream_consumed:
+        return response, len(response.content) <= limit
+    chunks, size = [], 0
+    rest = response.aiter_raw()
+    async for chunk in rest:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return _replay(response, _AsyncReplayStream(chunks, rest, response)), False
+    replay = _replay(response, _AsyncReplayStream(chunks, _empty(), response))
+    await replay.aread()
+    return replay, True
+
+
+async def _empty() -> AsyncIterator[bytes]:
+    return
+    yield
+
+
+class CacheBackend(ABC):
+    # 读写是否有磁盘IO，AsyncOpenApiClient会在线程中访问这类存储
+    blocking: bool = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, entry: CacheEntry):
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    '''
+    按最近使用顺序淘汰的内存缓存，线程安全
+    '''
+    _max_entries: int
+    _entries: "OrderedDict[str, CacheEntry]"
+    _lock: threading.Lock
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        assert max_entries > 0
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache(CacheBackend):
+    '''
+    保存在目录中的缓存，每个条目一个文件，可在多个进程之间共享
+    '''
+    blocking = True
+
+    _directory: str
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, hashlib.sha256(key.encode()).hexdigest() + ".cache")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._path(key), 'rb') as file:
+                meta = json.loads(file.readline())
+                content = file.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("key") != key:
+            return None
+        return CacheEntry(meta["status"], tuple(tuple(h) for h in meta["headers"]), content, meta["expires_at"])
+
+    def set(self, key: str, entry: CacheEntry):
+        meta = {"key": key, "status": entry.status, "headers": entry.headers, "expires_at": entry.expires_at}
+        fd, temp = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(json.dumps(meta, ensure_ascii=False).encode() + b"\n")
+                file.write(entry.content)
+            # 先写入临时文件再替换，其他进程不会读到写了一半的内容
+            os.replace(temp, self._path(key))
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self._directory):
+            if name.endswith(".cache"):
+                os.unlink(os.path.join(self._directory, name))
+
+
+class ResponseCache:
+    '''
+    GET请求的返回结果缓存。缓存有效期内直接返回缓存内容，不签名也不发送请求；
+    过期后如果有ETag或Last-Modified，使用条件请求重新验证，服务端返回304时继续使用缓存内容。
+    返回的Cache-Control中的no-store、no-cache和max-age优先于ttl
+    '''
+    _ttl: float
+    _backend: CacheBackend
+    _max_body_size: int
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 backend: Optional[CacheBackend] = None, max_body_size: int = DEFAULT_MAX_BODY_SIZE):
+        assert ttl >= 0
+        self._ttl = ttl
+        self._backend = backend or MemoryCache(max_entries)
+        self._max_body_size = max_body_size
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend
+
+    @property
+    def max_body_size(self) -> int:
+        return self._max_body_size
+
+    @staticmethod
+    def is_cacheable(headers: Mapping[str, str]) -> bool:
+        return not any(name.lower() in _BYPASS_HEADERS for name in headers)
+
+    def _get_ttl(self, headers: httpx.Headers) -> Optional[float]:
+        cache_control = headers.get("cache-control", "").lower()
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return 0.0
+        m = _MAX_AGE.search(cache_control)
+        return float(m.group(1)) if m else self._ttl
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        return self._backend.get(key)
+
+    def should_store(self, status: int, headers: httpx.Headers) -> bool:
+        '''
+        是否需要读取返回内容用于缓存。没有Content-Length时需要用read_limited读取，超出max_body_size后放弃缓存
+        '''
+        if status != _STATUS_OK or self._get_ttl(headers) is None:
+            return False
+        length = headers.get("content-length")
+        return length is None or int(length) <= self._max_body_size
+
+    def store(self, key: str, status: int, headers: httpx.Headers, content: bytes) -> Optional[CacheEntry]:
+        ttl = self._get_ttl(headers)
+        if ttl is None or len(content) > self._max_body_size:
+            return None
+        if ttl == 0 and "etag" not in headers and "last-modified" not in headers:
+            # 无法重新验证的内容缓存了也不会被使用
+            return None
+        entry = make_entry(status, headers, content, time.time() + ttl)
+        self._backend.set(key, entry)
+        return entry
+
+    def refresh(self, key: str, entry: CacheEntry, headers: httpx.Headers) -> CacheEntry:
+        '''
+        服务端返回304时用新的头更新缓存的有效期
+        '''
+        ttl = self._get_ttl(headers)
+        merged = httpx.Headers(list(entry.headers))
+        for name in ("etag", "last-modified", "cache-control", "expires", "date"):
+            if name in headers:
+                merged[name] = headers[name]
+        entry = entry._replace(headers=tuple(merged.multi_items()), expires_at=time.time() + (ttl or 0.0))
+        if ttl is None:
+            self._backend.delete(key)
+        else:
+            self._backend.set(key, entry)
+        return entry
+
+    def clear(self):
+        self._backend.clear()
@@ -0,0 +1,233 @@
+import itertools
+import threading
+import time
+import httpx
+
+from collections import deque, OrderedDict
+from enum import Enum
+from typing import Optional, Callable, Dict, List, Deque, Iterator
+
+from .error import CircuitOpenError
+from .utility import HttpMethod, template_path
+
+
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+CircuitListener = Callable[[str, CircuitState, CircuitState], None]
+CircuitKey = Callable[[HttpMethod, str], str]
+
+
+# 默认最多保留的熔断器数量
+DEFAULT_MAX_CIRCUITS = 1024
+
+
+def default_circuit_key(method: HttpMethod, api_path: str) -> str:
+    '''
+    method加上把id替换为{id}的路径，例如GET /items/{id}，同一个接口的不同id共用一个熔断器
+    '''
+    return method.value + " " + template_path(api_path)
+
+
+class _Circuit:
+    state: CircuitState
+    # 最近请求的结果，True表示失败
+    outcomes: Deque[bool]
+    failures: int
+    consecutive_failures: int
+    opened_at: float
+    probes: int
+    probe_successes: int
+    # 每次状态变化时更新，用于忽略状态变化之前放行的请求的结果
+    generation: int
+
+    def __init__(self, window_size: int, generation: int):
+        self.state = CircuitState.CLOSED
+        self.generation = generation
+        self.outcomes = deque(maxlen=window_size)
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+
+    def add(self, failed: bool):
+        if len(self.outcomes) == self.outcomes.maxlen and self.outcomes[0]:
+            self.failures -= 1
+        self.outcomes.append(failed)
+        if failed:
+            self.failures += 1
+            self.consecutive_failures += 1
+        else:
+            self.consecutive_failures = 0
+
+    def reset(self):
+        self.outcomes.clear()
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.probe_successes = 0
+
+
+class CircuitBreaker:
+    '''
+    按key(默认为default_circuit_key，即method+接口模板路径)统计请求结果的熔断器，可以在多个客户端之间共享。
+    连续失败consecutive_failures次，或最近window_size次请求中至少min_requests次且失败比例达到failure_ratio时打开，
+    打开期间请求直接抛出CircuitOpenError；reset_timeout秒后进入半开状态，最多允许half_open_probes个探测请求，
+    探测请求全部成功后关闭，任一失败则重新打开。网络错误和5xx状态码视为失败，4xx属于调用方的错误不计入失败。
+    路径中的id不是数字、uuid等形式时，需要通过key指定把路径映射为接口模板的函数；
+    最多保留max_circuits个熔断器，超出时淘汰最久未使用的
+    '''
+    _consecutive_failures: int
+    _failure_ratio: float
+    _window_size: int
+    _min_requests: int
+    _reset_timeout: float
+    _half_open_probes: int
+    _key: CircuitKey
+    _max_circuits: int
+    _circuits: "OrderedDict[str, _Circuit]"
+    _listeners: List[CircuitListener]
+    _lock: threading.Lock
+    _generations: Iterator[int]
+
+    def __init__(self, consecutive_failures: int = 5, failure_ratio: float = 0.5, window_size: int = 20,
+                 min_requests: int = 10, reset_timeout: float = 30.0, half_open_probes: int = 1,
+                 key: Optional[CircuitKey] = None, max_circuits: int = DEFAULT_MAX_CIRCUITS):
+        assert consecutive_failures > 0 and 0 < failure_ratio <= 1 and half_open_probes > 0 and max_circuits > 0
+        self._consecutive_failures = consecutive_failures
+        self._failure_ratio = failure_ratio
+        self._window_size = window_size
+        self._min_requests = min(min_requests, window_size)
+        self._reset_timeout = reset_timeout
+        self._half_open_probes = half_open_probes
+        self._key = key or default_circuit_key
+        self._max_circuits = max_circuits
+        self._circuits = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._generations = itertools.count()
+
+    def add_listener(self, listener: CircuitListener):
+        '''
+        添加状态变化的回调，参数为(key, 原状态, 新状态)，回调在持有锁时执行，不应阻塞
+        '''
+        self._listeners.append(listener)
+
+    def key(self, method: HttpMethod, api_path: str) -> str:
+        return self._key(method, api_path)
+
+    def state(self, key: str) -> CircuitState:
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                return CircuitState.CLOSED
+            self._check_timeout(key, circuit, time.monotonic())
+            return circuit.state
+
+    def states(self) -> Dict[str, CircuitState]:
+        now = time.monotonic()
+        with self._lock:
+            for key, circuit in self._circuits.items():
+                self._check_timeout(key, circuit, now)
+            return {key: circuit.state for key, circuit in self._circuits.items()}
+
+    def _transition(self, key: str, circuit: _Circuit, state: CircuitState, now: float):
+        old = circuit.state
+        circuit.state = state
+        circuit.generation = next(self._generations)
+        if state == CircuitState.OPEN:
+            circuit.opened_at = now
+        circuit.reset()
+        for listener in self._listeners:
+            listener(key, old, state)
+
+    def _check_timeout(self, key: str, circuit: _Circuit, now: float):
+        if circuit.state == CircuitState.OPEN and now - circuit.opened_at >= self._reset_timeout:
+            self._transition(key, circuit, CircuitState.HALF_OPEN, now)
+
+    def allow(self, key: str) -> int:
+        '''
+        检查是否允许发送请求，不允许时抛出CircuitOpenError。允许后必须调用record记录结果，
+        返回值作为record的generation参数，熔断器在请求期间改变了状态时忽略该请求的结果
+        '''
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                circuit = self._circuits[key] = _Circuit(self._window_size, next(self._generations))
+                while len(self._circuits) > self._max_circuits:
+                    self._circuits.popitem(last=False)
+            else:
+                self._circuits.move_to_end(key)
+            self._check_timeout(key, circuit, now)
+            if circuit.state == CircuitState.OPEN:
+                raise CircuitOpenError(key, self._reset_timeout - (now - circuit.opened_at))
+            if circuit.state == CircuitState.HALF_OPEN:
+                if circuit.probes >= self._half_open_probes:
+                    raise CircuitOpenError(key, 0.0)
+                circuit.probes += 1
+            return circuit.generation
+
+    def is_failure(self, status: Optional[int], error: Optional[BaseException]) -> bool:
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return status is not None and status >= 500
+
+    def record(self, key: str, status: Optional[int] = None, error: Optional[BaseException] = None,
+               generation: Optional[int] = None):
+        '''
+        记录请求结果。error不是网络错误时(例如任务被取消)只释放半开状态的探测名额。
+        generation为allow的返回值，与当前状态不一致时(例如关闭状态放行的请求在半开状态才结束)忽略结果
+        '''
+        failed = self.is_failure(status, error)
+        ignored = error is not None and not failed
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or (generation is not None and generation != circuit.generation):
+                # 请求期间已被淘汰，或者状态已经变化
+                return
+            if circuit.state == CircuitState.HALF_OPEN:
+                if ignored:
+                    circuit.probes = max(0, circuit.probes - 1)
+                elif failed:
+                    self._transition(key, circuit, CircuitState.OPEN, now)
+                else:
+                    circuit.probe_successes += 1
+                    if circuit.probe_successes >= self._half_open_probes:
+                        self._transition(key, circuit, CircuitState.CLOSED, now)
+                return
+            if ignored or circuit.state != CircuitState.CLOSED:
+                return
+            circuit.add(failed)
+            if failed and self._should_open(circuit):
+                self._transition(key, circuit, CircuitState.OPEN, now)
+
+    def _should_open(self, circuit: _Circuit) -> bool:
+        if circuit.consecutive_failures >= self._consecutive_failures:
+            return True
+        total = len(circuit.outcomes)
+        return total >= self._min_requests and circuit.failures / total >= self._failure_ratio
+
+    def reset(self, key: Optional[str] = None):
+        '''
+        把指定key或全部熔断器恢复为关闭状态
+        '''
+        now = time.monotonic()
+        with self._lock:
+            keys = list(self._circuits.keys()) if key is None else [key]
+            for k in keys:
+                circuit = self._circuits.get(k)
+                if circuit is None:
+                    continue
+                if circuit.state != CircuitState.CLOSED:
+                    self._transition(k, circuit, CircuitState.CLOSED, now)
+                else:
+                    circuit.reset()
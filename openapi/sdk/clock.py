@@ -0,0 +1,76 @@
+import time
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Optional, Tuple
+
+
+class SigningClock:
+    '''
+    签名使用的时钟，线程安全。Date头的RFC 1123格式按秒缓存，同一秒内的请求不再重复格式化。
+    skew为加到本机时间上的偏差(秒)；tolerance不为None时，根据网关返回的Date头与本机时间的差
+    超过tolerance秒时自动校正skew，避免本机时间不准导致签名过期。time_func用于测试时注入固定时间
+    '''
+    _time: Callable[[], float]
+    _skew: float
+    _tolerance: Optional[float]
+    # (秒, 格式化的Date)，整体替换，读取时不需要加锁
+    _date: Tuple[int, str]
+
+    def __init__(self, time_func: Optional[Callable[[], float]] = None, skew: float = 0.0,
+                 tolerance: Optional[float] = None):
+        assert tolerance is None or tolerance >= 1, "Date头只精确到秒"
+        self._time = time_func or time.time
+        self._skew = skew
+        self._tolerance = tolerance
+        self._date = (-1, "")
+
+    @property
+    def skew(self) -> float:
+        return self._skew
+
+    @property
+    def adjusting(self) -> bool:
+        '''
+        是否根据网关的Date头自动校正
+        '''
+        return self._tolerance is not None
+
+    def now(self) -> float:
+        return self._time() + self._skew
+
+    def timestamp(self) -> int:
+        '''
+        当前时间的整秒数，用于计算query签名的Expires
+        '''
+        return int(self.now())
+
+    def http_date(self) -> str:
+        '''
+        当前时间的RFC 1123格式，用于header签名的Date头
+        '''
+        second = int(self.now())
+        cached = self._date
+        if cached[0] == second:
+            return cached[1]
+        date = formatdate(second, usegmt=True)
+        self._date = (second, date)
+        return date
+
+    def observe(self, date: Optional[str]):
+        '''
+        用网关返回的Date头校正偏差，未启用自动校正、Date头缺失或格式错误时忽略
+        '''
+        if self._tolerance is None or not date:
+            return
+        try:
+            server = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            return
+        skew = server - self._time()
+        # Date头截断到秒，本机时间在同一秒内时差值在(-1, 0]之间
+        if abs(skew - self._skew) > self._tolerance:
+            self._skew = round(skew)
+
+
+# 未指定时钟时使用的默认时钟
+DEFAULT_CLOCK = SigningClock()
@@ -0,0 +1,176 @@
+import dataclasses
+import json
+import math
+import typing
+
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Type, TypeVar
+
+from .error import OpenApiClientError
+
+T = TypeVar("T")
+
+
+def _convert(value: Any, tp: Any) -> Any:
+    '''
+    把解析得到的dict/list转换为tp指定的类型，支持dataclass以及由它们组成的List、Dict、Optional
+    '''
+    if value is None or tp is Any:
+        return value
+    if dataclasses.is_dataclass(tp) and isinstance(value, dict):
+        hints = typing.get_type_hints(tp)
+        kwargs = {f.name: _convert(value[f.name], hints.get(f.name, Any))
+                  for f in dataclasses.fields(tp) if f.init and f.name in value}
+        return tp(**kwargs)
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    if origin in (list, typing.List) and isinstance(value, list):
+        return [_convert(item, args[0] if args else Any) for item in value]
+    if origin in (dict, typing.Dict) and isinstance(value, dict):
+        item_type = args[1] if len(args) == 2 else Any
+        return {name: _convert(item, item_type) for name, item in value.items()}
+    if origin is typing.Union:
+        for arg in args:
+            if arg is not type(None):
+                return _convert(value, arg)
+    return value
+
+
+def _has_non_finite(value: Any) -> bool:
+    '''
+    检查value中是否有nan、inf。orjson和msgspec会把它们序列化为null，标准库则抛出ValueError
+    '''
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_non_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_non_finite(item) for item in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return any(_has_non_finite(getattr(value, f.name)) for f in dataclasses.fields(value))
+    return False
+
+
+def _check_finite(data: bytes, value: Any):
+    # nan、inf序列化后一定是null，没有null时不需要检查
+    if b"null" in data and _has_non_finite(value):
+        raise ValueError("json不支持nan、inf等浮点数")
+
+
+class JsonCodec(ABC):
+    '''
+    请求内容的json序列化和返回内容的json解析
+    '''
+    name: str
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes, type: Optional[Type[T]] = None) -> Any:
+        '''
+        解析json内容，type不为None时转换为指定的类型(dataclass、msgspec.Struct等)
+        '''
+        pass
+
+
+class StdJsonCodec(JsonCodec):
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        # 与httpx的默认序列化方式一致
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+    def decode(self, data: bytes, type: Optional[Type[T]] = None) -> Any:
+        value = json.loads(data)
+        return value if type is None else _convert(value, type)
+
+
+class OrjsonCodec(StdJsonCodec):
+    '''
+    使用orjson序列化和解析。orjson不支持的内容(例如Decimal、非字符串的key、超出64位的整数)回退到标准库
+    '''
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            raise OpenApiClientError("使用OrjsonCodec需要安装orjson: pip install orjson")
+        self._orjson = orjson
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            data = self._orjson.dumps(value)
+        except TypeError:
+            return super().encode(value)
+        _check_finite(data, value)
+        return data
+
+    def decode(self, data: bytes, type: Optional[Type[T]] = None) -> Any:
+        try:
+            value = self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            # 超出64位的整数等orjson不支持的内容由标准库解析，内容错误时抛出标准库的异常
+            return super().decode(data, type)
+        return value if type is None else _convert(value, type)
+
+
+class MsgspecCodec(JsonCodec):
+    '''
+    使用msgspec序列化和解析。指定type时直接解析为msgspec.Struct、dataclass等类型，
+    不创建中间的dict。msgspec不支持的内容(例如超出64位的整数)回退到标准库
+    '''
+    name = "msgspec"
+
+    def __init__(self):
+        try:
+            import msgspec
+        except ImportError:
+            raise OpenApiClientError("使用MsgspecCodec需要安装msgspec: pip install msgspec")
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._typed = {}
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            data = self._encoder.encode(value)
+        except (TypeError, OverflowError):
+            # 超出64位的整数等msgspec不支持的内容由标准库序列化
+            return _STD.encode(value)
+        _check_finite(data, value)
+        return data
+
+    def decode(self, data: bytes, type: Optional[Type[T]] = None) -> Any:
+        if type is None:
+            try:
+                return self._decoder.decode(data)
+            except self._msgspec.DecodeError:
+                return _STD.decode(data)
+        decoder = self._typed.get(type)
+        if decoder is None:
+            decoder = self._typed[type] = self._msgspec.json.Decoder(type)
+        return decoder.decode(data)
+
+
+_STD = StdJsonCodec()
+_default: Optional[JsonCodec] = None
+
+
+def default_codec() -> JsonCodec:
+    '''
+    按msgspec、orjson、标准库json的顺序选择已安装的实现
+    '''
+    global _default
+    if _default is None:
+        for codec_type in (MsgspecCodec, OrjsonCodec):
+            try:
+                _default = codec_type()
+                break
+            except OpenApiClientError:
+                pass
+        else:
+            _default = StdJsonCodec()
+    return _default
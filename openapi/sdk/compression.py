@@ -0,0 +1,111 @@
+import gzip
+import zlib
+
+from typing import NamedTuple, Optional, Sequence, Tuple, Callable, Dict
+
+from .error import OpenApiClientError
+
+GZIP = "gzip"
+DEFLATE = "deflate"
+BROTLI = "br"
+ZSTD = "zstd"
+
+# 需要额外安装的压缩算法
+_PACKAGES = {BROTLI: "brotli", ZSTD: "zstandard"}
+
+
+def _has_brotli() -> bool:
+    for name in ("brotli", "brotlicffi"):
+        try:
+            __import__(name)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def _has_zstd() -> bool:
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def available_encodings() -> Tuple[str, ...]:
+    '''
+    当前环境支持解压的编码，按压缩率从高到低排列。br和zstd需要安装brotli、zstandard，httpx才能解压
+    '''
+    encodings = []
+    if _has_zstd():
+        encodings.append(ZSTD)
+    if _has_brotli():
+        encodings.append(BROTLI)
+    encodings.extend((GZIP, DEFLATE))
+    return tuple(encodings)
+
+
+def _compress_gzip(data: bytes, level: Optional[int]) -> bytes:
+    # mtime固定为0，相同内容的压缩结果相同
+    return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+
+
+def _compress_deflate(data: bytes, level: Optional[int]) -> bytes:
+    return zlib.compress(data, -1 if level is None else level)
+
+
+def _compress_brotli(data: bytes, level: Optional[int]) -> bytes:
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli
+    # 默认的quality 11太慢，不适合在请求时压缩
+    return brotli.compress(data, quality=5 if level is None else level)
+
+
+def _compress_zstd(data: bytes, level: Optional[int]) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+_COMPRESSORS: Dict[str, Callable[[bytes, Optional[int]], bytes]] = {
+    GZIP: _compress_gzip,
+    DEFLATE: _compress_deflate,
+    BROTLI: _compress_brotli,
+    ZSTD: _compress_zstd,
+}
+
+
+class CompressionOption(NamedTuple):
+    '''
+    压缩配置。accept为Accept-Encoding中声明接受的编码，按优先顺序排列，None表示当前环境支持的全部编码；
+    request_encoding不为None时，长度不小于min_size的请求内容(str、bytes和json)使用该编码压缩后发送
+    '''
+    accept: Optional[Sequence[str]] = None
+    request_encoding: Optional[str] = None
+    min_size: int = 1024
+    # 压缩级别，None表示各算法的默认级别
+    level: Optional[int] = None
+
+    def check(self):
+        available = available_encodings()
+        for encoding in tuple(self.accept or ()) + ((self.request_encoding,) if self.request_encoding else ()):
+            if encoding == "identity":
+                continue
+            if encoding not in _COMPRESSORS:
+                raise OpenApiClientError("不支持的压缩编码: " + encoding)
+            if encoding not in available:
+                raise OpenApiClientError("使用%s压缩需要安装%s: pip install %s" %
+                                         (encoding, _PACKAGES[encoding], _PACKAGES[encoding]))
+
+    def accept_encoding(self) -> str:
+        encodings = available_encodings() if self.accept is None else tuple(self.accept)
+        return ", ".join(encodings) if encodings else "identity"
+
+    def compress(self, data: bytes) -> Optional[bytes]:
+        '''
+        按request_encoding压缩请求内容，未启用或内容太短时返回None
+        '''
+        if self.request_encoding is None or len(data) < self.min_size:
+            return None
+        return _COMPRESSORS[self.request_encoding](data, self.level)
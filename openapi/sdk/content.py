@@ -0,0 +1,130 @@
+import asyncio
+import mmap
+import os
+
+from typing import Union, Optional, BinaryIO, Iterator, AsyncIterator
+
+from .error import OpenApiClientError
+
+# 读取文件时的默认块大小
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+FileSource = Union[str, "os.PathLike[str]", BinaryIO]
+
+
+def _has_fileno(file: BinaryIO) -> bool:
+    try:
+        file.fileno()
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+class FileContent:
+    '''
+    以文件为来源的请求内容，按块读取文件，不会把整个文件读入内存。
+    长度在发送前已知，请求会使用Content-Length而不是chunked编码；每次迭代都从头读取，因此可以用于重试。
+    use_mmap为True时通过内存映射读取文件
+    '''
+    _source: FileSource
+    _offset: int
+    _length: int
+    _chunk_size: int
+    _use_mmap: bool
+
+    def __init__(self, source: FileSource, chunk_size: int = DEFAULT_CHUNK_SIZE, use_mmap: bool = False,
+                 offset: int = 0, length: Optional[int] = None):
+        assert chunk_size > 0
+        if not isinstance(source, (str, os.PathLike)) and not source.seekable():
+            raise OpenApiClientError("文件对象必须支持seek")
+        self._source = source
+        self._offset = offset
+        self._chunk_size = chunk_size
+        self._use_mmap = use_mmap
+        if use_mmap and not isinstance(source, (str, os.PathLike)) and not _has_fileno(source):
+            raise OpenApiClientError("use_mmap为True时文件对象必须有fileno")
+
+        size = self._file_size()
+        if offset > size:
+            raise OpenApiClientError("offset超出文件长度")
+        self._length = size - offset if length is None else min(length, size - offset)
+
+    def _file_size(self) -> int:
+        if isinstance(self._source, (str, os.PathLike)):
+            return os.path.getsize(self._source)
+        # 不依赖fileno，io.BytesIO等内存中的文件对象也可以使用
+        position = self._source.tell()
+        try:
+            return self._source.seek(0, os.SEEK_END)
+        finally:
+            self._source.seek(position)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _open(self) -> BinaryIO:
+        if isinstance(self._source, (str, os.PathLike)):
+            return open(self._source, 'rb', buffering=0)
+        return self._source
+
+    def _close(self, file: BinaryIO):
+        if file is not self._source:
+            file.close()
+
+    def _iter_file(self, file: BinaryIO) -> Iterator[bytes]:
+        file.seek(self._offset)
+        remaining = self._length
+        while remaining > 0:
+            chunk = file.read(min(self._chunk_size, remaining))
+            if not chunk:
+                raise OpenApiClientError("文件长度在发送过程中发生了变化")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _iter_mmap(self, file: BinaryIO) -> Iterator[bytes]:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = self._offset + self._length
+            for start in range(self._offset, end, self._chunk_size):
+                yield mapped[start:min(start + self._chunk_size, end)]
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._length == 0:
+            return
+        file = self._open()
+        try:
+            if self._use_mmap:
+                yield from self._iter_mmap(file)
+            else:
+                yield from self._iter_file(file)
+        finally:
+            self._close(file)
+
+    def async_stream(self) -> "AsyncFileContent":
+        '''
+        返回供AsyncOpenApiClient使用的异步读取对象
+        '''
+        return AsyncFileContent(self)
+
+
+class AsyncFileContent:
+    '''
+    FileContent的异步版本，在线程中读取文件，避免阻塞事件循环
+    '''
+    _content: FileContent
+
+    def __init__(self, content: FileContent):
+        self._content = content
+
+    def __len__(self) -> int:
+        return len(self._content)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunks = iter(self._content)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            chunks.close()
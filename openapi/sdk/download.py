@@ -0,0 +1,291 @@
+import asyncio
+import os
+import re
+import httpx
+
+from typing import NamedTuple, Optional, Tuple, List, Callable, Awaitable, Any, BinaryIO
+
+from .error import OpenApiClientError, OpenApiResponseError
+
+# 默认的写入块大小
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# 并行下载时每个分段的最小长度
+MIN_PART_SIZE = 8 * 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+_STATUS_PARTIAL = 206
+_STATUS_RANGE_NOT_SATISFIABLE = 416
+# 未完成的下载在文件旁保存ETag或Last-Modified，续传时作为If-Range发送
+_VALIDATOR_SUFFIX = ".validator"
+# 并行下载时先写入的临时文件
+_PART_SUFFIX = ".part"
+
+
+class DownloadOption(NamedTuple):
+    # 每次写入文件的数据块大小
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    # 上次未完成的下载保存了validator时是否从已有长度处继续下载，否则重新下载
+    resume: bool = True
+    # 下载中断后自动续传的最大次数
+    max_resumes: int = 3
+    # 并行下载的分段数，大于1时使用多个Range请求同时下载
+    parallel: int = 1
+    # 是否校验下载的文件长度
+    verify_length: bool = True
+
+
+class DownloadResult(NamedTuple):
+    path: str
+    # 文件总长度
+    size: int
+    # 续传的次数，包括从已存在的文件处继续下载
+    resumes: int
+
+
+class RangeProgress:
+    position: int
+    end: Optional[int]
+    total: Optional[int]
+    resumes: int
+    # 已下载内容的ETag或Last-Modified，续传时作为If-Range发送
+    validator: Optional[str]
+
+    def __init__(self, position: int, end: Optional[int], validator: Optional[str] = None):
+        self.position = position
+        self.end = end
+        self.total = None
+        self.resumes = 0
+        self.validator = validator
+
+    @property
+    def finished(self) -> bool:
+        if self.end is not None:
+            return self.position > self.end
+        return self.total is not None and self.position >= self.total
+
+
+def parse_content_range(value: Optional[str]) -> Optional[Tuple[int, int, Optional[int]]]:
+    if not value:
+        return None
+    m = _CONTENT_RANGE.match(value)
+    if not m:
+        return None
+    total = None if m.group(3) == '*' else int(m.group(3))
+    return int(m.group(1)), int(m.group(2)), total
+
+
+def range_headers(start: int, end: Optional[int], validator: Optional[str] = None) -> dict:
+    '''
+    validator不为None时同时发送If-Range，服务端的内容已经变化时会返回完整的内容(200)
+    '''
+    if start == 0 and end is None:
+        # 不使用压缩，保证Range的偏移量与文件内容一致
+        return {'Accept-Encoding': 'identity'}
+    headers = {
+        'Range': 'bytes=%d-%s' % (start, '' if end is None else end),
+        'Accept-Encoding': 'identity'
+    }
+    if validator:
+        headers['If-Range'] = validator
+    return headers
+
+
+def get_validator(headers: httpx.Headers) -> Optional[str]:
+    '''
+    返回可以用于If-Range的ETag或Last-Modified，弱ETag不能用于If-Range
+    '''
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def load_validator(path: str) -> Optional[str]:
+    try:
+        with open(path + _VALIDATOR_SUFFIX, 'r', encoding='utf-8') as file:
+            return file.read().strip() or None
+    except OSError:
+        return None
+
+
+def save_validator(path: str, validator: Optional[str]):
+    '''
+    保存未完成下载的validator，validator为None时删除已保存的内容
+    '''
+    if validator is None:
+        try:
+            os.unlink(path + _VALIDATOR_SUFFIX)
+        except FileNotFoundError:
+            pass
+        return
+    with open(path + _VALIDATOR_SUFFIX, 'w', encoding='utf-8') as file:
+        file.write(validator)
+
+
+def split_ranges(total: int, parts: int) -> List[Tuple[int, int]]:
+    parts = max(1, min(parts, total // MIN_PART_SIZE))
+    size = total // parts
+    ranges = []
+    for i in range(parts):
+        start = i * size
+        end = total - 1 if i == parts - 1 else start + size - 1
+        ranges.append((start, end))
+    return ranges
+
+
+def probe_ranges(status: int, headers: httpx.Headers, parallel: int) -> Optional[List[Tuple[int, int]]]:
+    '''
+    根据bytes=0-0探测请求的响应计算并行下载的分段，服务端不支持Range或文件较小时返回None
+    '''
+    if status != _STATUS_PARTIAL:
+        return None
+    content_range = parse_content_range(headers.get('Content-Range'))
+    if content_range is None or content_range[2] is None:
+        return None
+    ranges = split_ranges(content_range[2], parallel)
+    return ranges if len(ranges) > 1 else None
+
+
+def _begin(progress: RangeProgress, status: int, headers: httpx.Headers, file: BinaryIO, restartable: bool):
+    '''
+    检查响应是否与请求的范围一致，服务端不支持Range时从头开始写入
+    '''
+    if status == _STATUS_PARTIAL:
+        content_range = parse_content_range(headers.get('Content-Range'))
+        if content_range is None or content_range[0] != progress.position:
+            raise OpenApiClientError("Content-Range与请求的范围不一致: " + str(headers.get('Content-Range')))
+        progress.total = content_range[2]
+        if progress.validator is None:
+            progress.validator = get_validator(headers)
+        return
+
+    if progress.position > 0 or progress.end is not None:
+        # 服务端不支持Range，或者If-Range与服务端的内容不一致
+        if not restartable:
+            if progress.validator:
+                raise OpenApiClientError("服务端的内容已经变化，无法继续分段下载")
+            raise OpenApiClientError("服务端不支持Range请求，无法分段下载")
+        file.seek(0)
+        file.truncate()
+        progress.position = 0
+    progress.validator = get_validator(headers)
+    length = headers.get('Content-Length')
+    progress.total = int(length) if length is not None else None
+
+
+def _check_length(progress: RangeProgress):
+    if progress.total is not None and progress.position != progress.total:
+        raise OpenApiClientError("下载的文件长度(%d)与服务端返回的长度(%d)不一致" % (progress.position, progress.total))
+
+
+def download_range(send: Callable[[dict], Any], file: BinaryIO, progress: RangeProgress,
+                   option: DownloadOption, restartable: bool, state_path: Optional[str] = None):
+    '''
+    下载[progress.position, progress.end]范围的内容写入file的对应位置，网络中断时从中断处续传。
+    state_path不为None时把validator保存在state_path旁，下次运行时可以用If-Range续传
+    '''
+    while not progress.finished:
+        file.seek(progress.position)
+        try:
+            with send(range_headers(progress.position, progress.end, progress.validator)) as result:
+                validator = progress.validator
+                _begin(progress, result.status, result.headers, file, restartable)
+                if state_path is not None and progress.validator != validator:
+                    save_validator(state_path, progress.validator)
+                for chunk in result.open_stream(option.chunk_size):
+                    file.write(chunk)
+                    progress.position += len(chunk)
+            if progress.total is None and progress.end is None:
+                # 未知长度时以连接正常结束作为完成
+                return
+            if not progress.finished:
+                raise httpx.RemoteProtocolError("下载的内容不完整")
+        except OpenApiResponseError as e:
+            if e.status == _STATUS_RANGE_NOT_SATISFIABLE and progress.end is None and progress.position > 0 \
+                    and progress.validator:
+                # If-Range匹配说明服务端的内容没有变化，已存在的文件已经完整
+                return
+            raise
+        except httpx.TransportError:
+            if progress.resumes >= option.max_resumes:
+                raise
+            progress.resumes += 1
+
+
+async def adownload_range(send: Callable[[dict], Awaitable[Any]], file: BinaryIO, progress: RangeProgress,
+                          option: DownloadOption, restartable: bool, state_path: Optional[str] = None):
+    while not progress.finished:
+        file.seek(progress.position)
+        try:
+            async with await send(range_headers(progress.position, progress.end, progress.validator)) as result:
+                validator = progress.validator
+                _begin(progress, result.status, result.headers, file, restartable)
+                if state_path is not None and progress.validator != validator:
+                    save_validator(state_path, progress.validator)
+                async for chunk in await result.open_stream(option.chunk_size):
+                    # 在线程中写文件，避免阻塞事件循环
+                    await asyncio.to_thread(file.write, chunk)
+                    progress.position += len(chunk)
+            if progress.total is None and progress.end is None:
+                return
+            if not progress.finished:
+                raise httpx.RemoteProtocolError("下载的内容不完整")
+        except OpenApiResponseError as e:
+            if e.status == _STATUS_RANGE_NOT_SATISFIABLE and progress.end is None and progress.position > 0 \
+                    and progress.validator:
+                return
+            raise
+        except httpx.TransportError:
+            if progress.resumes >= option.max_resumes:
+                raise
+            progress.resumes += 1
+
+
+def resume_state(path: str, option: DownloadOption) -> Tuple[int, Optional[str]]:
+    '''
+    返回(续传的位置, validator)。只有上次未完成的下载保存了validator时才续传，
+    无法确认已有内容与服务端一致时重新下载
+    '''
+    if option.resume and os.path.exists(path):
+        validator = load_validator(path)
+        if validator is not None:
+            return os.path.getsize(path), validator
+    return 0, None
+
+
+def open_target(path: str, offset: int, option: DownloadOption) -> BinaryIO:
+    return open(path, 'r+b' if offset > 0 else 'wb', buffering=option.chunk_size)
+
+
+def create_part_file(path: str, size: int) -> str:
+    '''
+    创建并行下载使用的临时文件，全部分段下载完成并校验后才替换path，失败时不会留下有空洞的文件
+    '''
+    part_path = path + _PART_SUFFIX
+    with open(part_path, 'wb') as file:
+        file.truncate(size)
+    return part_path
+
+
+def remove_part_file(part_path: str):
+    try:
+        os.unlink(part_path)
+    except FileNotFoundError:
+        pass
+
+
+def finish(path: str, progresses: List[RangeProgress], option: DownloadOption, initial_resume: bool,
+           part_path: Optional[str] = None) -> DownloadResult:
+    if option.verify_length:
+        for progress in progresses:
+            if progress.end is not None:
+                if progress.position != progress.end + 1:
+                    raise OpenApiClientError("分段下载的长度不完整")
+            else:
+                _check_length(progress)
+    if part_path is not None:
+        os.replace(part_path, path)
+    # 下载完成，不再需要续传
+    save_validator(path, None)
+    resumes = sum(p.resumes for p in progresses) + (1 if initial_resume else 0)
+    return DownloadResult(path, os.path.getsize(path), resumes)
@@ -1,9 +1,14 @@
 import json
 
-from typing import Optional
+from typing import Optional, Mapping, Dict, Union
+
+from .error_decoder import decode_error
 
 
 class ApiGatewayErrorData(object):
+    '''
+    api网关返回的错误信息。通过from_content创建时，在第一次访问属性时才解析返回内容
+    '''
     PROP_CODE = "Code"
     PROP_MESSAGE = "Message"
     PROP_CLIENT_IP = "ClientIP"
@@ -12,44 +17,112 @@ class ApiGatewayErrorData(object):
     PROP_STRING_TO_SIGN = "StringToSign"
     PROP_ACCESS_KEY_ID = "AccessKeyId"
 
-    _map: dict
-
-    def __init__(self, map: dict):
-        self._map = map
+    # 属性名到slot的映射
+    _SLOTS = {
+        PROP_CODE: "_code",
+        PROP_MESSAGE: "_message",
+        PROP_CLIENT_IP: "_client_ip",
+        PROP_STRING_TO_SIGN_BYTES: "_string_to_sign_bytes",
+        PROP_SIGNATURE_PROVIDED: "_signature_provided",
+        PROP_STRING_TO_SIGN: "_string_to_sign",
+        PROP_ACCESS_KEY_ID: "_access_key_id",
+    }
+
+    __slots__ = ("_code", "_message", "_client_ip", "_string_to_sign_bytes", "_signature_provided",
+                 "_string_to_sign", "_access_key_id", "_extra", "_content", "_encoding")
+
+    _code: Optional[str]
+    _message: Optional[str]
+    _client_ip: Optional[str]
+    _string_to_sign_bytes: Optional[str]
+    _signature_provided: Optional[str]
+    _string_to_sign: Optional[str]
+    _access_key_id: Optional[str]
+    # 其他属性
+    _extra: Dict[str, Optional[str]]
+    # 尚未解析的返回内容
+    _content: Union[str, bytes, None]
+    _encoding: Optional[str]
+
+    def __init__(self, map: Optional[Mapping[str, Optional[str]]] = None):
+        self._content = None
+        self._encoding = None
+        self._set(map or {})
+
+    @staticmethod
+    def from_content(content: Union[str, bytes], encoding: Optional[str] = None) -> "ApiGatewayErrorData":
+        error = ApiGatewayErrorData.__new__(ApiGatewayErrorData)
+        error._content = content
+        error._encoding = encoding
+        return error
+
+    def _set(self, map: Mapping[str, Optional[str]]):
+        for slot in ApiGatewayErrorData._SLOTS.values():
+            setattr(self, slot, None)
+        self._extra = {}
+        for name, value in map.items():
+            slot = ApiGatewayErrorData._SLOTS.get(name)
+            if slot is None:
+                self._extra[name] = value
+            else:
+                setattr(self, slot, value)
+
+    def _load(self):
+        if self._content is not None:
+            self._set(decode_error(self._content, self._encoding))
+            self._content = None
 
     @property
-    def code(self) -> str:
-        return self._map[ApiGatewayErrorData.PROP_CODE]
+    def code(self) -> Optional[str]:
+        self._load()
+        return self._code
 
     @property
-    def message(self) -> str:
-        return self._map[ApiGatewayErrorData.PROP_MESSAGE]
+    def message(self) -> Optional[str]:
+        self._load()
+        return self._message
 
     @property
-    def client_ip(self) -> str:
-        return self._map[ApiGatewayErrorData.PROP_CLIENT_IP]
+    def client_ip(self) -> Optional[str]:
+        self._load()
+        return self._client_ip
 
     @property
     def string_to_sign_bytes(self) -> Optional[str]:
-        return self._map[ApiGatewayErrorData.PROP_STRING_TO_SIGN_BYTES]
+        self._load()
+        return self._string_to_sign_bytes
 
     @property
     def signature_provided(self) -> Optional[str]:
-        return self._map[ApiGatewayErrorData.PROP_SIGNATURE_PROVIDED]
+        self._load()
+        return self._signature_provided
 
     @property
     def string_to_sign(self) -> Optional[str]:
-        return self._map[ApiGatewayErrorData.PROP_STRING_TO_SIGN]
+        self._load()
+        return self._string_to_sign
 
     @property
     def access_key_id(self) -> Optional[str]:
-        return self._map[ApiGatewayErrorData.PROP_ACCESS_KEY_ID]
+        self._load()
+        return self._access_key_id
 
     def get_property(self, name: str) -> Optional[str]:
-        return self._map[name]
+        self._load()
+        slot = ApiGatewayErrorData._SLOTS.get(name)
+        if slot is None:
+            return self._extra.get(name)
+        return getattr(self, slot)
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        self._load()
+        values = {name: getattr(self, slot) for name, slot in ApiGatewayErrorData._SLOTS.items()}
+        values = {name: value for name, value in values.items() if value is not None}
+        values.update(self._extra)
+        return values
 
     def __str__(self) -> str:
-        return json.dumps(self._map, ensure_ascii=False)
+        return json.dumps(self.to_dict(), ensure_ascii=False)
 
 
 class OpenApiClientError(RuntimeError):
@@ -57,14 +130,49 @@ class OpenApiClientError(RuntimeError):
         super().__init__(message)
 
 
+class CircuitOpenError(OpenApiClientError):
+    '''
+    熔断器处于打开状态，请求没有发送
+    '''
+    _key: str
+    _retry_after: float
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__("熔断器已打开，请求未发送: " + key)
+        self._key = key
+        self._retry_after = retry_after
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def retry_after(self) -> float:
+        '''
+        距离熔断器进入半开状态的时间，单位秒
+        '''
+        return self._retry_after
+
+
 class OpenApiResponseError(RuntimeError):
     _error: ApiGatewayErrorData
     _status: int
+    _attempts: int
 
-    def __init__(self, message: str, status: int, error: ApiGatewayErrorData):
-        super().__init__(message)
+    def __init__(self, message: Optional[str], status: int, error: ApiGatewayErrorData, attempts: int = 1):
+        if message is None:
+            super().__init__()
+        else:
+            super().__init__(message)
         self._error = error
         self._status = status
+        self._attempts = attempts
+
+    def __str__(self) -> str:
+        if self.args:
+            return super().__str__()
+        # message为None时在需要时才解析返回内容获取错误信息
+        return self._error.message or "请求失败，状态码: %d" % self._status
 
     @property
     def error(self) -> ApiGatewayErrorData:
@@ -73,3 +181,10 @@ class OpenApiResponseError(RuntimeError):
     @property
     def status(self) -> int:
         return self._status
+
+    @property
+    def attempts(self) -> int:
+        '''
+        请求的尝试次数，包含重试
+        '''
+        return self._attempts
@@ -0,0 +1,127 @@
+import html
+import json
+import re
+import xml.etree.ElementTree as ET
+import httpx
+
+from typing import Dict, Optional, Union
+
+# 错误返回内容最多读取的字节数，超出部分直接丢弃
+MAX_ERROR_BODY = 64 * 1024
+# 无法识别格式时作为Message保留的最大字符数
+_MAX_TEXT_MESSAGE = 512
+
+# 只包含文本的元素: <Code>xxx</Code>或<Code/>，根元素<Error>不会匹配
+_ELEMENT = re.compile(r"<([A-Za-z_][\w.\-]*)\s*(?:/>|>([^<]*)</\1\s*>)")
+# 这些结构需要完整的xml解析
+_COMPLEX_XML = ("<![CDATA[", "<!--", "<!DOCTYPE")
+
+_PROPS = ("Code", "Message", "ClientIP", "StringToSignBytes", "SignatureProvided", "StringToSign", "AccessKeyId")
+_JSON_PROPS = {name.lower(): name for name in _PROPS}
+
+ErrorFields = Dict[str, Optional[str]]
+
+
+def _decode_xml(text: str) -> ErrorFields:
+    fields: ErrorFields = {}
+    if not any(marker in text for marker in _COMPLEX_XML):
+        for m in _ELEMENT.finditer(text):
+            value = m.group(2)
+            if value and "&" in value:
+                value = html.unescape(value)
+            fields[m.group(1)] = value or None
+        if fields:
+            return fields
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError:
+        return fields
+    for item in root.iter():
+        if item is not root:
+            fields[item.tag] = item.text
+    return fields
+
+
+def _decode_json(text: str) -> ErrorFields:
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return {}
+    if isinstance(value, dict) and len(value) == 1:
+        # {"error": {...}}形式
+        nested = next(iter(value.values()))
+        if isinstance(nested, dict):
+            value = nested
+    if not isinstance(value, dict):
+        return {}
+    fields: ErrorFields = {}
+    for name, item in value.items():
+        if isinstance(item, (dict, list)):
+            continue
+        fields[_JSON_PROPS.get(name.lower(), name)] = None if item is None else str(item)
+    return fields
+
+
+def decode_error(data: Union[str, bytes], encoding: Optional[str] = None) -> ErrorFields:
+    '''
+    解析xml或json格式的网关错误内容，返回属性名到值的映射。其他格式的内容作为Message，空内容返回空映射。
+    只解析前MAX_ERROR_BODY字节，截断的xml仍然可以取到截断位置之前的属性
+    '''
+    if isinstance(data, bytes):
+        try:
+            text = data[:MAX_ERROR_BODY].decode(encoding or 'utf-8', errors='replace')
+        except LookupError:
+            # 未知的charset
+            text = data[:MAX_ERROR_BODY].decode('utf-8', errors='replace')
+    else:
+        text = data[:MAX_ERROR_BODY]
+    text = text.strip()
+    if not text:
+        return {}
+    if text[0] == "<":
+        return _decode_xml(text)
+    if text[0] in "{[":
+        fields = _decode_json(text)
+        if fields:
+            return fields
+    return {"Message": text[:_MAX_TEXT_MESSAGE]}
+
+
+def _read_content(response: httpx.Response) -> bytes:
+    try:
+        return response.content[:MAX_ERROR_BODY]
+    except httpx.ResponseNotRead:
+        return b""
+
+
+def read_error_body(response: httpx.Response) -> bytes:
+    '''
+    读取错误返回的内容，最多MAX_ERROR_BODY字节，读取后关闭response
+    '''
+    if response.is_stream_consumed:
+        return _read_content(response)
+    chunks, size = [], 0
+    try:
+        for chunk in response.iter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_ERROR_BODY:
+                break
+    finally:
+        response.close()
+    return b"".join(chunks)[:MAX_ERROR_BODY]
+
+
+async def aread_error_body(response: httpx.Response) -> bytes:
+    if response.is_stream_consumed:
+        return _read_content(response)
+    chunks, size = [], 0
+    try:
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_ERROR_BODY:
+                break
+    finally:
+        await response.aclose()
+    return b"".join(chunks)[:MAX_ERROR_BODY]
@@ -0,0 +1,93 @@
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Iterable, Iterator, Deque
+
+from .error import OpenApiClientError
+from .utility import HttpMethod
+from .batch import BatchItemTypes, BatchResult, enumerate_items, execute, to_item
+from .open_api_client import OpenApiClient, RequestOption
+from .request_result import RequestResult
+
+
+class RequestExecutor:
+    '''
+    在线程池中并发执行OpenApiClient的请求，所有线程共享OpenApiClient的连接池。
+    连接池的max_connections应不小于max_workers，否则多出的线程会等待空闲连接
+    '''
+    _client: OpenApiClient
+    _pool: ThreadPoolExecutor
+    _max_pending: int
+    _slots: threading.BoundedSemaphore
+
+    def __init__(self, client: OpenApiClient, max_workers: int = 10, max_pending: Optional[int] = None):
+        if max_workers <= 0:
+            raise OpenApiClientError("max_workers必须大于0")
+        self._client = client
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="openapi")
+        # 已提交但未完成的请求数上限，超过时submit会阻塞
+        self._max_pending = max_pending or max_workers * 2
+        self._slots = threading.BoundedSemaphore(self._max_pending)
+
+    def __enter__(self) -> "RequestExecutor":
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    def close(self, cancel_pending: bool = True):
+        '''
+        关闭线程池，cancel_pending为True时取消尚未开始执行的请求
+        '''
+        self._pool.shutdown(wait=True, cancel_futures=cancel_pending)
+
+    def _fetch(self, method: HttpMethod, api_path: str, option: RequestOption) -> RequestResult:
+        result = self._client.request(method, api_path, option)
+        with result:
+            result.get_bytes()
+        return result
+
+    def submit(self, method: HttpMethod, api_path: str, option: RequestOption) -> "Future[RequestResult]":
+        '''
+        提交一个请求，返回内容在工作线程中读取到内存。待处理请求达到上限时阻塞
+        '''
+        item = to_item((method, api_path, option))
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._fetch, *item)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def map(self, items: Iterable[BatchItemTypes], ordered: bool = True) -> Iterator[BatchResult]:
+        '''
+        并发执行(method, api_path, RequestOption)请求，ordered为True时按提交顺序返回结果，否则按完成顺序返回。
+        单个请求的OpenApiResponseError或网络错误记录在BatchResult.error中，不会中断其余请求
+        '''
+        source = enumerate_items(items)
+        pending: Deque["Future[BatchResult]"] = deque()
+
+        def fill():
+            while len(pending) < self._max_pending:
+                entry = next(source, None)
+                if entry is None:
+                    return
+                pending.append(self._pool.submit(execute, self._client.request, *entry))
+
+        try:
+            fill()
+            while pending:
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+                fill()
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,340 @@
+import bisect
+import threading
+import time
+import httpx
+
+from typing import Optional, Dict, List, Tuple, Sequence, Any, Iterator, AsyncIterator, NamedTuple
+
+
+class RequestInfo:
+    '''
+    单次请求(每次重试都是一次独立的请求)的信息，时间均为time.monotonic()的值，单位秒。
+    timings中还包含httpcore的trace事件，例如'connection.connect_tcp.complete'、'connection.start_tls.complete'
+    '''
+    EVENT_START = "start"
+    EVENT_SIGNED = "signed"
+    EVENT_REQUEST_SENT = "request_sent"
+    EVENT_RESPONSE_HEADERS = "response_headers"
+    EVENT_BODY_COMPLETE = "body_complete"
+    EVENT_ERROR = "error"
+
+    method: str
+    api_path: str
+    attempt: int
+    request: Optional[httpx.Request]
+    status: Optional[int]
+    error: Optional[BaseException]
+    bytes_sent: Optional[int]
+    bytes_received: int
+    timings: Dict[str, float]
+    # 供hooks保存自定义数据，例如tracing的span
+    context: Dict[str, Any]
+
+    def __init__(self, method: str, api_path: str, attempt: int):
+        self.method = method
+        self.api_path = api_path
+        self.attempt = attempt
+        self.request = None
+        self.status = None
+        self.error = None
+        self.bytes_sent = None
+        self.bytes_received = 0
+        self.timings = {RequestInfo.EVENT_START: time.monotonic()}
+        self.context = {}
+
+    def elapsed(self, end: str, start: str = EVENT_START) -> Optional[float]:
+        '''
+        返回两个事件之间的时间，任一事件未发生时返回None
+        '''
+        if end not in self.timings or start not in self.timings:
+            return None
+        return self.timings[end] - self.timings[start]
+
+
+class RequestHooks:
+    '''
+    请求各阶段的回调，默认实现不做任何处理。回调中抛出的异常会中断请求，实现时应避免抛出异常
+    '''
+    def before_sign(self, info: RequestInfo):
+        pass
+
+    def after_sign(self, info: RequestInfo):
+        pass
+
+    def request_sent(self, info: RequestInfo):
+        pass
+
+    def response_headers(self, info: RequestInfo):
+        pass
+
+    def body_complete(self, info: RequestInfo):
+        pass
+
+    def error(self, info: RequestInfo):
+        pass
+
+
+class RequestTrace:
+    '''
+    把一次请求的各阶段事件分发给hooks
+    '''
+    _hooks: Sequence[RequestHooks]
+    _is_async: bool
+    _finished: bool
+    # 网关返回错误时，由客户端解析错误后再触发body_complete或error
+    _deferred: bool
+    info: RequestInfo
+
+    def __init__(self, hooks: Sequence[RequestHooks], info: RequestInfo, is_async: bool):
+        self._hooks = hooks
+        self._is_async = is_async
+        self._finished = False
+        self._deferred = False
+        self.info = info
+
+    def _emit(self, event: str):
+        self.info.timings[event] = time.monotonic()
+        for hook in self._hooks:
+            getattr(hook, event)(self.info)
+
+    def before_sign(self, request: httpx.Request):
+        self.info.request = request
+        length = request.headers.get("Content-Length")
+        self.info.bytes_sent = int(length) if length is not None else None
+        for hook in self._hooks:
+            hook.before_sign(self.info)
+
+    def after_sign(self, request: httpx.Request):
+        self.info.timings[RequestInfo.EVENT_SIGNED] = time.monotonic()
+        for hook in self._hooks:
+            hook.after_sign(self.info)
+        request.extensions["trace"] = self._async_trace if self._is_async else self._trace
+
+    def _on_trace(self, name: str):
+        self.info.timings[name] = time.monotonic()
+        if name.endswith("send_request_body.complete"):
+            self._emit(RequestInfo.EVENT_REQUEST_SENT)
+
+    def _trace(self, name: str, _: Dict[str, Any]):
+        self._on_trace(name)
+
+    async def _async_trace(self, name: str, _: Dict[str, Any]):
+        self._on_trace(name)
+
+    def response_headers(self, response: httpx.Response):
+        '''
+        收到响应头，之后读取返回内容时统计字节数并在读取完毕时触发body_complete
+        '''
+        if RequestInfo.EVENT_REQUEST_SENT not in self.info.timings:
+            # transport没有提供trace事件时，以收到响应作为请求已发送
+            self._emit(RequestInfo.EVENT_REQUEST_SENT)
+        self.info.status = response.status_code
+        self._deferred = response.is_error
+        self._emit(RequestInfo.EVENT_RESPONSE_HEADERS)
+        if response.is_stream_consumed:
+            # transport已经把返回内容读入内存
+            self.info.bytes_received = len(response.content)
+            self._body_read()
+        elif isinstance(response.stream, httpx.AsyncByteStream) and self._is_async:
+            response.stream = _AsyncCountingStream(response.stream, self)
+        elif isinstance(response.stream, httpx.SyncByteStream):
+            response.stream = _CountingStream(response.stream, self)
+
+    def _body_read(self):
+        if not self._deferred:
+            self.body_complete()
+
+    def body_complete(self):
+        '''
+        触发body_complete，每次请求只会触发body_complete或error中的一个
+        '''
+        if not self._finished:
+            self._finished = True
+            self._emit(RequestInfo.EVENT_BODY_COMPLETE)
+
+    def fail(self, error: BaseException):
+        '''
+        触发error，每次请求只会触发body_complete或error中的一个
+        '''
+        if not self._finished:
+            self._finished = True
+            self.info.error = error
+            self._emit(RequestInfo.EVENT_ERROR)
+
+
+class _CountingStream(httpx.SyncByteStream):
+    _stream: httpx.SyncByteStream
+    _trace: RequestTrace
+
+    def __init__(self, stream: httpx.SyncByteStream, trace: RequestTrace):
+        self._stream = stream
+        self._trace = trace
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for chunk in self._stream:
+                self._trace.info.bytes_received += len(chunk)
+                yield chunk
+        except Exception as e:
+            self._trace.fail(e)
+            raise
+        self._trace._body_read()
+
+    def close(self):
+        self._stream.close()
+        self._trace._body_read()
+
+
+class _AsyncCountingStream(httpx.AsyncByteStream):
+    _stream: httpx.AsyncByteStream
+    _trace: RequestTrace
+
+    def __init__(self, stream: httpx.AsyncByteStream, trace: RequestTrace):
+        self._stream = stream
+        self._trace = trace
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                self._trace.info.bytes_received += len(chunk)
+                yield chunk
+        except Exception as e:
+            self._trace.fail(e)
+            raise
+        self._trace._body_read()
+
+    async def aclose(self):
+        await self._stream.aclose()
+        self._trace._body_read()
+
+
+class HookDispatcher:
+    _hooks: Tuple[RequestHooks, ...]
+
+    def __init__(self, hooks: Sequence[RequestHooks]):
+        self._hooks = tuple(hooks)
+
+    def __bool__(self) -> bool:
+        return len(self._hooks) > 0
+
+    def begin(self, method: Any, api_path: str, attempt: int, is_async: bool) -> Optional[RequestTrace]:
+        if not self._hooks:
+            return None
+        return RequestTrace(self._hooks, RequestInfo(str(method), api_path, attempt), is_async)
+
+
+class LatencyHistogram(NamedTuple):
+    # 各区间的上限，单位秒，最后一个为inf
+    bounds: Tuple[float, ...]
+    counts: Tuple[int, ...]
+    count: int
+    total: float
+    min: float
+    max: float
+    errors: int
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        '''
+        返回近似的百分位数(区间上限)，p取值0~100
+        '''
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _Histogram:
+    bounds: Tuple[float, ...]
+    counts: List[int]
+    count: int
+    total: float
+    min: float
+    max: float
+    errors: int
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.errors = 0
+
+    def add(self, value: float, is_error: bool):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if is_error:
+            self.errors += 1
+
+    def snapshot(self) -> LatencyHistogram:
+        return LatencyHistogram(self.bounds, tuple(self.counts), self.count, self.total,
+                                self.min if self.count else 0.0, self.max, self.errors)
+
+
+class LatencyAggregator(RequestHooks):
+    '''
+    按(method, api_path)统计请求延迟的直方图。
+    total为开始签名到读取完返回内容(或出错)的时间，ttfb为开始签名到收到响应头的时间
+    '''
+    DEFAULT_BOUNDS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+    _bounds: Tuple[float, ...]
+    _lock: threading.Lock
+    _total: Dict[Tuple[str, str], _Histogram]
+    _ttfb: Dict[Tuple[str, str], _Histogram]
+
+    def __init__(self, bounds: Optional[Sequence[float]] = None):
+        bounds = tuple(sorted(bounds)) if bounds else LatencyAggregator.DEFAULT_BOUNDS
+        if bounds[-1] != float("inf"):
+            bounds = bounds + (float("inf"),)
+        self._bounds = bounds
+        self._lock = threading.Lock()
+        self._total = {}
+        self._ttfb = {}
+
+    def _add(self, histograms: Dict[Tuple[str, str], _Histogram], info: RequestInfo, value: float, is_error: bool):
+        key = (info.method, info.api_path)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(self._bounds)
+        histogram.add(value, is_error)
+
+    def response_headers(self, info: RequestInfo):
+        ttfb = info.elapsed(RequestInfo.EVENT_RESPONSE_HEADERS)
+        with self._lock:
+            self._add(self._ttfb, info, ttfb, False)
+
+    def body_complete(self, info: RequestInfo):
+        is_error = info.status is not None and info.status >= 400
+        with self._lock:
+            self._add(self._total, info, info.elapsed(RequestInfo.EVENT_BODY_COMPLETE), is_error)
+
+    def error(self, info: RequestInfo):
+        with self._lock:
+            self._add(self._total, info, info.elapsed(RequestInfo.EVENT_ERROR), True)
+
+    def snapshot(self) -> Dict[Tuple[str, str], LatencyHistogram]:
+        with self._lock:
+            return {key: h.snapshot() for key, h in self._total.items()}
+
+    def ttfb_snapshot(self) -> Dict[Tuple[str, str], LatencyHistogram]:
+        with self._lock:
+            return {key: h.snapshot() for key, h in self._ttfb.items()}
+
+    def reset(self):
+        with self._lock:
+            self._total.clear()
+            self._ttfb.clear()
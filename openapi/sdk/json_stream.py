@@ -0,0 +1,209 @@
+import codecs
+import json
+import re
+
+from typing import Any, List, Iterable, Iterator, AsyncIterable, AsyncIterator
+
+from .error import OpenApiClientError
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# 可以出现在数字中间的字符，数字之后紧跟这些字符说明数字被截断了
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+# 已消费的文本超过该长度时压缩缓冲区
+_COMPACT_SIZE = 64 * 1024
+
+
+class _Incomplete(Exception):
+    pass
+
+
+class JsonItemParser:
+    '''
+    增量解析JSON文本，逐个返回path指定的数组中的元素，内存占用只与单个元素的大小有关。
+    path由'.'分隔的对象属性名组成，并以'*'结尾，例如'*'表示顶层数组，'data.*'表示data属性对应的数组
+    '''
+    _keys: List[str]
+    _decoder: json.JSONDecoder
+    _buf: str
+    # 尚未合并到_buf的文本，避免每次追加都复制整个缓冲区
+    _pending: List[str]
+    _pending_size: int
+    _pos: int
+    # 当前所在的对象层级，等于len(_keys)时表示已进入目标数组
+    _depth: int
+    _state: str
+    # 上次解析不完整时缓冲区的长度，缓冲区增长一倍后才重新尝试，避免反复解析大元素
+    _retry_at: int
+    _eof: bool
+
+    def __init__(self, path: str = "*", **kwargs: Any):
+        keys = path.split(".") if path else ["*"]
+        if keys[-1] != "*" or "*" in keys[:-1]:
+            raise OpenApiClientError("path必须以'*'结尾，例如'*'或'data.*'")
+        self._keys = keys[:-1]
+        self._decoder = json.JSONDecoder(**kwargs)
+        self._buf = ""
+        self._pending = []
+        self._pending_size = 0
+        self._pos = 0
+        self._depth = 0
+        self._state = "value"
+        self._retry_at = 0
+        self._eof = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, text: str) -> List[Any]:
+        '''
+        追加一段JSON文本，返回已完整解析出的元素
+        '''
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if len(self._buf) + self._pending_size < self._retry_at:
+            return []
+        return self._parse()
+
+    def close(self) -> List[Any]:
+        '''
+        输入结束，返回剩余的元素。JSON不完整或未找到path对应的数组时抛出OpenApiClientError
+        '''
+        self._eof = True
+        items = self._parse()
+        if self._state == "missing":
+            raise OpenApiClientError("json中不存在path指定的数组")
+        if self._state != "done":
+            raise OpenApiClientError("json内容不完整")
+        return items
+
+    def _parse(self) -> List[Any]:
+        if self._pending:
+            self._buf = self._buf + "".join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+        items: List[Any] = []
+        try:
+            while self._state not in ("done", "missing"):
+                self._step(items)
+        except _Incomplete:
+            self._retry_at = len(self._buf) + (len(self._buf) - self._pos)
+        if self._pos > _COMPACT_SIZE:
+            self._buf = self._buf[self._pos:]
+            self._retry_at = max(0, self._retry_at - self._pos)
+            self._pos = 0
+        return items
+
+    def _peek(self) -> str:
+        self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+        if self._pos >= len(self._buf):
+            if self._eof:
+                raise OpenApiClientError("json内容不完整")
+            raise _Incomplete()
+        return self._buf[self._pos]
+
+    def _expect(self, chars: str) -> str:
+        c = self._peek()
+        if c not in chars:
+            raise OpenApiClientError("json格式错误，位置%d处应为'%s'" % (self._pos, chars))
+        self._pos += 1
+        return c
+
+    def _decode(self) -> Any:
+        self._peek()
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            if self._eof:
+                raise OpenApiClientError("json格式错误: " + str(e))
+            raise _Incomplete()
+        if not self._eof:
+            # 值之后必须还有分隔符，否则数字等可能被截断
+            if _WHITESPACE.match(self._buf, end).end() >= len(self._buf):
+                raise _Incomplete()
+            # raw_decode会把"1."、"12e"当作完整的数字1、12，需要等待后续内容
+            if self._buf[end - 1] in _NUMBER_CHARS and self._buf[end] in _NUMBER_CHARS:
+                raise _Incomplete()
+        self._pos = end
+        return value
+
+    def _step(self, items: List[Any]):
+        state = self._state
+        if state == "value":
+            if self._depth < len(self._keys):
+                self._expect("{")
+                self._state = "key"
+            else:
+                self._expect("[")
+                self._state = "first_item"
+        elif state == "key":
+            if self._peek() == "}":
+                self._state = "missing"
+                return
+            start = self._pos
+            try:
+                key = self._decode()
+                self._expect(":")
+                if key != self._keys[self._depth]:
+                    # 跳过不在path中的属性值
+                    self._decode()
+            except _Incomplete:
+                # 回退到属性名处，待数据完整后重新解析
+                self._pos = start
+                raise
+            if key == self._keys[self._depth]:
+                self._depth += 1
+                self._state = "value"
+            else:
+                self._state = "next_key"
+        elif state == "next_key":
+            if self._expect(",}") == ",":
+                self._state = "key"
+            else:
+                self._state = "missing"
+        elif state == "first_item":
+            if self._peek() == "]":
+                self._pos += 1
+                self._state = "done"
+            else:
+                self._state = "item"
+        elif state == "item":
+            items.append(self._decode())
+            self._state = "next_item"
+        elif state == "next_item":
+            if self._expect(",]") == ",":
+                self._state = "item"
+            else:
+                self._state = "done"
+
+
+def iter_json_items(chunks: Iterable[bytes], path: str = "*", encoding: str = "utf-8",
+                    **kwargs: Any) -> Iterator[Any]:
+    return _iter_items(chunks, JsonItemParser(path, **kwargs), encoding)
+
+
+def aiter_json_items(chunks: AsyncIterable[bytes], path: str = "*", encoding: str = "utf-8",
+                     **kwargs: Any) -> AsyncIterator[Any]:
+    return _aiter_items(chunks, JsonItemParser(path, **kwargs), encoding)
+
+
+def _iter_items(chunks: Iterable[bytes], parser: JsonItemParser, encoding: str) -> Iterator[Any]:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        yield from parser.feed(decoder.decode(chunk))
+        if parser.done:
+            return
+    parser.feed(decoder.decode(b"", True))
+    yield from parser.close()
+
+
+async def _aiter_items(chunks: AsyncIterable[bytes], parser: JsonItemParser, encoding: str) -> AsyncIterator[Any]:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    async for chunk in chunks:
+        for item in parser.feed(decoder.decode(chunk)):
+            yield item
+        if parser.done:
+            return
+    parser.feed(decoder.decode(b"", True))
+    for item in parser.close():
+        yield item
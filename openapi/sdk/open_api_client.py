@@ -1,32 +1,132 @@
-﻿from httpx import Client, AsyncClient, Request, URL, Timeout
-from typing import Mapping, Dict, NamedTuple, Any, Union, Tuple, Optional, Iterable, AsyncIterable
+﻿import time
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+from httpx import Client, AsyncClient, Request, Response, URL, Timeout, TransportError
+from typing import (Mapping, Dict, List, Any, Union, Tuple, Optional, Iterable, AsyncIterable, AsyncIterator,
+                    Sequence, Callable, TypeVar, Iterator)
 from abc import ABC, abstractmethod
 
 from .error import OpenApiClientError, OpenApiResponseError
+from .error_decoder import read_error_body, aread_error_body
 from .signed_by import SignedBy, SignedByHeader
-from .utility import HttpMethod, SignatureOption, HttpHeaderNames, generate_signature, resolve_error
+from .utility import (HttpMethod, SignatureOption, HttpHeaderNames, Signer, generate_signature, resolve_error,
+                      request_key)
 from .request_result import RequestResult, AsyncRequestResult
+from .content import FileContent
+from .pool import PoolOption, ConnectionPool, AsyncConnectionPool
+from .batch import BatchItemTypes, BatchResult, run_batch
+from .retry import RetryPolicy
+from .hooks import RequestHooks, RequestTrace, HookDispatcher
+from .cache import ResponseCache, CacheEntry, DEFAULT_MAX_BODY_SIZE, make_entry, read_limited, aread_limited
+from .ratelimit import RateLimiter
+from .circuit import CircuitBreaker
+from .paginate import PageStrategy, PageParams, iter_pages, aiter_pages
+from .template import RequestTemplate, AsyncRequestTemplate
+from .codec import JsonCodec, default_codec
+from .compression import CompressionOption
+from .clock import SigningClock, DEFAULT_CLOCK
+from .presign import Presigner, PresignItem
+from .download import (DownloadOption, DownloadResult, RangeProgress, resume_state, open_target, probe_ranges,
+                       range_headers, get_validator, create_part_file, remove_part_file, download_range,
+                       adownload_range, finish)
 
 Json = Any
-RequestContent = Union[str, bytes, Iterable[bytes], AsyncIterable[bytes]]
+RequestContent = Union[str, bytes, FileContent, Iterable[bytes], AsyncIterable[bytes]]
 RequestContentTypes = Union[Json, RequestContent]
+T = TypeVar("T")
+
+
+# 空的query和http头共享同一个只读映射
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
+
+def _frozen(values: Optional[Mapping[str, str]]) -> Mapping[str, str]:
+    '''
+    返回只读映射。已经是只读映射的直接共享，不再复制
+    '''
+    if not values:
+        return _EMPTY
+    if isinstance(values, MappingProxyType):
+        return values
+    return MappingProxyType(dict(values))
+
+
+def _merged(values: Mapping[str, str], map: Optional[Mapping[str, Any]], kwargs: Mapping[str, Any]) \
+        -> Mapping[str, str]:
+    merged = dict(values)
+    if map:
+        for name, value in map.items():
+            merged[name] = value if isinstance(value, str) else str(value)
+    for name, value in kwargs.items():
+        merged[name] = value if isinstance(value, str) else str(value)
+    return MappingProxyType(merged)
+
+
+class HttpContent:
+    '''
+    请求内容，创建后不能修改
+    '''
+    __slots__ = ("_content", "_json", "_content_type")
+
+    _content: Optional[RequestContent]
+    _json: Optional[Any]
+    _content_type: Optional[str]
 
+    def __init__(self, content: Optional[RequestContent] = None, json: Optional[Any] = None,
+                 content_type: Optional[str] = None):
+        self._content = content
+        self._json = json
+        self._content_type = content_type
 
-class HttpContent(NamedTuple):
-    content: Optional[RequestContent]
-    json: Optional[Any]
+    @property
+    def content(self) -> Optional[RequestContent]:
+        return self._content
 
-    content_type: Optional[str]
+    @property
+    def json(self) -> Optional[Any]:
+        return self._json
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self._content_type
+
+    def _replace(self, **kwargs: Any) -> "HttpContent":
+        return HttpContent(kwargs.get("content", self._content), kwargs.get("json", self._json),
+                           kwargs.get("content_type", self._content_type))
 
     def args(self) -> Tuple[Optional[str], RequestContentTypes]:
-        if self.content is not None:
-            return ("content", self.content)
-        elif self.json is not None:
-            return ("json", self.json)
+        if self._content is not None:
+            return ("content", self._content)
+        elif self._json is not None:
+            return ("json", self._json)
         return (None, None)
 
+    def is_replayable(self) -> bool:
+        '''
+        请求内容是否可以重复发送。流式内容只能发送一次，不能用于重试
+        '''
+        return self._content is None or isinstance(self._content, (str, bytes, FileContent))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HttpContent):
+            return NotImplemented
+        return (self._content, self._json, self._content_type) == \
+            (other._content, other._json, other._content_type)
+
+    def __repr__(self) -> str:
+        return "HttpContent(content=%r, json=%r, content_type=%r)" % (self._content, self._json, self._content_type)
+
+
+# 没有请求内容时共享的HttpContent
+_NO_CONTENT = HttpContent()
+
 
 class Builder:
+    __slots__ = ("_signed_by", "_timeout", "_query", "_headers", "_content_type", "_json", "_content", "_shared")
+
     _signed_by: Optional[SignedBy]
     _timeout: Optional[int]
     _query: Dict[str, str]
@@ -34,6 +134,8 @@ class Builder:
     _content_type: Optional[str]
     _json: Optional[Any]
     _content: Optional[RequestContent]
+    # build()返回的RequestOption与builder共享query和http头字典，之后再修改时先复制
+    _shared: bool
 
     def __init__(self):
         self._signed_by = None
@@ -43,6 +145,13 @@ class Builder:
         self._content_type = None
         self._json = None
         self._content = None
+        self._shared = False
+
+    def _unshare(self):
+        if self._shared:
+            self._query = dict(self._query)
+            self._headers = dict(self._headers)
+            self._shared = False
 
     def signed_by(self, signed_by: SignedBy) -> "Builder":
         self._signed_by = signed_by
@@ -56,6 +165,7 @@ class Builder:
     def add_query(self, map: Optional[Dict[str, Any]] = None, /, **kwargs: Any) -> "Builder":
         dictionary: Mapping[str, Any] = (map | kwargs) if map else kwargs
         if len(dictionary) > 0:
+            self._unshare()
             for name, value in dictionary.items():
                 self._query[name] = str(value)
         return self
@@ -63,12 +173,13 @@ class Builder:
     def add_header(self, map: Optional[Dict[str, Any]] = None, /, **kwargs: Any) -> "Builder":
         dictionary: Mapping[str, Any] = (map | kwargs) if map else kwargs
         if len(dictionary) > 0:
+            self._unshare()
             for name, value in dictionary.items():
                 self._headers[name] = str(value)
         return self
 
-    def content_type(self, contentType: str) -> "Builder":
-        self.contentType = contentType
+    def content_type(self, content_type: str) -> "Builder":
+        self._content_type = content_type
         return self
 
     def json(self, body: Json) -> "Builder":
@@ -80,23 +191,103 @@ class Builder:
         return self
 
     def build(self) -> "RequestOption":
-        entity = HttpContent(content=self._content,
-                             json=self._json,
-                             content_type=self._content_type)
-        return RequestOption(self._signed_by, self._timeout, self._query, self._headers, entity)
+        if self._content is None and self._json is None and self._content_type is None:
+            entity = _NO_CONTENT
+        else:
+            entity = HttpContent(self._content, self._json, self._content_type)
+        self._shared = True
+        query = MappingProxyType(self._query) if self._query else _EMPTY
+        headers = MappingProxyType(self._headers) if self._headers else _EMPTY
+        return RequestOption(self._signed_by, self._timeout, query, headers, entity)
+
+
+class RequestOption:
+    '''
+    请求选项，创建后不能修改。query和headers为只读映射，with_query、with_headers等方法返回新的RequestOption，
+    未修改的部分与原对象共享
+    '''
+    __slots__ = ("_signed_by", "_timeout", "_query", "_headers", "_entity")
 
+    _signed_by: Optional[SignedBy]
+    _timeout: Optional[int]
+    _query: Mapping[str, str]
+    _headers: Mapping[str, str]
+    _entity: HttpContent
 
-class RequestOption(NamedTuple):
-    signed_by: Optional[SignedBy]
-    timeout: Optional[int]
-    query: Mapping[str, str]
-    headers: Mapping[str, str]
-    entity: HttpContent
+    def __init__(self, signed_by: Optional[SignedBy] = None, timeout: Optional[int] = None,
+                 query: Optional[Mapping[str, str]] = None, headers: Optional[Mapping[str, str]] = None,
+                 entity: Optional[HttpContent] = None):
+        self._signed_by = signed_by
+        self._timeout = timeout
+        self._query = _frozen(query)
+        self._headers = _frozen(headers)
+        self._entity = entity or _NO_CONTENT
 
     @staticmethod
     def new_builder() -> Builder:
         return Builder()
 
+    @property
+    def signed_by(self) -> Optional[SignedBy]:
+        return self._signed_by
+
+    @property
+    def timeout(self) -> Optional[int]:
+        return self._timeout
+
+    @property
+    def query(self) -> Mapping[str, str]:
+        return self._query
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        return self._headers
+
+    @property
+    def entity(self) -> HttpContent:
+        return self._entity
+
+    def _derive(self, query: Mapping[str, str], headers: Mapping[str, str]) -> "RequestOption":
+        # 参数已经是只读映射，跳过__init__中的检查
+        option = object.__new__(RequestOption)
+        option._signed_by = self._signed_by
+        option._timeout = self._timeout
+        option._query = query
+        option._headers = headers
+        option._entity = self._entity
+        return option
+
+    def _replace(self, **kwargs: Any) -> "RequestOption":
+        return RequestOption(kwargs.get("signed_by", self._signed_by), kwargs.get("timeout", self._timeout),
+                             kwargs.get("query", self._query), kwargs.get("headers", self._headers),
+                             kwargs.get("entity", self._entity))
+
+    def with_query(self, map: Optional[Mapping[str, Any]] = None, /, **kwargs: Any) -> "RequestOption":
+        '''
+        返回增加了指定query参数的新RequestOption，参数值转换为字符串
+        '''
+        if not map and not kwargs:
+            return self
+        return self._derive(_merged(self._query, map, kwargs), self._headers)
+
+    def with_headers(self, map: Optional[Mapping[str, Any]] = None, /, **kwargs: Any) -> "RequestOption":
+        '''
+        返回增加了指定http头的新RequestOption，参数值转换为字符串
+        '''
+        if not map and not kwargs:
+            return self
+        return self._derive(self._query, _merged(self._headers, map, kwargs))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RequestOption):
+            return NotImplemented
+        return (self._signed_by, self._timeout, self._query, self._headers, self._entity) == \
+            (other._signed_by, other._timeout, other._query, other._headers, other._entity)
+
+    def __repr__(self) -> str:
+        return "RequestOption(signed_by=%r, timeout=%r, query=%r, headers=%r, entity=%r)" % (
+            self._signed_by, self._timeout, dict(self._query), dict(self._headers), self._entity)
+
 
 class _Client(ABC):
     _CONTENT_TYPE_VALUE = "application/json; charset=UTF-8"
@@ -105,8 +296,22 @@ class _Client(ABC):
     _access_id: str
     _secret_key: str
     _base_uri: URL
-
-    def __init__(self, base_uri: str, access_id: str, secret_key: str):
+    _signer: Signer
+    _retry: Optional[RetryPolicy]
+    _hooks: HookDispatcher
+    _cache: Optional[ResponseCache]
+    _rate_limiter: Optional[RateLimiter]
+    _circuit_breaker: Optional[CircuitBreaker]
+    _json_codec: JsonCodec
+    _compression: Optional[CompressionOption]
+    _clock: SigningClock
+    _presigner: Presigner
+
+    def __init__(self, base_uri: str, access_id: str, secret_key: str, retry: Optional[RetryPolicy] = None,
+                 hooks: Optional[Sequence[RequestHooks]] = None, cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 json_codec: Optional[JsonCodec] = None, compression: Optional[CompressionOption] = None,
+                 clock: Optional[SigningClock] = None):
         self._base_uri = URL(base_uri)
         if not access_id:
             raise OpenApiClientError("accessId不能为null或empty")
@@ -115,8 +320,29 @@ class _Client(ABC):
 
         self._access_id = access_id
         self._secret_key = secret_key
-
-    def _make_signature(self, req: Request, signed_by: Optional[SignedBy]):
+        self._signer = Signer(access_id, secret_key)
+        self._retry = retry
+        self._hooks = HookDispatcher(hooks or ())
+        self._cache = cache
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = circuit_breaker
+        self._json_codec = json_codec or default_codec()
+        if compression is not None:
+            compression.check()
+        self._compression = compression
+        self._clock = clock or DEFAULT_CLOCK
+        self._presigner = Presigner(self._base_uri, access_id, secret_key, self._signer, self._clock)
+
+    def presign(self, items: Iterable[PresignItem], duration: Optional[int] = None,
+                content_type: Optional[str] = None) -> List[str]:
+        '''
+        批量生成SignedByQuery方式签名的url，例如提供给浏览器的限时下载链接，不发送请求。
+        items为(method, api_path, query)，duration为有效时间(秒)，同一批url的Expires相同
+        '''
+        return self._presigner.presign(items, duration, content_type)
+
+    def _make_signature(self, req: Request, signed_by: Optional[SignedBy],
+                        custom_headers: Optional[Sequence[Tuple[str, str]]] = None):
         content_type: str = req.headers.get(HttpHeaderNames.CONTENT_TYPE)
         option = SignatureOption(
             self._access_id,
@@ -124,11 +350,12 @@ class _Client(ABC):
             str(req.url),
             HttpMethod[str(req.method).upper()],
             content_type,
-            req.headers
+            req.headers,
+            custom_headers
         )
 
         signed_by = signed_by or SignedByHeader()
-        signed_info = generate_signature(signed_by, option)
+        signed_info = generate_signature(signed_by, option, self._signer, self._clock)
         if signed_info.headers:
             req.headers.update(signed_info.headers)
 
@@ -139,12 +366,56 @@ class _Client(ABC):
     def _new_request(self, method: str, api_uri: URL, **kwargs) -> Request:
         pass
 
-    def _create_request(self, method: HttpMethod, api_path: str, option: RequestOption) -> Request:
+    def _adapt_content(self, content: FileContent) -> RequestContent:
+        return content
+
+    def _default_headers(self) -> Dict[str, str]:
+        headers = {
+            HttpHeaderNames.ACCEPT: _Client._ACCEPT_VALUE,
+            HttpHeaderNames.ACCEPT_LANGUAGE: "zh-CN"
+        }
+        if self._compression is not None:
+            # 未配置时使用httpx的默认值
+            headers[HttpHeaderNames.ACCEPT_ENCODING] = self._compression.accept_encoding()
+        return headers
+
+    def _entity_args(self, option: RequestOption) -> Tuple[Optional[str], RequestContentTypes, Optional[str]]:
+        '''
+        返回(httpx的参数名, 请求内容, Content-Encoding)
+        '''
+        name, value = option.entity.args()
+        if name == "json":
+            # 使用配置的JsonCodec序列化，不使用httpx内置的json
+            name, value = "content", self._json_codec.encode(value)
+        compression = self._compression
+        if compression is None or compression.request_encoding is None or not isinstance(value, (str, bytes)) \
+                or any(key.lower() == "content-encoding" for key in option.headers):
+            return name, value, None
+        compressed = compression.compress(value.encode("utf-8") if isinstance(value, str) else value)
+        if compressed is None:
+            return name, value, None
+        return name, compressed, compression.request_encoding
+
+    def _api_uri(self, api_path: str, option: RequestOption) -> URL:
+        api_uri = self._base_uri.join(api_path)
+        if len(option.query) > 0:
+            api_uri = api_uri.copy_merge_params(option.query)
+        return api_uri
+
+    def _create_request(self, method: HttpMethod, api_path: str, option: RequestOption,
+                        trace: Optional[RequestTrace] = None) -> Request:
         kwargs: Mapping[str, Any] = {
             'headers': dict(option.headers)
         }
         if option.entity:
-            name, value = option.entity.args()
+            name, value, encoding = self._entity_args(option)
+            if encoding:
+                # 在签名前设置，签名时使用压缩后的请求和原来的Content-Type
+                kwargs['headers'][HttpHeaderNames.CONTENT_ENCODING] = encoding
+            if isinstance(value, FileContent):
+                # 长度已知时使用Content-Length，避免chunked编码
+                kwargs['headers']['Content-Length'] = str(len(value))
+                value = self._adapt_content(value)
             if name:
                 kwargs[name] = value
             content_type = option.entity.content_type or _Client._CONTENT_TYPE_VALUE
@@ -152,26 +423,115 @@ class _Client(ABC):
         if option.timeout and option.timeout > 0:
             kwargs['timeout'] = Timeout(timeout=option.timeout, connect=5.0)
 
-        api_uri = self._base_uri.join(api_path)
-        if len(option.query) > 0:
-            api_uri = api_uri.copy_merge_params(option.query)
-
-        req = self._new_request(str(method), api_uri, **kwargs)
+        req = self._new_request(str(method), self._api_uri(api_path, option), **kwargs)
+        if trace:
+            trace.before_sign(req)
         self._make_signature(req, option.signed_by)
+        if trace:
+            trace.after_sign(req)
         return req
 
+    def _use_cache(self, method: HttpMethod, option: RequestOption) -> bool:
+        return self._cache is not None and method == HttpMethod.GET and ResponseCache.is_cacheable(option.headers)
+
+    def _cache_key(self, api_path: str, option: RequestOption) -> Tuple[str, URL]:
+        api_uri = self._api_uri(api_path, option)
+        # 不同的accessId可能有不同的访问权限，不共享缓存
+        return self._access_id + "\n" + request_key(HttpMethod.GET, str(api_uri), option.headers), api_uri
+
+    @staticmethod
+    def _revalidate_option(option: RequestOption, entry: Optional[CacheEntry]) -> RequestOption:
+        if entry is None:
+            return option
+        return option.with_headers(entry.validators())
+
+    @staticmethod
+    def _page_option(option: RequestOption, params: PageParams) -> RequestOption:
+        return option.with_query(params)
+
+    def _get_retry(self, option: RequestOption) -> Optional[RetryPolicy]:
+        if self._retry and option.entity.is_replayable():
+            return self._retry
+        return None
+
+    def _rate_delay(self, api_path: str) -> float:
+        if self._rate_limiter is None:
+            return 0.0
+        return self._rate_limiter.reserve(self._access_id, api_path)
+
+    def _circuit_allow(self, method: HttpMethod, api_path: str) -> Optional[Tuple[str, int]]:
+        '''
+        熔断器打开时抛出CircuitOpenError，返回用于记录结果的(key, generation)
+        '''
+        if self._circuit_breaker is None:
+            return None
+        key = self._circuit_breaker.key(method, api_path)
+        return key, self._circuit_breaker.allow(key)
+
+    def _circuit_record(self, circuit: Optional[Tuple[str, int]], status: Optional[int] = None,
+                        error: Optional[BaseException] = None):
+        if circuit is not None:
+            assert self._circuit_breaker is not None
+            self._circuit_breaker.record(circuit[0], status, error, circuit[1])
+
+    def _check_success(self, api_path: str):
+        if self._rate_limiter is not None:
+            self._rate_limiter.recover(self._access_id, api_path)
+
+    def _check_error(self, retry: Optional[RetryPolicy], method: HttpMethod, api_path: str, attempt: int,
+                     response: Response, data: bytes) -> float:
+        '''
+        返回下次重试前的等待时间，不需要重试时抛出OpenApiResponseError
+        '''
+        limiter = self._rate_limiter
+        throttled = limiter is not None and limiter.is_throttled(response.status_code)
+        if throttled:
+            limiter.throttle(self._access_id, api_path, response)
+        can_retry = retry is not None and attempt < retry.max_attempts
+        if can_retry and retry.should_retry_status(method, response.status_code):
+            return retry.get_delay(attempt, response)
+
+        # 只有用到错误码或错误信息时才解析返回内容
+        # 未知的charset时httpx的encoding回退到utf-8
+        error = resolve_error(data, response.encoding)
+        if limiter is not None and not throttled and limiter.throttle_codes and \
+                limiter.is_throttled(response.status_code, error.code):
+            limiter.throttle(self._access_id, api_path, response)
+        if can_retry and retry.should_retry_error(method, response.status_code, error):
+            return retry.get_delay(attempt, response)
+        raise OpenApiResponseError(None, response.status_code, error, attempt)
+
+    @staticmethod
+    def _check_exception(retry: Optional[RetryPolicy], method: HttpMethod, attempt: int,
+                         exc: TransportError) -> float:
+        '''
+        返回下次重试前的等待时间，不需要重试时重新抛出exc
+        '''
+        if retry is not None and attempt < retry.max_attempts and retry.should_retry_exception(method, exc):
+            return retry.get_delay(attempt)
+        raise exc
+
 
 class OpenApiClient(_Client):
     _client: Client
 
-    def __init__(self, base_uri: str, access_id: str, secret_key: str):
-        super().__init__(base_uri, access_id, secret_key)
-
+    def __init__(self, base_uri: str, access_id: str, secret_key: str,
+                 pool: Union[PoolOption, ConnectionPool, None] = None, retry: Optional[RetryPolicy] = None,
+                 hooks: Optional[Sequence[RequestHooks]] = None, cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 json_codec: Optional[JsonCodec] = None, compression: Optional[CompressionOption] = None,
+                 clock: Optional[SigningClock] = None):
+        super().__init__(base_uri, access_id, secret_key, retry, hooks, cache, rate_limiter, circuit_breaker,
+                         json_codec, compression, clock)
+
+        kwargs: Dict[str, Any]
+        if isinstance(pool, ConnectionPool):
+            kwargs = {'transport': pool._share()}
+        else:
+            kwargs = (pool or PoolOption())._client_kwargs(False)
         self._client = Client(
-            headers={
-                HttpHeaderNames.ACCEPT: _Client._ACCEPT_VALUE,
-                HttpHeaderNames.ACCEPT_LANGUAGE: "zh-CN"
-            }
+            headers=self._default_headers(),
+            **kwargs
         )
 
     def __enter__(self: "OpenApiClient") -> "OpenApiClient":
@@ -201,29 +561,189 @@ class OpenApiClient(_Client):
     def patch(self, api_path: str, option: RequestOption) -> RequestResult:
         return self.request(HttpMethod.PATCH, api_path, option)
 
-    def request(self, method: HttpMethod, api_path: str, option: RequestOption) -> RequestResult:
-        req = self._create_request(method, api_path, option)
-        response = self._client.send(req, stream=True)
+    def download_to(self, api_path: str, option: RequestOption, path: str,
+                    download: Optional[DownloadOption] = None) -> DownloadResult:
+        '''
+        以GET方式下载内容保存到path，下载中断时自动从中断处续传，
+        download.parallel大于1时把大文件拆分为多个Range请求并行下载，每个请求都单独签名。
+        未完成时在path旁保存ETag或Last-Modified(path.validator)，再次下载时使用Range和If-Range续传，
+        服务端内容变化或没有保存validator时重新下载
+        '''
+        download = download or DownloadOption()
+
+        # 下载的内容不经过缓存
+        def send(headers: Mapping[str, str]) -> RequestResult:
+            return self._send(HttpMethod.GET, api_path, option.with_headers(headers))
+
+        offset, validator = resume_state(path, download)
+        ranges = None
+        if download.parallel > 1 and offset == 0:
+            with send(range_headers(0, 0)) as result:
+                ranges = probe_ranges(result.status, result.headers, download.parallel)
+                validator = get_validator(result.headers)
+        if not ranges:
+            # 续传时使用上次保存的ETag或Last-Modified，服务端的内容已经变化时重新下载
+            progress = RangeProgress(offset, None, validator)
+            with open_target(path, offset, download) as file:
+                download_range(send, file, progress, download, True, path)
+            return finish(path, [progress], download, offset > 0)
+
+        part_path = create_part_file(path, ranges[-1][1] + 1)
+
+        def download_part(progress: RangeProgress):
+            with open(part_path, 'r+b', buffering=download.chunk_size) as part:
+                download_range(send, part, progress, download, False)
+
+        progresses = [RangeProgress(start, end, validator) for start, end in ranges]
+        try:
+            with ThreadPoolExecutor(max_workers=len(progresses), thread_name_prefix="openapi-download") as pool:
+                for future in [pool.submit(download_part, p) for p in progresses]:
+                    future.result()
+            return finish(path, progresses, download, False, part_path)
+        except BaseException:
+            remove_part_file(part_path)
+            raise
+
+    def template(self, method: HttpMethod, api_path: str, option: Optional[RequestOption] = None) -> RequestTemplate:
+        '''
+        编译请求模板，api_path中可以包含{name}形式的路径参数。适用于只有少量参数变化的高频请求
+        '''
+        return RequestTemplate(self, method, api_path, option or RequestOption.new_builder().build(),
+                               self._client.headers, self._client.timeout)
+
+    def pages(self, api_path: str, option: RequestOption, strategy: PageStrategy) -> Iterator[Json]:
+        '''
+        以GET方式逐页获取分页接口的返回内容，option中的query会与分页参数合并
+        '''
+        def fetch(params: PageParams) -> Json:
+            with self.get(api_path, self._page_option(option, params)) as result:
+                return result.get_json_object()
+        return iter_pages(fetch, strategy)
+
+    def paginate(self, api_path: str, option: RequestOption, strategy: PageStrategy) -> Iterator[Any]:
+        '''
+        逐项返回分页接口的全部数据项，需要时才请求下一页
+        '''
+        for page in self.pages(api_path, option, strategy):
+            yield from strategy.get_items(page)
 
-        if response.is_error:
-            data = response.read()
-            xmlContent = str(data, encoding=response.encoding or 'utf-8')
-            error = resolve_error(xmlContent)
-            raise OpenApiResponseError(error.message, response.status_code, error)
-        return RequestResult(response)
+    def request(self, method: HttpMethod, api_path: str, option: RequestOption) -> RequestResult:
+        if self._use_cache(method, option):
+            return self._cached_request(api_path, option)
+        return self._send(method, api_path, option)
+
+    def _cached_request(self, api_path: str, option: RequestOption) -> RequestResult:
+        assert self._cache is not None
+        key, api_uri = self._cache_key(api_path, option)
+        entry = self._cache.lookup(key)
+        if entry is not None and entry.is_fresh():
+            return RequestResult(entry.to_response(Request("GET", api_uri)), 0, True, json_codec=self._json_codec)
+
+        result = self._send(HttpMethod.GET, api_path, self._revalidate_option(option, entry))
+        if entry is not None and result.status == 304:
+            with result:
+                entry = self._cache.refresh(key, entry, result.headers)
+            return RequestResult(entry.to_response(Request("GET", api_uri)), result.attempts, True,
+                                 json_codec=self._json_codec)
+        if not self._cache.should_store(result.status, result.headers):
+            return result
+        # 没有Content-Length时边读边检查长度，超出max_body_size时不缓存，已读取的内容仍然返回给调用方
+        response, complete = read_limited(result._response, self._cache.max_body_size)
+        if complete:
+            self._cache.store(key, result.status, result.headers, response.content)
+        return RequestResult(response, result.attempts, False, json_codec=self._json_codec)
+
+    def _send(self, method: HttpMethod, api_path: str, option: RequestOption,
+              create: Optional[Callable[[Optional[RequestTrace]], Request]] = None) -> RequestResult:
+        retry = self._get_retry(option)
+        attempt = 0
+        while True:
+            attempt += 1
+            # 熔断器打开时直接失败，不占用限流令牌，也不签名和触发hooks
+            circuit = self._circuit_allow(method, api_path)
+            trace = None
+            try:
+                # 按RateLimiter的限制等待，重试也需要获取令牌
+                wait = self._rate_delay(api_path)
+                if wait > 0:
+                    time.sleep(wait)
+                # 每次尝试都重新创建请求，重新生成Date头或Expires签名参数
+                trace = self._hooks.begin(method, api_path, attempt, False)
+                if create is not None:
+                    req = create(trace)
+                else:
+                    req = self._create_request(method, api_path, option, trace)
+                response = self._client.send(req, stream=True)
+            except TransportError as e:
+                self._circuit_record(circuit, error=e)
+                if trace:
+                    trace.fail(e)
+                time.sleep(self._check_exception(retry, method, attempt, e))
+                continue
+            except BaseException as e:
+                # 不是网络错误时只释放半开状态的探测名额
+                self._circuit_record(circuit, error=e)
+                if trace:
+                    trace.fail(e)
+                raise
+            self._circuit_record(circuit, response.status_code)
+            if self._clock.adjusting:
+                self._clock.observe(response.headers.get(HttpHeaderNames.DATE))
+
+            if trace:
+                trace.response_headers(response)
+            if not response.is_error:
+                self._check_success(api_path)
+                return RequestResult(response, attempt, json_codec=self._json_codec)
+            data = read_error_body(response)
+            try:
+                delay = self._check_error(retry, method, api_path, attempt, response, data)
+            except OpenApiResponseError as e:
+                if trace:
+                    trace.fail(e)
+                raise
+            if trace:
+                trace.body_complete()
+            time.sleep(delay)
+
+
+def _close_unshared(task: "asyncio.Task[Tuple[Optional[CacheEntry], AsyncRequestResult]]"):
+    if task.cancelled() or task.exception() is not None:
+        return
+    entry, result = task.result()
+    if entry is None:
+        asyncio.ensure_future(result.__aexit__())
 
 
 class AsyncOpenApiClient(_Client):
     _client: AsyncClient
-
-    def __init__(self, base_uri: str, access_id: str, secret_key: str):
-        super().__init__(base_uri, access_id, secret_key)
-
+    _single_flight: bool
+    _flights: Dict[str, "asyncio.Task[Tuple[Optional[CacheEntry], AsyncRequestResult]]"]
+
+    def __init__(self, base_uri: str, access_id: str, secret_key: str,
+                 pool: Union[PoolOption, AsyncConnectionPool, None] = None, retry: Optional[RetryPolicy] = None,
+                 hooks: Optional[Sequence[RequestHooks]] = None, cache: Optional[ResponseCache] = None,
+                 single_flight: bool = False, rate_limiter: Optional[RateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, json_codec: Optional[JsonCodec] = None,
+                 compression: Optional[CompressionOption] = None, clock: Optional[SigningClock] = None):
+        '''
+        single_flight为True时，同时进行的相同GET请求(规范化的路径、query和参与签名的x-iwop-参数都相同)
+        只向网关发送一次，返回内容读入内存后分发给所有调用方。返回内容超过cache的max_body_size
+        (未设置cache时为DEFAULT_MAX_BODY_SIZE)时不再共享，只返回给发起请求的调用方，其他调用方各自发送请求
+        '''
+        super().__init__(base_uri, access_id, secret_key, retry, hooks, cache, rate_limiter, circuit_breaker,
+                         json_codec, compression, clock)
+        self._single_flight = single_flight
+        self._flights = {}
+
+        kwargs: Dict[str, Any]
+        if isinstance(pool, AsyncConnectionPool):
+            kwargs = {'transport': pool._share()}
+        else:
+            kwargs = (pool or PoolOption())._client_kwargs(True)
         self._client = AsyncClient(
-            headers={
-                HttpHeaderNames.ACCEPT: _Client._ACCEPT_VALUE,
-                HttpHeaderNames.ACCEPT_LANGUAGE: "zh-CN"
-            }
+            headers=self._default_headers(),
+            **kwargs
         )
 
     async def __aenter__(self: "AsyncOpenApiClient") -> "AsyncOpenApiClient":
@@ -238,6 +758,9 @@ class AsyncOpenApiClient(_Client):
     def _new_request(self, method: str, api_uri: URL, **kwargs) -> Request:
         return self._client.build_request(method, url=api_uri, **kwargs)
 
+    def _adapt_content(self, content: FileContent) -> RequestContent:
+        return content.async_stream()
+
     async def get(self, api_path: str, option: RequestOption) -> AsyncRequestResult:
         return await self.request(HttpMethod.GET, api_path, option)
 
@@ -253,13 +776,213 @@ class AsyncOpenApiClient(_Client):
     async def patch(self, api_path: str, option: RequestOption) -> AsyncRequestResult:
         return await self.request(HttpMethod.PATCH, api_path, option)
 
+    async def download_to(self, api_path: str, option: RequestOption, path: str,
+                          download: Optional[DownloadOption] = None) -> DownloadResult:
+        '''
+        以GET方式下载内容保存到path，下载中断时自动从中断处续传，
+        download.parallel大于1时把大文件拆分为多个Range请求并行下载，每个请求都单独签名。
+        未完成时在path旁保存ETag或Last-Modified(path.validator)，再次下载时使用Range和If-Range续传，
+        服务端内容变化或没有保存validator时重新下载
+        '''
+        download = download or DownloadOption()
+
+        # 下载的内容不经过缓存，也不与其他请求共享
+        async def send(headers: Mapping[str, str]) -> AsyncRequestResult:
+            return await self._send(HttpMethod.GET, api_path, option.with_headers(headers))
+
+        offset, validator = resume_state(path, download)
+        ranges = None
+        if download.parallel > 1 and offset == 0:
+            async with await send(range_headers(0, 0)) as result:
+                ranges = probe_ranges(result.status, result.headers, download.parallel)
+                validator = get_validator(result.headers)
+        if not ranges:
+            # 续传时使用上次保存的ETag或Last-Modified，服务端的内容已经变化时重新下载
+            progress = RangeProgress(offset, None, validator)
+            with open_target(path, offset, download) as file:
+                await adownload_range(send, file, progress, download, True, path)
+            return finish(path, [progress], download, offset > 0)
+
+        part_path = create_part_file(path, ranges[-1][1] + 1)
+
+        async def download_part(progress: RangeProgress):
+            with open(part_path, 'r+b', buffering=download.chunk_size) as part:
+                await adownload_range(send, part, progress, download, False)
+
+        progresses = [RangeProgress(start, end, validator) for start, end in ranges]
+        try:
+            # 等待所有分段结束后再删除临时文件
+            for outcome in await asyncio.gather(*[download_part(p) for p in progresses], return_exceptions=True):
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            return finish(path, progresses, download, False, part_path)
+        except BaseException:
+            remove_part_file(part_path)
+            raise
+
+    def template(self, method: HttpMethod, api_path: str,
+                 option: Optional[RequestOption] = None) -> AsyncRequestTemplate:
+        '''
+        编译请求模板，api_path中可以包含{name}形式的路径参数。适用于只有少量参数变化的高频请求
+        '''
+        return AsyncRequestTemplate(self, method, api_path, option or RequestOption.new_builder().build(),
+                                    self._client.headers, self._client.timeout)
+
+    def pages(self, api_path: str, option: RequestOption, strategy: PageStrategy,
+              prefetch: int = 0) -> AsyncIterator[Json]:
+        '''
+        以GET方式逐页获取分页接口的返回内容，option中的query会与分页参数合并。
+        prefetch大于0时，在调用方处理当前页的同时并发获取后续最多prefetch页(游标分页不能预取)
+        '''
+        async def fetch(params: PageParams) -> Json:
+            async with await self.get(api_path, self._page_option(option, params)) as result:
+                return await result.get_json_object()
+        return aiter_pages(fetch, strategy, prefetch)
+
+    async def paginate(self, api_path: str, option: RequestOption, strategy: PageStrategy,
+                       prefetch: int = 0) -> AsyncIterator[Any]:
+        '''
+        逐项返回分页接口的全部数据项
+        '''
+        async for page in self.pages(api_path, option, strategy, prefetch):
+            for item in strategy.get_items(page):
+                yield item
+
     async def request(self, method: HttpMethod, api_path: str, option: RequestOption) -> AsyncRequestResult:
-        req = self._create_request(method, api_path, option)
-        response = await self._client.send(req, stream=True)
-
-        if response.is_error:
-            data = await response.aread()
-            xmlContent = str(data, encoding=response.encoding or 'utf-8')
-            error = resolve_error(xmlContent)
-            raise OpenApiResponseError(error.message, response.status_code, error)
-        return AsyncRequestResult(response)
+        if self._single_flight and method == HttpMethod.GET and ResponseCache.is_cacheable(option.headers):
+            return await self._shared_request(api_path, option)
+        return await self._unshared_request(method, api_path, option)
+
+    async def _unshared_request(self, method: HttpMethod, api_path: str, option: RequestOption) -> AsyncRequestResult:
+        if self._use_cache(method, option):
+            return await self._cached_request(api_path, option)
+        return await self._send(method, api_path, option)
+
+    async def _fetch_shared(self, key: str, api_path: str,
+                            option: RequestOption) -> Tuple[Optional[CacheEntry], AsyncRequestResult]:
+        '''
+        返回共享的内容，内容太大时返回None和可以继续流式读取的结果
+        '''
+        try:
+            result = await self._unshared_request(HttpMethod.GET, api_path, option)
+            limit = self._cache.max_body_size if self._cache is not None else DEFAULT_MAX_BODY_SIZE
+            try:
+                response, complete = await aread_limited(result._response, limit)
+            except BaseException:
+                await result._response.aclose()
+                raise
+            result = AsyncRequestResult(response, result.attempts, result.from_cache, json_codec=self._json_codec)
+            if not complete:
+                return None, result
+            return make_entry(response.status_code, response.headers, response.content), result
+        finally:
+            del self._flights[key]
+
+    async def _shared_request(self, api_path: str, option: RequestOption) -> AsyncRequestResult:
+        key, api_uri = self._cache_key(api_path, option)
+        task = self._flights.get(key)
+        leader = task is None
+        if leader:
+            # 请求在单独的task中进行，某个调用方取消时不影响其他调用方
+            task = self._flights[key] = asyncio.ensure_future(self._fetch_shared(key, api_path, option))
+        try:
+            entry, result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if leader:
+                # 没有共享的结果只属于发起请求的调用方，调用方取消后需要关闭
+                task.add_done_callback(_close_unshared)
+            raise
+        if entry is None:
+            if leader:
+                return result
+            return await self._unshared_request(HttpMethod.GET, api_path, option)
+        return AsyncRequestResult(entry.to_response(Request("GET", api_uri)), result.attempts, result.from_cache,
+                                  json_codec=self._json_codec)
+
+    async def _cache_call(self, func: Callable[..., T], *args: Any) -> T:
+        assert self._cache is not None
+        if self._cache.backend.blocking:
+            # 磁盘缓存在线程中读写，避免阻塞事件循环
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def _cached_request(self, api_path: str, option: RequestOption) -> AsyncRequestResult:
+        assert self._cache is not None
+        key, api_uri = self._cache_key(api_path, option)
+        entry = await self._cache_call(self._cache.lookup, key)
+        if entry is not None and entry.is_fresh():
+            return AsyncRequestResult(entry.to_response(Request("GET", api_uri)), 0, True, json_codec=self._json_codec)
+
+        result = await self._send(HttpMethod.GET, api_path, self._revalidate_option(option, entry))
+        if entry is not None and result.status == 304:
+            async with result:
+                entry = await self._cache_call(self._cache.refresh, key, entry, result.headers)
+            return AsyncRequestResult(entry.to_response(Request("GET", api_uri)), result.attempts, True,
+                                      json_codec=self._json_codec)
+        if not self._cache.should_store(result.status, result.headers):
+            return result
+        response, complete = await aread_limited(result._response, self._cache.max_body_size)
+        if complete:
+            await self._cache_call(self._cache.store, key, result.status, result.headers, response.content)
+        return AsyncRequestResult(response, result.attempts, False, json_codec=self._json_codec)
+
+    async def _send(self, method: HttpMethod, api_path: str, option: RequestOption,
+                    create: Optional[Callable[[Optional[RequestTrace]], Request]] = None) -> AsyncRequestResult:
+        retry = self._get_retry(option)
+        attempt = 0
+        while True:
+            attempt += 1
+            # 熔断器打开时直接失败，不占用限流令牌，也不签名和触发hooks
+            circuit = self._circuit_allow(method, api_path)
+            trace = None
+            try:
+                # 按RateLimiter的限制等待，重试也需要获取令牌
+                wait = self._rate_delay(api_path)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                # 每次尝试都重新创建请求，重新生成Date头或Expires签名参数
+                trace = self._hooks.begin(method, api_path, attempt, True)
+                if create is not None:
+                    req = create(trace)
+                else:
+                    req = self._create_request(method, api_path, option, trace)
+                response = await self._client.send(req, stream=True)
+            except TransportError as e:
+                self._circuit_record(circuit, error=e)
+                if trace:
+                    trace.fail(e)
+                await asyncio.sleep(self._check_exception(retry, method, attempt, e))
+                continue
+            except BaseException as e:
+                # 不是网络错误时只释放半开状态的探测名额
+                self._circuit_record(circuit, error=e)
+                if trace:
+                    trace.fail(e)
+                raise
+            self._circuit_record(circuit, response.status_code)
+            if self._clock.adjusting:
+                self._clock.observe(response.headers.get(HttpHeaderNames.DATE))
+
+            if trace:
+                trace.response_headers(response)
+            if not response.is_error:
+                self._check_success(api_path)
+                return AsyncRequestResult(response, attempt, json_codec=self._json_codec)
+            data = await aread_error_body(response)
+            try:
+                delay = self._check_error(retry, method, api_path, attempt, response, data)
+            except OpenApiResponseError as e:
+                if trace:
+                    trace.fail(e)
+                raise
+            if trace:
+                trace.body_complete()
+            await asyncio.sleep(delay)
+
+    def batch(self, items: Iterable[BatchItemTypes], concurrency: int = 10,
+              ordered: bool = False) -> AsyncIterator[BatchResult]:
+        '''
+        批量执行(method, api_path, RequestOption)请求，最多concurrency个请求同时进行。
+        单个请求的OpenApiResponseError或网络错误记录在BatchResult.error中，不会中断整个批次
+        '''
+        return run_batch(self.request, items, concurrency, ordered)
@@ -0,0 +1,102 @@
+from typing import Optional, Callable, Any
+
+from .error import OpenApiClientError, OpenApiResponseError
+from .hooks import RequestHooks, RequestInfo
+from .utility import template_path
+
+_SPAN = "otel.span"
+_ATTRIBUTES = "otel.attributes"
+
+
+class OpenTelemetryHooks(RequestHooks):
+    '''
+    为每次请求(包括重试)创建CLIENT类型的span，并记录请求时长和进行中的请求数。
+    创建实例时才导入opentelemetry，需要安装opentelemetry-api: pip install opentelemetry-api
+    '''
+    _tracer: Any
+    _duration: Any
+    _in_flight: Any
+    _template: Callable[[str], str]
+    _propagate: bool
+
+    def __init__(self, tracer_provider: Any = None, meter_provider: Any = None,
+                 path_template: Optional[Callable[[str], str]] = None, propagate: bool = True):
+        try:
+            from opentelemetry import trace, metrics
+        except ImportError:
+            raise OpenApiClientError("启用OpenTelemetry需要安装opentelemetry-api: pip install opentelemetry-api")
+
+        self._tracer = trace.get_tracer(__name__, tracer_provider=tracer_provider)
+        meter = metrics.get_meter(__name__, meter_provider=meter_provider)
+        self._duration = meter.create_histogram(
+            "openapi.client.request.duration", unit="s", description="api网关请求的时长")
+        self._in_flight = meter.create_up_down_counter(
+            "openapi.client.active_requests", unit="{request}", description="进行中的api网关请求数")
+        self._template = path_template or template_path
+        self._propagate = propagate
+
+    def before_sign(self, info: RequestInfo):
+        from opentelemetry import trace, propagate
+
+        api_path = self._template(info.api_path)
+        attributes = {"http.request.method": info.method, "url.template": api_path}
+        span = self._tracer.start_span("%s %s" % (info.method, api_path), kind=trace.SpanKind.CLIENT,
+                                       attributes=attributes)
+        if info.attempt > 1:
+            span.set_attribute("http.request.resend_count", info.attempt - 1)
+        if self._propagate and info.request is not None:
+            # traceparent等头不以x-iwop-开头，不参与签名
+            propagate.inject(info.request.headers, context=trace.set_span_in_context(span))
+        info.context[_SPAN] = span
+        info.context[_ATTRIBUTES] = attributes
+        self._in_flight.add(1, attributes)
+
+    def after_sign(self, info: RequestInfo):
+        span = info.context.get(_SPAN)
+        if span is not None:
+            span.add_event("signed")
+            if info.bytes_sent is not None:
+                span.set_attribute("http.request.body.size", info.bytes_sent)
+
+    def response_headers(self, info: RequestInfo):
+        span = info.context.get(_SPAN)
+        if span is not None:
+            span.set_attribute("http.response.status_code", info.status)
+            span.add_event("response_headers")
+
+    def _end(self, info: RequestInfo, elapsed: Optional[float]):
+        from opentelemetry.trace import Status, StatusCode
+
+        span = info.context.pop(_SPAN, None)
+        if span is None:
+            return
+        attributes = info.context.pop(_ATTRIBUTES)
+        self._in_flight.add(-1, attributes)
+
+        span.set_attribute("http.response.body.size", info.bytes_received)
+        metric_attributes = dict(attributes)
+        if info.status is not None:
+            metric_attributes["http.response.status_code"] = info.status
+        error = info.error
+        if isinstance(error, OpenApiResponseError):
+            span.set_attribute("openapi.error.code", error.error.code)
+            span.set_attribute("openapi.attempts", error.attempts)
+        if error is not None:
+            metric_attributes["error.type"] = type(error).__name__
+            span.set_attribute("error.type", type(error).__name__)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+        elif info.status is not None and info.status >= 400:
+            metric_attributes["error.type"] = str(info.status)
+            span.set_status(Status(StatusCode.ERROR))
+        if elapsed is not None:
+            self._duration.record(elapsed, metric_attributes)
+        span.end()
+
+    def body_complete(self, info: RequestInfo):
+        self._end(info, info.elapsed(RequestInfo.EVENT_BODY_COMPLETE))
+
+    def error(self, info: RequestInfo):
+        span = info.context.get(_SPAN)
+        if span is not None and info.error is not None:
+            span.record_exception(info.error)
+        self._end(info, info.elapsed(RequestInfo.EVENT_ERROR))
@@ -0,0 +1,208 @@
+import asyncio
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Union, Iterator, AsyncIterator, Awaitable, Deque, Tuple
+
+Json = Any
+PageParams = Dict[str, Any]
+Extractor = Union[str, Callable[[Json], Any]]
+
+
+def _extract(page: Json, extractor: Optional[Extractor]) -> Any:
+    '''
+    按用.分隔的路径(例如"data.items")或函数从返回的json中取值，路径不存在时返回None
+    '''
+    if extractor is None:
+        return None
+    if callable(extractor):
+        return extractor(page)
+    value = page
+    for name in extractor.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+class PageStrategy(ABC):
+    '''
+    分页策略，生成每一页请求的query参数并从返回的json中取出数据项。
+    items为数据项列表的路径或函数，返回的json本身是列表时直接作为数据项
+    '''
+    _items: Extractor
+
+    def __init__(self, items: Extractor = "items"):
+        self._items = items
+
+    def get_items(self, page: Json) -> List[Any]:
+        if isinstance(page, list):
+            return page
+        return _extract(page, self._items) or []
+
+    @abstractmethod
+    def first(self) -> PageParams:
+        '''
+        第一页的query参数
+        '''
+        pass
+
+    @abstractmethod
+    def next(self, params: PageParams, page: Json) -> Optional[PageParams]:
+        '''
+        根据当前页的参数和返回内容获取下一页的query参数，没有下一页时返回None
+        '''
+        pass
+
+    def advance(self, params: PageParams) -> Optional[PageParams]:
+        '''
+        不依赖返回内容推算下一页的参数，用于预取；无法推算(例如游标分页)时返回None
+        '''
+        return None
+
+
+class _SizedStrategy(PageStrategy):
+    _size: int
+    _total: Optional[Extractor]
+
+    def __init__(self, size: int, items: Extractor, total: Optional[Extractor]):
+        assert size > 0
+        super().__init__(items)
+        self._size = size
+        self._total = total
+
+    @abstractmethod
+    def _end(self, params: PageParams) -> int:
+        '''
+        当前页最后一项之后的位置
+        '''
+        pass
+
+    def next(self, params: PageParams, page: Json) -> Optional[PageParams]:
+        if len(self.get_items(page)) < self._size:
+            return None
+        total = _extract(page, self._total)
+        if total is not None and self._end(params) >= int(total):
+            return None
+        return self.advance(params)
+
+
+class PageNumberStrategy(_SizedStrategy):
+    '''
+    按页码分页，返回的数据项少于size或达到total时结束
+    '''
+    _page_param: str
+    _size_param: str
+    _start: int
+
+    def __init__(self, size: int = 100, page_param: str = "page", size_param: str = "size", start: int = 1,
+                 items: Extractor = "items", total: Optional[Extractor] = None):
+        super().__init__(size, items, total)
+        self._page_param = page_param
+        self._size_param = size_param
+        self._start = start
+
+    def first(self) -> PageParams:
+        return {self._page_param: self._start, self._size_param: self._size}
+
+    def _end(self, params: PageParams) -> int:
+        return (params[self._page_param] - self._start + 1) * self._size
+
+    def advance(self, params: PageParams) -> Optional[PageParams]:
+        return {**params, self._page_param: params[self._page_param] + 1}
+
+
+class OffsetStrategy(_SizedStrategy):
+    '''
+    按偏移量(start/limit)分页，返回的数据项少于limit或达到total时结束
+    '''
+    _offset_param: str
+    _limit_param: str
+
+    def __init__(self, limit: int = 100, offset_param: str = "start", limit_param: str = "limit",
+                 items: Extractor = "items", total: Optional[Extractor] = None):
+        super().__init__(limit, items, total)
+        self._offset_param = offset_param
+        self._limit_param = limit_param
+
+    def first(self) -> PageParams:
+        return {self._offset_param: 0, self._limit_param: self._size}
+
+    def _end(self, params: PageParams) -> int:
+        return params[self._offset_param] + self._size
+
+    def advance(self, params: PageParams) -> Optional[PageParams]:
+        return {**params, self._offset_param: params[self._offset_param] + self._size}
+
+
+class CursorStrategy(PageStrategy):
+    '''
+    按游标分页，next_cursor为返回内容中下一页游标的路径或函数，游标为空时结束。下一页依赖当前页的返回内容，不能预取
+    '''
+    _cursor_param: str
+    _next_cursor: Extractor
+    _size: Optional[int]
+    _size_param: str
+
+    def __init__(self, next_cursor: Extractor = "next_cursor", cursor_param: str = "cursor",
+                 size: Optional[int] = None, size_param: str = "size", items: Extractor = "items"):
+        super().__init__(items)
+        self._cursor_param = cursor_param
+        self._next_cursor = next_cursor
+        self._size = size
+        self._size_param = size_param
+
+    def first(self) -> PageParams:
+        return {self._size_param: self._size} if self._size else {}
+
+    def next(self, params: PageParams, page: Json) -> Optional[PageParams]:
+        cursor = _extract(page, self._next_cursor)
+        if cursor is None or cursor == "":
+            return None
+        return {**params, self._cursor_param: cursor}
+
+
+def iter_pages(fetch: Callable[[PageParams], Json], strategy: PageStrategy) -> Iterator[Json]:
+    params: Optional[PageParams] = strategy.first()
+    while params is not None:
+        page = fetch(params)
+        yield page
+        params = strategy.next(params, page)
+
+
+async def aiter_pages(fetch: Callable[[PageParams], Awaitable[Json]], strategy: PageStrategy,
+                      prefetch: int = 0) -> AsyncIterator[Json]:
+    '''
+    prefetch大于0且策略可以推算后续页时，处理当前页的同时最多预取prefetch页。
+    最后一页之后已预取的请求会被取消或丢弃
+    '''
+    params: Optional[PageParams] = strategy.first()
+    if prefetch <= 0 or strategy.advance(params) is None:
+        while params is not None:
+            page = await fetch(params)
+            yield page
+            params = strategy.next(params, page)
+        return
+
+    pending: Deque[Tuple[PageParams, "asyncio.Future[Json]"]] = deque()
+
+    def schedule(p: PageParams):
+        pending.append((p, asyncio.ensure_future(fetch(p))))
+
+    schedule(params)
+    try:
+        while pending:
+            while len(pending) <= prefetch:
+                following = strategy.advance(pending[-1][0])
+                if following is None:
+                    break
+                schedule(following)
+            params, task = pending.popleft()
+            page = await task
+            yield page
+            if strategy.next(params, page) is None:
+                return
+    finally:
+        for _, task in pending:
+            task.cancel()
+        await asyncio.gather(*[task for _, task in pending], return_exceptions=True)
@@ -0,0 +1,247 @@
+import asyncio
+import threading
+import httpx
+
+from typing import NamedTuple, Optional, Dict, Any, Iterator, AsyncIterator, Callable
+
+from .error import OpenApiClientError
+
+
+class PoolOption(NamedTuple):
+    '''
+    连接池配置。api网关只有一个host，因此max_connections即为单个host的最大连接数
+    '''
+    # 连接池允许的最大连接数，None表示不限制
+    max_connections: Optional[int] = 100
+    # 保持keep-alive的最大空闲连接数，None表示不限制
+    max_keepalive_connections: Optional[int] = 50
+    # 空闲连接的保持时间，单位秒
+    keepalive_expiry: Optional[float] = 30.0
+    # 是否启用http2多路复用，需要安装h2: pip install httpx[http2]
+    http2: bool = False
+    # 启用http2时每个连接上同时进行的最大请求数，None表示由服务端的SETTINGS_MAX_CONCURRENT_STREAMS决定
+    max_concurrent_streams: Optional[int] = None
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _max_in_flight(self) -> Optional[int]:
+        if not self.http2 or not self.max_concurrent_streams or not self.max_connections:
+            return None
+        return self.max_concurrent_streams * self.max_connections
+
+    def _check_http2(self):
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                raise OpenApiClientError("启用http2需要安装h2: pip install httpx[http2]")
+
+    def create_transport(self) -> httpx.BaseTransport:
+        self._check_http2()
+        transport: httpx.BaseTransport = httpx.HTTPTransport(limits=self.limits(), http2=self.http2)
+        max_in_flight = self._max_in_flight()
+        if max_in_flight:
+            transport = _StreamLimitTransport(transport, max_in_flight)
+        return transport
+
+    def create_async_transport(self) -> httpx.AsyncBaseTransport:
+        self._check_http2()
+        transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=self.limits(), http2=self.http2)
+        max_in_flight = self._max_in_flight()
+        if max_in_flight:
+            transport = _AsyncStreamLimitTransport(transport, max_in_flight)
+        return transport
+
+    def _client_kwargs(self, is_async: bool) -> Dict[str, Any]:
+        '''
+        创建httpx客户端的参数。无需限制并发stream时交给httpx创建连接池，以保留环境变量中的代理设置
+        '''
+        if self._max_in_flight():
+            return {'transport': self.create_async_transport() if is_async else self.create_transport()}
+        self._check_http2()
+        return {'limits': self.limits(), 'http2': self.http2}
+
+
+class _LimitedStream(httpx.SyncByteStream):
+    '''
+    返回内容读取完毕或关闭时释放并发名额
+    '''
+    _stream: httpx.SyncByteStream
+    _release: Optional[Callable[[], None]]
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class _AsyncLimitedStream(httpx.AsyncByteStream):
+    _stream: httpx.AsyncByteStream
+    _release: Optional[Callable[[], None]]
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class _StreamLimitTransport(httpx.BaseTransport):
+    '''
+    限制同时进行的请求数，请求占用的名额在返回内容关闭后释放
+    '''
+    _transport: httpx.BaseTransport
+    _semaphore: threading.BoundedSemaphore
+
+    def __init__(self, transport: httpx.BaseTransport, max_in_flight: int):
+        self._transport = transport
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._semaphore.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        assert isinstance(response.stream, httpx.SyncByteStream)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_LimitedStream(response.stream, self._semaphore.release),
+                              extensions=response.extensions)
+
+    def close(self):
+        self._transport.close()
+
+
+class _AsyncStreamLimitTransport(httpx.AsyncBaseTransport):
+    _transport: httpx.AsyncBaseTransport
+    _semaphore: asyncio.BoundedSemaphore
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_in_flight: int):
+        self._transport = transport
+        self._semaphore = asyncio.BoundedSemaphore(max_in_flight)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        assert isinstance(response.stream, httpx.AsyncByteStream)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_AsyncLimitedStream(response.stream, self._semaphore.release),
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _SharedTransport(httpx.BaseTransport):
+    '''
+    包装共享连接池，关闭客户端时不关闭底层连接池
+    '''
+    _transport: httpx.BaseTransport
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport.handle_request(request)
+
+    def close(self):
+        pass
+
+
+class _AsyncSharedTransport(httpx.AsyncBaseTransport):
+    _transport: httpx.AsyncBaseTransport
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+class ConnectionPool:
+    '''
+    可在多个OpenApiClient之间共享的连接池，各客户端可使用不同的accessId/secret
+    '''
+    _option: PoolOption
+    _transport: httpx.BaseTransport
+
+    def __init__(self, option: Optional[PoolOption] = None, transport: Optional[httpx.BaseTransport] = None):
+        self._option = option or PoolOption()
+        self._transport = transport or self._option.create_transport()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    @property
+    def option(self) -> PoolOption:
+        return self._option
+
+    def _share(self) -> httpx.BaseTransport:
+        return _SharedTransport(self._transport)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncConnectionPool:
+    '''
+    可在多个AsyncOpenApiClient之间共享的连接池，各客户端可使用不同的accessId/secret
+    '''
+    _option: PoolOption
+    _transport: httpx.AsyncBaseTransport
+
+    def __init__(self, option: Optional[PoolOption] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._option = option or PoolOption()
+        self._transport = transport or self._option.create_async_transport()
+
+    async def __aenter__(self) -> "AsyncConnectionPool":
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None):
+        await self.aclose()
+
+    @property
+    def option(self) -> PoolOption:
+        return self._option
+
+    def _share(self) -> httpx.AsyncBaseTransport:
+        return _AsyncSharedTransport(self._transport)
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,93 @@
+import re
+
+from typing import Any, Iterable, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlencode, quote_plus
+
+from httpx import URL
+
+from .clock import SigningClock
+from .signed_by import SignedByQuery, QuerySignatureParams
+from .utility import HttpMethod, SignatureOption, Signer, generate_signature
+
+PresignItem = Tuple[Union[HttpMethod, str], str, Optional[Mapping[str, Any]]]
+
+# 不需要httpx再编码的绝对路径，可以直接拼接在host之后，结果与URL.join相同。
+# //开头会被解析为host，/.开头的段可能是需要规范化的.和..，这些路径都由URL.join处理
+_PLAIN_PATH = re.compile(r"/(?![/.])(?:[A-Za-z0-9\-._~!$&'()*+,;=:@%]|/(?!\.))*(\?[A-Za-z0-9\-._~!$&'()*+,;=:@/%?]*)?")
+# quote_plus不会编码的字符
+_PLAIN_VALUE = re.compile(r"[A-Za-z0-9_.\-~]*")
+# base64签名中需要编码的字符
+_SIGNATURE_ESCAPES = str.maketrans({"+": "%2B", "/": "%2F", "=": "%3D"})
+_NO_HEADERS: Mapping[str, str] = {}
+
+
+def _quote(value: str) -> str:
+    return value if _PLAIN_VALUE.fullmatch(value) else quote_plus(value)
+
+
+def _encode_query(query: Mapping[str, Any]) -> str:
+    '''
+    与urlencode结果相同，不需要编码的值直接拼接
+    '''
+    return "&".join(_quote(name) + "=" + _quote(value if isinstance(value, str) else str(value))
+                    for name, value in query.items())
+
+
+class Presigner:
+    '''
+    批量生成SignedByQuery方式签名的url，不发送请求。同一批url共用签名密钥状态和Expires，
+    路径为普通的绝对路径时直接与网关地址拼接，不经过url解析
+    '''
+    _base_uri: URL
+    _origin: str
+    _access_id: str
+    _secret_key: str
+    _signer: Signer
+    _clock: SigningClock
+
+    def __init__(self, base_uri: URL, access_id: str, secret_key: str, signer: Signer, clock: SigningClock):
+        self._base_uri = base_uri
+        # 去掉结尾的/，例如https://api.mctech.vip
+        self._origin = str(base_uri.join("/"))[:-1]
+        self._access_id = access_id
+        self._secret_key = secret_key
+        self._signer = signer
+        self._clock = clock
+
+    def url(self, api_path: str, query: Optional[Mapping[str, Any]] = None) -> str:
+        if _PLAIN_PATH.fullmatch(api_path):
+            url = self._origin + api_path
+        else:
+            url = str(self._base_uri.join(api_path))
+        if query:
+            if "?" in url:
+                # 与请求时相同，按名称合并api_path中已有的query，同名时使用query的值
+                return str(URL(url).copy_merge_params({name: value if isinstance(value, str) else str(value)
+                                                       for name, value in query.items()}))
+            url += "?" + _encode_query(query)
+        return url
+
+    def presign(self, items: Iterable[PresignItem], duration: Optional[int] = None,
+                content_type: Optional[str] = None) -> List[str]:
+        '''
+        为每个(method, api_path, query)生成签名后的url，duration为有效时间(秒)，None时使用默认的有效时间
+        '''
+        signed_by = SignedByQuery(QuerySignatureParams(duration) if duration else None)
+        # 整批使用同一个时间，所有url的Expires相同
+        now = self._clock.now()
+        clock = SigningClock(lambda: now)
+        urls = []
+        # AccessId和Expires在整批中相同，只编码一次
+        prefix = None
+        for method, api_path, query in items:
+            if not isinstance(method, HttpMethod):
+                method = HttpMethod(method.upper())
+            url = self.url(api_path, query)
+            option = SignatureOption(self._access_id, self._secret_key, url, method, content_type, _NO_HEADERS)
+            info = generate_signature(signed_by, option, self._signer, clock)
+            if prefix is None:
+                prefix = urlencode({name: value for name, value in info.query.items() if name != "Signature"}) \
+                    + "&Signature="
+            urls.append(url + ("&" if "?" in url else "?") + prefix + info.query["Signature"].translate(
+                _SIGNATURE_ESCAPES))
+        return urls
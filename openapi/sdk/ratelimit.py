@@ -0,0 +1,175 @@
+import fnmatch
+import threading
+import time
+import httpx
+
+from typing import NamedTuple, Optional, Mapping, Iterable, Dict, Tuple, List, FrozenSet
+
+from .retry import _parse_retry_after
+
+
+class RateLimit(NamedTuple):
+    # 每秒允许的请求数
+    rate: float
+    # 令牌桶容量，即允许的突发请求数，None表示与rate相同(至少为1)
+    burst: Optional[float] = None
+
+
+class TokenBucket:
+    '''
+    令牌桶，线程安全。获取令牌时预约一个令牌并返回需要等待的时间，令牌不足时令牌数可以为负，
+    因此等待期间不需要持有锁，同步和异步调用方可以共用
+    '''
+    _limit: RateLimit
+    _rate: float
+    _capacity: float
+    _tokens: float
+    _updated: float
+    # 在此之前暂停发放令牌，time.monotonic()的值
+    _paused_until: float
+    # 在此之前不再降低速率，避免同时返回的多个限流响应连续降低速率
+    _cooldown_until: float
+    _lock: threading.Lock
+
+    def __init__(self, limit: RateLimit):
+        assert limit.rate > 0
+        self._limit = limit
+        self._rate = limit.rate
+        self._capacity = limit.burst if limit.burst else max(1.0, limit.rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        '''
+        当前的速率，被限流后会低于配置的速率
+        '''
+        return self._rate
+
+    def _refill(self, now: float):
+        # 暂停期间不发放令牌
+        elapsed = now - max(self._updated, self._paused_until)
+        if elapsed > 0:
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        '''
+        预约一个令牌，返回需要等待的时间，单位秒
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(0.0, self._paused_until - now)
+            return wait if self._tokens >= 0 else wait - self._tokens / self._rate
+
+    def throttle(self, factor: float, min_ratio: float, pause: Optional[float] = None, cooldown: float = 1.0):
+        '''
+        按factor降低速率，最低为配置速率的min_ratio倍；pause不为None时在pause秒内不再发放令牌。
+        降低速率后cooldown秒内(以及暂停期间)再次限流只延长暂停时间，不再降低速率
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if pause:
+                self._tokens = min(self._tokens, 0.0)
+                self._paused_until = max(self._paused_until, now + pause)
+            if now >= self._cooldown_until:
+                self._rate = max(self._limit.rate * min_ratio, self._rate * factor)
+                self._cooldown_until = max(now + cooldown, self._paused_until)
+
+    def recover(self, step: float):
+        '''
+        请求成功时逐步恢复到配置的速率
+        '''
+        if self._rate >= self._limit.rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = min(self._limit.rate, self._rate + self._limit.rate * step)
+
+
+class RateLimiter:
+    '''
+    按accessId和api_path限制请求速率，可以在多个客户端之间共享。
+    default为每个accessId的限制；paths为api_path的通配符模式(fnmatch)到限制的映射，同样按accessId分别计算，
+    请求使用第一个匹配的模式。收到throttle_statuses中的状态码或throttle_codes中的网关错误码时降低速率，
+    并按Retry-After暂停，之后每个成功的请求恢复recover_step倍的配置速率。
+    降低速率后cooldown秒内以及暂停期间收到的限流响应不再降低速率
+    '''
+    DEFAULT_STATUSES: FrozenSet[int] = frozenset({429})
+
+    _default: Optional[RateLimit]
+    _paths: List[Tuple[str, RateLimit]]
+    _statuses: FrozenSet[int]
+    _codes: FrozenSet[str]
+    _decrease: float
+    _recover_step: float
+    _min_ratio: float
+    _cooldown: float
+    _buckets: Dict[Tuple[str, Optional[str]], TokenBucket]
+    _lock: threading.Lock
+
+    def __init__(self, default: Optional[RateLimit] = None, paths: Optional[Mapping[str, RateLimit]] = None,
+                 throttle_statuses: Iterable[int] = DEFAULT_STATUSES, throttle_codes: Iterable[str] = (),
+                 decrease: float = 0.5, recover_step: float = 0.05, min_ratio: float = 0.1, cooldown: float = 1.0):
+        assert 0 < decrease <= 1 and 0 < min_ratio <= 1 and cooldown >= 0
+        self._default = default
+        self._paths = list((paths or {}).items())
+        self._statuses = frozenset(throttle_statuses)
+        self._codes = frozenset(throttle_codes)
+        self._decrease = decrease
+        self._recover_step = recover_step
+        self._min_ratio = min_ratio
+        self._cooldown = cooldown
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _get_bucket(self, key: Tuple[str, Optional[str]], limit: RateLimit) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(limit)
+        return bucket
+
+    def buckets(self, access_id: str, api_path: str) -> Tuple[TokenBucket, ...]:
+        buckets = []
+        if self._default is not None:
+            buckets.append(self._get_bucket((access_id, None), self._default))
+        path = api_path.split("?", 1)[0]
+        for pattern, limit in self._paths:
+            if fnmatch.fnmatchcase(path, pattern):
+                buckets.append(self._get_bucket((access_id, pattern), limit))
+                break
+        return tuple(buckets)
+
+    def reserve(self, access_id: str, api_path: str) -> float:
+        '''
+        预约发送一个请求，返回发送前需要等待的时间，单位秒
+        '''
+        delay = 0.0
+        for bucket in self.buckets(access_id, api_path):
+            delay = max(delay, bucket.reserve())
+        return delay
+
+    @property
+    def throttle_codes(self) -> FrozenSet[str]:
+        return self._codes
+
+    def is_throttled(self, status: int, code: Optional[str] = None) -> bool:
+        return status in self._statuses or (code is not None and code in self._codes)
+
+    def throttle(self, access_id: str, api_path: str, response: Optional[httpx.Response] = None):
+        pause = _parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        for bucket in self.buckets(access_id, api_path):
+            bucket.throttle(self._decrease, self._min_ratio, pause, self._cooldown)
+
+    def recover(self, access_id: str, api_path: str):
+        for bucket in self.buckets(access_id, api_path):
+            bucket.recover(self._recover_step)
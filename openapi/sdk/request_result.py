@@ -1,45 +1,289 @@
+import io
+import asyncio
 import httpx
 import json
 
-from typing import Any
+from typing import Any, Optional, List, Iterable, Iterator, AsyncIterable, AsyncIterator, Type, TypeVar
+
+from .json_stream import iter_json_items, aiter_json_items
+from .download import DEFAULT_CHUNK_SIZE
+from .codec import JsonCodec, default_codec
+
+T = TypeVar("T")
+
+
+class _LineSplitter:
+    '''
+    把连续的数据块拆分为行，返回的行不包含换行符
+    '''
+    _pending: bytes
+
+    def __init__(self):
+        self._pending = b''
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        lines = (self._pending + chunk).splitlines(keepends=True)
+        self._pending = b''
+        # 最后一行可能不完整；以\r结尾时可能还有后续的\n
+        if lines and (not lines[-1].endswith(b'\n')):
+            self._pending = lines.pop()
+        return [line.rstrip(b'\r\n') for line in lines]
+
+    def flush(self) -> List[bytes]:
+        pending = self._pending
+        self._pending = b''
+        return [pending.rstrip(b'\r\n')] if pending else []
 
 
 class SyncResponseDataStream:
+    '''
+    返回结果的只读流。直接迭代时逐块返回数据，chunk_size不为None时每块大小为chunk_size(最后一块可能较小)，
+    需要文件对象时使用as_file()
+    '''
     _stream: httpx.SyncByteStream
+    _chunk_size: Optional[int]
+    _source: Iterator[bytes]
+    # 上次读取后剩余的数据
+    _view: memoryview
+    _closed: bool
 
-    def __init__(self, stream: httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, chunk_size: Optional[int] = None,
+                 chunks: Optional[Iterable[bytes]] = None):
+        '''
+        chunks不为None时从chunks读取数据(例如解压后的内容)，stream只用于关闭
+        '''
+        assert chunk_size is None or chunk_size > 0
         self._stream = stream
+        self._chunk_size = chunk_size
+        self._source = _rechunk(stream if chunks is None else chunks, chunk_size)
+        self._view = memoryview(b'')
+        self._closed = False
 
-    def __iter__(self):
-        gen = self._stream.__iter__()
-        while True:
-            try:
-                yield gen.__next__()
-            except StopAsyncIteration:
-                break
+    def __enter__(self) -> "SyncResponseDataStream":
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        self.close()
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._view:
+            yield self._take(len(self._view))
+        yield from self._source
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _take(self, size: int) -> bytes:
+        data = self._view[:size].tobytes()
+        self._view = self._view[size:]
+        return data
+
+    def _fill(self) -> bool:
+        if not self._view:
+            chunk = next(self._source, None)
+            if chunk is None:
+                return False
+            self._view = memoryview(chunk)
+        return True
+
+    def readinto(self, buffer) -> int:
+        '''
+        把数据直接读入调用方提供的bytearray/memoryview，直到填满或数据结束，返回读取的字节数
+        '''
+        target = memoryview(buffer).cast('B')
+        total = 0
+        while total < len(target) and self._fill():
+            size = min(len(target) - total, len(self._view))
+            target[total:total + size] = self._view[:size]
+            self._view = self._view[size:]
+            total += size
+        return total
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        if not self._fill():
+            return b''
+        if len(self._view) >= size:
+            return self._take(size)
+        buffer = bytearray(size)
+        count = self.readinto(buffer)
+        return bytes(buffer[:count])
+
+    def readall(self) -> bytes:
+        return b''.join(self)
+
+    def iter_lines(self) -> Iterator[bytes]:
+        '''
+        逐行返回数据，返回的行不包含换行符
+        '''
+        splitter = _LineSplitter()
+        for chunk in self:
+            yield from splitter.feed(chunk)
+        yield from splitter.flush()
+
+    def as_file(self) -> io.RawIOBase:
+        '''
+        返回读取本流的io.RawIOBase，迭代时按行返回。可以再用io.BufferedReader或io.TextIOWrapper包装
+        '''
+        return _RawFile(self)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._stream.close()
+
+
+class _RawFile(io.RawIOBase):
+    '''
+    SyncResponseDataStream的文件对象适配，关闭时同时关闭SyncResponseDataStream
+    '''
+    _source: SyncResponseDataStream
+
+    def __init__(self, source: SyncResponseDataStream):
+        super().__init__()
+        self._source = source
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._source.readinto(buffer)
+
+    def readall(self) -> bytes:
+        return self._source.readall()
 
     def close(self):
-        self._stream.close()
+        if not self.closed:
+            self._source.close()
+        super().close()
 
 
 class AsyncResponseDataStream:
+    '''
+    返回结果的异步只读流。直接迭代时逐块返回数据，
+    chunk_size不为None时每块大小为chunk_size(最后一块可能较小)
+    '''
     _stream: httpx.AsyncByteStream
+    _chunk_size: Optional[int]
+    _source: AsyncIterator[bytes]
+    _view: memoryview
 
-    def __init__(self, stream: httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, chunk_size: Optional[int] = None,
+                 chunks: Optional[AsyncIterable[bytes]] = None):
+        assert chunk_size is None or chunk_size > 0
         self._stream = stream
+        self._chunk_size = chunk_size
+        self._source = _arechunk(stream if chunks is None else chunks, chunk_size)
+        self._view = memoryview(b'')
 
-    def __aiter__(self):
-        return self._stream.__aiter__()
+    async def __aenter__(self) -> "AsyncResponseDataStream":
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None):
+        await self.aclose()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if self._view:
+            yield self._take(len(self._view))
+        async for chunk in self._source:
+            yield chunk
+
+    def _take(self, size: int) -> bytes:
+        data = self._view[:size].tobytes()
+        self._view = self._view[size:]
+        return data
+
+    async def _fill(self) -> bool:
+        if not self._view:
+            try:
+                chunk = await self._source.__anext__()
+            except StopAsyncIteration:
+                return False
+            self._view = memoryview(chunk)
+        return True
+
+    async def readinto(self, buffer) -> int:
+        '''
+        把数据直接读入调用方提供的bytearray/memoryview，直到填满或数据结束，返回读取的字节数
+        '''
+        target = memoryview(buffer).cast('B')
+        total = 0
+        while total < len(target) and await self._fill():
+            size = min(len(target) - total, len(self._view))
+            target[total:total + size] = self._view[:size]
+            self._view = self._view[size:]
+            total += size
+        return total
+
+    async def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b''.join([chunk async for chunk in self])
+        if not await self._fill():
+            return b''
+        if len(self._view) >= size:
+            return self._take(size)
+        buffer = bytearray(size)
+        count = await self.readinto(buffer)
+        return bytes(buffer[:count])
+
+    async def iter_lines(self) -> AsyncIterator[bytes]:
+        '''
+        逐行返回数据，返回的行不包含换行符
+        '''
+        splitter = _LineSplitter()
+        async for chunk in self:
+            for line in splitter.feed(chunk):
+                yield line
+        for line in splitter.flush():
+            yield line
 
     async def aclose(self):
-        return self._stream.aclose()
+        await self._stream.aclose()
+
+
+def _rechunk(stream: Iterable[bytes], chunk_size: Optional[int]) -> Iterator[bytes]:
+    if chunk_size is None:
+        yield from stream
+        return
+    buffer = bytearray()
+    for chunk in stream:
+        buffer += chunk
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _arechunk(stream: AsyncIterable[bytes], chunk_size: Optional[int]) -> AsyncIterator[bytes]:
+    if chunk_size is None:
+        async for chunk in stream:
+            yield chunk
+        return
+    buffer = bytearray()
+    async for chunk in stream:
+        buffer += chunk
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
 
 
 class _Result:
     _response: httpx.Response
+    _attempts: int
+    _from_cache: bool
+    _json_codec: JsonCodec
 
-    def __init__(self, response: httpx.Response):
+    def __init__(self, response: httpx.Response, attempts: int = 1, from_cache: bool = False,
+                 json_codec: Optional[JsonCodec] = None):
         self._response = response
+        self._attempts = attempts
+        self._from_cache = from_cache
+        self._json_codec = json_codec or default_codec()
 
     @property
     def status(self) -> int:
@@ -48,6 +292,27 @@ class _Result:
         '''
         return self._response.status_code
 
+    @property
+    def attempts(self) -> int:
+        '''
+        获取请求的尝试次数，包含重试
+        '''
+        return self._attempts
+
+    @property
+    def from_cache(self) -> bool:
+        '''
+        返回内容是否来自ResponseCache，直接命中缓存时attempts为0
+        '''
+        return self._from_cache
+
+    @property
+    def headers(self) -> httpx.Headers:
+        '''
+        返回结果的http头
+        '''
+        return self._response.headers
+
     @property
     def content_type(self) -> str:
         _type = ''
@@ -55,6 +320,15 @@ class _Result:
             _type = self._response.headers.get('content-type')
         return _type or ''
 
+    def _decode_json(self, content: bytes, type: Optional[Type[T]], kwargs: dict) -> Any:
+        if kwargs:
+            return json.loads(content, **kwargs)
+        return self._json_codec.decode(content, type)
+
+    def _is_encoded(self) -> bool:
+        encoding = self._response.headers.get("content-encoding", "").strip().lower()
+        return encoding not in ("", "identity")
+
     def _get_encoding(self) -> str:
         encoding = self._response.encoding or 'utf-8'
         return encoding
@@ -68,6 +342,12 @@ class RequestResult(_Result):
         self._response.close()
         # self._response = None
 
+    def get_bytes(self) -> bytes:
+        '''
+        以bytes方式获取返回的内容
+        '''
+        return self._response.read()
+
     def get_string(self) -> str:
         '''
         以字符串方式获取返回的文本内容
@@ -75,20 +355,41 @@ class RequestResult(_Result):
         content = self._response.read()
         return str(content, encoding=self._get_encoding())
 
-    def get_json_object(self, **kwargs) -> Any:
+    def get_json_object(self, type: Optional[Type[T]] = None, **kwargs) -> Any:
         '''
-        获取Json方式表示的实体对象
+        获取Json方式表示的实体对象。type不为None时直接解析为指定的类型(dataclass、msgspec.Struct等)；
+        指定了json.loads的参数(例如object_hook)时使用标准库解析
         '''
         content = self._response.read()
-        return json.loads(content, **kwargs)
+        return self._decode_json(content, type, kwargs)
+
+    def iter_json_items(self, path: str = "*", chunk_size: Optional[int] = None, **kwargs) -> Iterator[Any]:
+        '''
+        以流的方式逐个获取path指定的json数组中的元素，不会把全部内容读入内存。
+        path示例：'*'表示顶层数组，'data.*'表示data属性对应的数组
+        '''
+        return iter_json_items(self._response.iter_bytes(chunk_size), path, self._get_encoding(), **kwargs)
+
+    def download_to(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        '''
+        把返回内容以流的方式写入文件，返回写入的字节数
+        '''
+        size = 0
+        with open(path, 'wb', buffering=chunk_size) as f:
+            for chunk in self.open_stream(chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+        return size
 
-    def open_stream(self) -> SyncResponseDataStream:
+    def open_stream(self, chunk_size: Optional[int] = None, decode: bool = True) -> SyncResponseDataStream:
         '''
-        获取返回结果的Stream
+        获取返回结果的Stream，chunk_size为迭代时每块数据的大小。
+        返回内容经过压缩(Content-Encoding)时边读取边解压，decode为False时返回压缩的原始内容
         '''
         s = self._response.stream
         if isinstance(s, httpx.SyncByteStream):
-            return SyncResponseDataStream(s)
+            chunks = self._response.iter_bytes() if decode and self._is_encoded() else None
+            return SyncResponseDataStream(s, chunk_size, chunks)
         raise RuntimeError('stream类型错误')
 
 
@@ -100,6 +401,12 @@ class AsyncRequestResult(_Result):
         await self._response.aclose()
         # self._response = None
 
+    async def get_bytes(self) -> bytes:
+        '''
+        以bytes方式获取返回的内容
+        '''
+        return await self._response.aread()
+
     async def get_string(self) -> str:
         '''
         以字符串方式获取返回的文本内容
@@ -107,18 +414,39 @@ class AsyncRequestResult(_Result):
         content = await self._response.aread()
         return str(content, encoding=self._get_encoding())
 
-    async def get_json_object(self, **kwargs) -> Any:
+    async def get_json_object(self, type: Optional[Type[T]] = None, **kwargs) -> Any:
         '''
-        获取Json方式表示的实体对象
+        获取Json方式表示的实体对象。type不为None时直接解析为指定的类型(dataclass、msgspec.Struct等)；
+        指定了json.loads的参数(例如object_hook)时使用标准库解析
         '''
         content = await self._response.aread()
-        return json.loads(content, **kwargs)
+        return self._decode_json(content, type, kwargs)
+
+    def iter_json_items(self, path: str = "*", chunk_size: Optional[int] = None, **kwargs) -> AsyncIterator[Any]:
+        '''
+        以流的方式逐个获取path指定的json数组中的元素，不会把全部内容读入内存。
+        path示例：'*'表示顶层数组，'data.*'表示data属性对应的数组
+        '''
+        return aiter_json_items(self._response.aiter_bytes(chunk_size), path, self._get_encoding(), **kwargs)
+
+    async def download_to(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        '''
+        把返回内容以流的方式写入文件，返回写入的字节数
+        '''
+        size = 0
+        with open(path, 'wb', buffering=chunk_size) as f:
+            async for chunk in await self.open_stream(chunk_size):
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+        return size
 
-    async def open_stream(self) -> AsyncResponseDataStream:
+    async def open_stream(self, chunk_size: Optional[int] = None, decode: bool = True) -> AsyncResponseDataStream:
         '''
-        获取返回结果的Stream
+        获取返回结果的Stream，chunk_size为迭代时每块数据的大小。
+        返回内容经过压缩(Content-Encoding)时边读取边解压，decode为False时返回压缩的原始内容
         '''
         s = self._response.stream
         if isinstance(s, httpx.AsyncByteStream):
-            return AsyncResponseDataStream(s)
+            chunks = self._response.aiter_bytes() if decode and self._is_encoded() else None
+            return AsyncResponseDataStream(s, chunk_size, chunks)
         raise RuntimeError('stream类型错误')
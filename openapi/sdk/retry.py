@@ -0,0 +1,93 @@
+import random
+import httpx
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Iterable, FrozenSet
+
+from .error import ApiGatewayErrorData
+from .utility import HttpMethod
+
+
+class RetryPolicy:
+    '''
+    请求失败时的重试策略。每次重试都会重新创建请求并重新签名。
+    可以继承此类并重写should_retry_status/should_retry_error/should_retry_exception/get_delay定制重试逻辑
+    '''
+    DEFAULT_STATUSES: FrozenSet[int] = frozenset({429, 502, 503, 504})
+    DEFAULT_METHODS: FrozenSet[HttpMethod] = frozenset({HttpMethod.GET, HttpMethod.PUT, HttpMethod.DELETE})
+
+    _max_attempts: int
+    _backoff_base: float
+    _backoff_max: float
+    _jitter: bool
+    _statuses: FrozenSet[int]
+    _codes: FrozenSet[str]
+    _methods: FrozenSet[HttpMethod]
+    _respect_retry_after: bool
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.2, backoff_max: float = 10.0,
+                 jitter: bool = True, statuses: Iterable[int] = DEFAULT_STATUSES, codes: Iterable[str] = (),
+                 methods: Iterable[HttpMethod] = DEFAULT_METHODS, respect_retry_after: bool = True):
+        assert max_attempts > 0
+        # 最大尝试次数，包含第一次请求
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._jitter = jitter
+        # 需要重试的http状态码
+        self._statuses = frozenset(statuses)
+        # 需要重试的api网关错误码(ApiGatewayErrorData.code)
+        self._codes = frozenset(codes)
+        # 允许重试的请求方式，其余请求方式只在连接尚未建立的错误时重试
+        self._methods = frozenset(methods)
+        self._respect_retry_after = respect_retry_after
+
+    @property
+    def max_attempts(self) -> int:
+        return self._max_attempts
+
+    def allow_method(self, method: HttpMethod) -> bool:
+        return method in self._methods
+
+    def should_retry_status(self, method: HttpMethod, status: int) -> bool:
+        return self.allow_method(method) and status in self._statuses
+
+    def should_retry_error(self, method: HttpMethod, status: int, error: ApiGatewayErrorData) -> bool:
+        return self.allow_method(method) and bool(self._codes) and error.code in self._codes
+
+    def should_retry_exception(self, method: HttpMethod, exc: Exception) -> bool:
+        if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            # 请求尚未发出，任何请求方式都可以安全重试
+            return True
+        return self.allow_method(method) and isinstance(exc, httpx.TransportError)
+
+    def get_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        '''
+        获取第attempt次请求失败后到下次请求前的等待时间，单位秒
+        '''
+        if response is not None and self._respect_retry_after:
+            retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self._backoff_max)
+
+        delay = min(self._backoff_max, self._backoff_base * (2 ** (attempt - 1)))
+        if self._jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,163 @@
+import string
+
+from typing import Any, Dict, Mapping, Optional, Tuple, List, Callable, TYPE_CHECKING
+from urllib.parse import quote, urlencode
+
+from httpx import Request, Timeout
+
+from .content import FileContent
+from .signed_by import SignedBy, SignedByHeader
+from .utility import HttpMethod, HttpHeaderNames, sorted_custom_headers
+
+if TYPE_CHECKING:
+    from .hooks import RequestTrace
+    from .open_api_client import _Client, RequestOption
+    from .request_result import RequestResult, AsyncRequestResult
+
+# 编译时代替路径参数的标记，拼接完url后再按标记拆分
+_MARKER = "__openapi_param_%d__"
+
+
+def _interleave(pieces: Tuple[str, ...], values: List[str]) -> str:
+    parts = [pieces[0]]
+    for value, piece in zip(values, pieces[1:]):
+        parts.append(value)
+        parts.append(piece)
+    return "".join(parts)
+
+
+class _Template:
+    '''
+    预先编译的请求模板。创建时完成url拼接、http头合并、静态query编码以及x-iwop-头的排序，
+    每次请求只需填入路径参数({name}形式)和变化的query、请求内容。模板请求不使用ResponseCache和single_flight
+    '''
+    _client: "_Client"
+    _method: HttpMethod
+    _option: "RequestOption"
+    _names: Tuple[str, ...]
+    _path_pieces: Tuple[str, ...]
+    _url_pieces: Tuple[str, ...]
+    _query_separator: str
+    _static_query: Mapping[str, str]
+    _query: str
+    _headers: Tuple[Tuple[str, str], ...]
+    _custom_headers: Tuple[Tuple[str, str], ...]
+    _signed_by: SignedBy
+    _content_type: str
+    _extensions: Dict[str, Any]
+
+    def __init__(self, client: "_Client", method: HttpMethod, api_path: str, option: "RequestOption",
+                 default_headers: Mapping[str, str], default_timeout: Timeout):
+        self._client = client
+        self._method = method
+        self._option = option
+
+        literals, names = [], []
+        for literal, name, _, _ in string.Formatter().parse(api_path):
+            literals.append(literal)
+            if name is not None:
+                names.append(name)
+        if len(literals) == len(names):
+            literals.append("")
+        self._names = tuple(names)
+        self._path_pieces = tuple(literals)
+        marked = _interleave(self._path_pieces, [_MARKER % i for i in range(len(names))])
+        url = str(client._base_uri.join(marked))
+        pieces = []
+        for i in range(len(names)):
+            piece, url = url.split(_MARKER % i, 1)
+            pieces.append(piece)
+        pieces.append(url)
+        self._url_pieces = tuple(pieces)
+        self._query_separator = "&" if "?" in url else "?"
+        self._static_query = option.query
+        self._query = urlencode(list(option.query.items()))
+
+        self._content_type = option.entity.content_type or client._CONTENT_TYPE_VALUE
+        headers = {name.lower(): (name, value) for name, value in default_headers.items()}
+        for name, value in option.headers.items():
+            headers[name.lower()] = (name, value)
+        headers[HttpHeaderNames.CONTENT_TYPE.lower()] = (HttpHeaderNames.CONTENT_TYPE, self._content_type)
+        self._headers = tuple(headers.values())
+        self._custom_headers = sorted_custom_headers(option.headers)
+        self._signed_by = option.signed_by or SignedByHeader()
+        timeout = Timeout(timeout=option.timeout, connect=5.0) if option.timeout and option.timeout > 0 \
+            else default_timeout
+        self._extensions = {"timeout": timeout.as_dict()}
+
+    @property
+    def method(self) -> HttpMethod:
+        return self._method
+
+    def format(self, params: Mapping[str, Any],
+               query: Optional[Mapping[str, Any]] = None) -> Tuple[str, str]:
+        '''
+        返回填入参数后的(api_path, url)。query与option中的query同名时使用query的值，与RequestOption.with_query一致
+        '''
+        if self._names:
+            values = [quote(str(params[name]), safe='') for name in self._names]
+            api_path = _interleave(self._path_pieces, values)
+            url = _interleave(self._url_pieces, values)
+        else:
+            api_path = self._path_pieces[0]
+            url = self._url_pieces[0]
+        encoded = self._query
+        if query:
+            if any(name in self._static_query for name in query):
+                merged = dict(self._static_query)
+                merged.update((name, str(value)) for name, value in query.items())
+                encoded = urlencode(list(merged.items()))
+            else:
+                extra = urlencode([(name, str(value)) for name, value in query.items()])
+                encoded = encoded + "&" + extra if encoded else extra
+        if encoded:
+            url = url + self._query_separator + encoded
+        return api_path, url
+
+    def _prepare(self, params: Mapping[str, Any], query: Optional[Mapping[str, Any]], json: Any,
+                 content: Any) -> Tuple[str, "RequestOption", Callable[[Optional["RequestTrace"]], Request]]:
+        api_path, url = self.format(params, query)
+        option = self._option
+        if json is not None or content is not None:
+            # 请求内容是否可以重试由每次的内容决定
+            option = option._replace(entity=option.entity._replace(content=content, json=json))
+        name, value, encoding = self._client._entity_args(option)
+
+        def create(trace: Optional["RequestTrace"]) -> Request:
+            headers = self._headers
+            if encoding:
+                headers = headers + ((HttpHeaderNames.CONTENT_ENCODING, encoding),)
+            body = value
+            if isinstance(body, FileContent):
+                headers = headers + (("Content-Length", str(len(body))),)
+                body = self._client._adapt_content(body)
+            kwargs = {name: body} if name else {}
+            req = Request(self._method.value, url, headers=headers, extensions=dict(self._extensions), **kwargs)
+            if trace:
+                trace.before_sign(req)
+            self._client._make_signature(req, self._signed_by, self._custom_headers)
+            if trace:
+                trace.after_sign(req)
+            return req
+        return api_path, option, create
+
+
+class RequestTemplate(_Template):
+    def request(self, params: Optional[Mapping[str, Any]] = None, /, *, query: Optional[Mapping[str, Any]] = None,
+                json: Any = None, content: Any = None, **kwargs: Any) -> "RequestResult":
+        '''
+        填入路径参数发送请求，路径参数可以通过params或关键字参数提供
+        '''
+        api_path, option, create = self._prepare((params | kwargs) if params else kwargs, query, json, content)
+        return self._client._send(self._method, api_path, option, create)
+
+
+class AsyncRequestTemplate(_Template):
+    async def request(self, params: Optional[Mapping[str, Any]] = None, /, *,
+                      query: Optional[Mapping[str, Any]] = None, json: Any = None, content: Any = None,
+                      **kwargs: Any) -> "AsyncRequestResult":
+        '''
+        填入路径参数发送请求，路径参数可以通过params或关键字参数提供
+        '''
+        api_path, option, create = self._prepare((params | kwargs) if params else kwargs, query, json, content)
+        return await self._client._send(self._method, api_path, option, create)
@@ -1,17 +1,17 @@
 ﻿import hmac
 import base64
 import hashlib
-import xml.etree.ElementTree as ET
+import re
 import httpx
 
 from enum import Enum
-from datetime import datetime, timezone
-from email.utils import format_datetime
-from typing import NamedTuple, Mapping, List, Tuple, Optional
+from functools import lru_cache
+from typing import NamedTuple, Mapping, List, Tuple, Optional, Sequence, Union
 from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
 
 from .signed_by import SignatureMode, SignedBy, SignedByQuery
 from .error import OpenApiClientError, ApiGatewayErrorData
+from .clock import SigningClock, DEFAULT_CLOCK
 
 
 __QUERY_ACCESS_ID = "AccessId"
@@ -21,12 +21,19 @@ __QUERY_KEYS = ["AccessId", "Signature", "Expires"]
 __CUSTOM_PREFIX = "x-iwop-"
 # 生成Query签名时间有效期默认值，单位秒
 __DEFAULT_EXPIRES = 30
+# 缓存规范化资源路径的url数量
+__RESOURCE_CACHE_SIZE = 1024
+# 路径中的数字、uuid和长的十六进制段视为参数
+__PATH_PARAM = re.compile(r'(?<=/)(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+                          r'|[0-9a-fA-F]{24,})(?=/|$)')
 
 
 class HttpHeaderNames:
     ACCEPT = "Accept"
+    ACCEPT_ENCODING = "Accept-Encoding"
     ACCEPT_LANGUAGE = "Accept-Language"
     AUTHORIZATION = "Authorization"
+    CONTENT_ENCODING = "Content-Encoding"
     CONTENT_TYPE = "Content-Type"
     DATE = "Date"
 
@@ -65,6 +72,16 @@ class SignatureOption(NamedTuple):
     content_type: Optional[str]
     # headers头
     headers: httpx.Headers
+    # 预先排序的x-iwop-头(名称为小写)，不为None时Header签名直接使用，不再从headers中提取
+    custom_headers: Optional[Sequence[Tuple[str, str]]] = None
+
+
+def sorted_custom_headers(headers: Mapping[str, str]) -> Tuple[Tuple[str, str], ...]:
+    '''
+    返回参与签名的x-iwop-头，名称转为小写并排序，可作为SignatureOption.custom_headers
+    '''
+    custom_map = __get_custom_map(list(headers.items()))
+    return tuple((key, custom_map[key]) for key in sorted(custom_map.keys()))
 
 
 def __get_custom_map(pairs: List[Tuple[str, str]]) -> Mapping[str, str]:
@@ -76,14 +93,54 @@ def __get_custom_map(pairs: List[Tuple[str, str]]) -> Mapping[str, str]:
     return iwopValues
 
 
-def __get_resource(requestUri: str) -> str:
+class Signer:
+    '''
+    绑定accessId/secret的签名器。预先计算HMAC密钥状态，每次签名只需复制该状态，
+    同一客户端的所有请求应复用同一个Signer
+    '''
+    _access_id: str
+    _mac: "hmac.HMAC"
+
+    def __init__(self, access_id: str, secret: str):
+        if not access_id:
+            raise OpenApiClientError("accessId不能为null或empty")
+        if not secret:
+            raise OpenApiClientError("secret不能为null或empty")
+        self._access_id = access_id
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha1)
+
+    @property
+    def access_id(self) -> str:
+        return self._access_id
+
+    def sign(self, signable: str) -> str:
+        mac = self._mac.copy()
+        mac.update(signable.encode())
+        return str(base64.b64encode(mac.digest()), 'UTF-8')
+
+    def generate(self, signed_by: SignedBy, option: "SignatureOption",
+                 clock: Optional[SigningClock] = None) -> "SignedInfo":
+        return generate_signature(signed_by, option, self, clock)
+
+
+@lru_cache(maxsize=32)
+def __get_signer(access_id: str, secret: str) -> Signer:
+    return Signer(access_id, secret)
+
+
+@lru_cache(maxsize=__RESOURCE_CACHE_SIZE)
+def __canonicalize(requestUri: str) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    '''
+    返回规范化后的资源路径以及url中的全部query参数。只解析一次url，结果按url缓存
+    '''
     # 解析 URL
     parsed_url = urlparse(requestUri)
     if not parsed_url.query:
-        return requestUri
+        return requestUri, ()
 
     # 解析查询部分为键值对列表
-    params: Mapping[str, str] = dict(parse_qsl(parsed_url.query))
+    pairs = tuple(parse_qsl(parsed_url.query))
+    params: Mapping[str, str] = dict(pairs)
     keys = [k for k in params.keys()]
     for key in keys:
         # 排除掉表用于认证的固定参数
@@ -100,57 +157,80 @@ def __get_resource(requestUri: str) -> str:
     # 将排序后的键值对列表重新编码为查询字符串
     sorted_query_string = urlencode(sorted_query_pairs)
     new_url = urlunparse(parsed_url._replace(query=sorted_query_string))
-    return new_url
+    return new_url, pairs
 
 
-def __compute_signature(mode: SignatureMode, option: SignatureOption, time: str) -> SignedData:
+def __get_resource(requestUri: str) -> str:
+    return __canonicalize(requestUri)[0]
+
+
+def request_key(method: HttpMethod, requestUri: str, headers: Mapping[str, str]) -> str:
+    '''
+    返回标识请求内容的键，由method、规范化的资源路径以及参与签名的x-iwop-参数(http头和query)组成，
+    不包含签名相关的参数
+    '''
+    resource, query_pairs = __canonicalize(requestUri)
+    custom_map = {**__get_custom_map(list(query_pairs)), **__get_custom_map(list(headers.items()))}
+    items = [method.value, resource]
+    for key in sorted(custom_map.keys()):
+        items.append(key + ":" + custom_map[key])
+    return "\n".join(items)
+
+
+def template_path(api_path: str) -> str:
+    '''
+    把api_path中的id替换为{id}，用于span名称、指标维度和熔断器的key，避免它们的数量随id无限增长
+    '''
+    return __PATH_PARAM.sub("{id}", api_path.split("?", 1)[0])
+
+
+def __compute_signature(mode: SignatureMode, option: SignatureOption, time: str, signer: Signer) -> SignedData:
     signable_items: List[str] = []
     signable_items.append(option.method.value.upper())
     if option.content_type:
         signable_items.append(option.content_type)
     signable_items.append(time)
+    canonicalized_resource, query_pairs = __canonicalize(option.request_uri)
     custom_map: Mapping[str, str]
-    if (mode == SignatureMode.HEADER):
+    if (mode == SignatureMode.HEADER and option.custom_headers is not None):
+        for key, value in option.custom_headers:
+            signable_items.append(key + ":" + value)
+        custom_map = {}
+    elif (mode == SignatureMode.HEADER):
         custom_map = __get_custom_map(list(option.headers.items()))
     elif (mode == SignatureMode.QUERY):
-        custom_map = __get_custom_map(parse_qsl(urlparse(option.request_uri).query))
+        custom_map = __get_custom_map(list(query_pairs))
     if custom_map:
         keys = [key for key in custom_map.keys()]
         keys.sort()
         for key in keys:
             signable_items.append(key + ":" + custom_map[key])
 
-    canonicalized_resource = __get_resource(option.request_uri)
     signable_items.append(canonicalized_resource)
 
     signable = "\n".join(signable_items)
-    signature = __hma_sha1(signable, option.secret)
+    signature = signer.sign(signable)
     return SignedData(signable, signature)
 
 
-def __hma_sha1(signable: str, secret: str) -> str:
-    byte_key = secret.encode()
-    digest = hmac.digest(byte_key, signable.encode(), hashlib.sha1)
-    signature = str(base64.b64encode(digest), 'UTF-8')
-    return signature
-
-
-def resolve_error(xml: str) -> ApiGatewayErrorData:
-    root = ET.fromstring(xml)
-    map = {}
-    for item in root.iter():
-        name = item.tag
-        value = item.text
-        map[name] = value
-
-    return ApiGatewayErrorData(map)
+def resolve_error(content: Union[str, bytes], encoding: Optional[str] = None) -> ApiGatewayErrorData:
+    '''
+    解析xml或json格式的网关错误内容，在第一次访问属性时才解析
+    '''
+    return ApiGatewayErrorData.from_content(content, encoding)
 
 
-def generate_signature(signed_by: SignedBy, option: SignatureOption) -> SignedInfo:
+def generate_signature(signed_by: SignedBy, option: SignatureOption, signer: Optional[Signer] = None,
+                       clock: Optional[SigningClock] = None) -> SignedInfo:
+    '''
+    clock为获取签名时间的时钟，None时使用本机时间
+    '''
     if not option.access_id:
         raise OpenApiClientError("accessId不能为null或empty")
     if not option.secret:
         raise OpenApiClientError("secret不能为null或empty")
+    signer = signer or __get_signer(option.access_id, option.secret)
+    clock = clock or DEFAULT_CLOCK
     method = option.method.value
     if (method == HttpMethod.POST or method == HttpMethod.PUT or method == HttpMethod.PATCH):
         if not option.content_type:
@@ -162,7 +242,7 @@ def generate_signature(signed_by: SignedBy, option: SignatureOption) -> SignedIn
     if isinstance(signed_by, SignedByQuery):
         p = signed_by.parameters
         d = p.duration if p and p.duration > 0 else __DEFAULT_EXPIRES
-        expires = d + int(datetime.now().timestamp())
+        expires = d + clock.timestamp()
         time = str(expires)
         query = {
             __QUERY_ACCESS_ID: option.access_id,
@@ -170,12 +250,12 @@ def generate_signature(signed_by: SignedBy, option: SignatureOption) -> SignedIn
             __QUERY_SIGNATURE: "",
         }
     else:
-        time = format_datetime(datetime.now(timezone.utc), True)
+        time = clock.http_date()
         headers = {
             HttpHeaderNames.DATE: time,
             HttpHeaderNames.AUTHORIZATION: ""
         }
-    signed = __compute_signature(signed_by.mode, option, time)
+    signed = __compute_signature(signed_by.mode, option, time, signer)
     if query:
         query[__QUERY_SIGNATURE] = signed.signature
     elif headers:
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, NOT_FOUND_XML, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, AsyncOpenApiClient, AsyncConnectionPool, OpenApiResponseError, CircuitBreaker,
+                         CircuitOpenError)
+from openapi.sdk.batch import run_batch
+
+
+class BatchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        def handle(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/missing":
+                return httpx.Response(404, text=NOT_FOUND_XML)
+            if request.url.path == "/down":
+                return httpx.Response(503, text=NOT_FOUND_XML)
+            return httpx.Response(200, json={"id": request.url.params["id"]})
+
+        self._gateway = MockGateway(handle)
+        self._pool = AsyncConnectionPool(transport=self._gateway.async_transport())
+        self._client = AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=self._pool)
+        self.addAsyncCleanup(self._pool.aclose)
+        self.addAsyncCleanup(self._client.aclose)
+
+    def _items(self, count: int):
+        for i in range(count):
+            yield ("GET", "/missing" if i == 3 else "/items", RequestOption.new_builder().add_query(id=i).build())
+
+    async def test_ordered(self):
+        results = [r async for r in self._client.batch(self._items(20), concurrency=4, ordered=True)]
+        self.assertEqual([r.index for r in results], list(range(20)))
+        self.assertIsInstance(results[3].error, OpenApiResponseError)
+        self.assertEqual(results[3].error.error.code, "SERVICE_NOT_FOUND")
+        self.assertEqual((await results[5].result.get_json_object())["id"], "5")
+        # 每个请求都单独签名
+        self.assertTrue(all("Authorization" in req.headers for req in self._gateway.requests))
+
+    async def test_open_circuit(self):
+        breaker = CircuitBreaker(consecutive_failures=2)
+        items = [("GET", "/down" if i < 3 else "/items", RequestOption.new_builder().add_query(id=i).build())
+                 for i in range(6)]
+        async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=self._pool,
+                                      circuit_breaker=breaker) as client:
+            results = [r async for r in client.batch(items, concurrency=1, ordered=True)]
+        # 熔断的请求作为单个请求的错误返回，其他接口的请求继续执行
+        self.assertIsInstance(results[2].error, CircuitOpenError)
+        self.assertEqual([r.ok for r in results], [False] * 3 + [True] * 3)
+
+    async def test_concurrency_limit(self):
+        in_flight = 0
+        peak = 0
+
+        async def send(method, api_path, option):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return await self._client.request(method, api_path, option)
+
+        results = [r async for r in run_batch(send, self._items(30), 5, False)]
+        self.assertEqual(sorted(r.index for r in results), list(range(30)))
+        self.assertLessEqual(peak, 5)
+        self.assertEqual(sum(1 for r in results if not r.ok), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import tempfile
+import time
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         ResponseCache, MemoryCache, DiskCache)
+from openapi.sdk.utility import HttpMethod, request_key
+
+
+def etag_handler(request: httpx.Request) -> httpx.Response:
+    if request.headers.get("If-None-Match") == '"v1"':
+        return httpx.Response(304, headers={"ETag": '"v1"'})
+    return httpx.Response(200, json={"path": request.url.path}, headers={"ETag": '"v1"'})
+
+
+class RequestKeyTest(unittest.TestCase):
+    def test_request_key(self):
+        key = request_key(HttpMethod.GET, "http://gw/a?z=1&a=2&Signature=x&Expires=1", {"x-iwop-b": "2"})
+        self.assertEqual(key, request_key(HttpMethod.GET, "http://gw/a?a=2&z=1", {"X-IWOP-B": "2", "Date": "d"}))
+        self.assertNotEqual(key, request_key(HttpMethod.GET, "http://gw/a?a=2&z=1", {"x-iwop-b": "3"}))
+
+
+class CacheTest(unittest.TestCase):
+    def _client(self, gateway, cache):
+        pool = ConnectionPool(transport=gateway.transport())
+        return OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, cache=cache)
+
+    def test_hit_skips_request(self):
+        gateway = MockGateway()
+        option = RequestOption.new_builder().add_query(b=1, a=2).build()
+        with self._client(gateway, ResponseCache(ttl=60)) as client:
+            first = client.get("/a", option).get_json_object()
+            result = client.get("/a", RequestOption.new_builder().add_query(a=2, b=1).build())
+            self.assertTrue(result.from_cache)
+            self.assertEqual(result.attempts, 0)
+            self.assertEqual(result.get_json_object(), first)
+            # 其他方法和带Range的请求不使用缓存
+            client.post("/a", option).get_bytes()
+            client.get("/a", option.with_headers({"Range": "bytes=0-0"})).get_bytes()
+        self.assertEqual(len(gateway.requests), 3)
+
+    def test_revalidate(self):
+        gateway = MockGateway(etag_handler)
+        with self._client(gateway, ResponseCache(ttl=0)) as client:
+            client.get("/a", RequestOption.new_builder().build()).get_bytes()
+            result = client.get("/a", RequestOption.new_builder().build())
+            self.assertTrue(result.from_cache)
+            self.assertEqual(result.status, 200)
+            self.assertEqual(result.get_json_object(), {"path": "/a"})
+        self.assertEqual(gateway.requests[1].headers["If-None-Match"], '"v1"')
+
+    def test_no_store(self):
+        gateway = MockGateway(lambda request: httpx.Response(200, text="x", headers={"Cache-Control": "no-store"}))
+        with self._client(gateway, ResponseCache()) as client:
+            for i in range(2):
+                client.get("/a", RequestOption.new_builder().build()).get_bytes()
+        self.assertEqual(len(gateway.requests), 2)
+
+    def test_memory_lru(self):
+        cache = ResponseCache(ttl=60, max_entries=2)
+        with self._client(MockGateway(), cache) as client:
+            for path in ("/a", "/b", "/a", "/c"):
+                client.get(path, RequestOption.new_builder().build()).get_bytes()
+        self.assertIsInstance(cache.backend, MemoryCache)
+        self.assertEqual(len(cache.backend), 2)
+
+    def test_disk_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            gateway = MockGateway()
+            for i in range(2):
+                # 新的客户端和缓存对象读取磁盘上已有的缓存
+                with self._client(gateway, ResponseCache(backend=DiskCache(directory))) as client:
+                    result = client.get("/a", RequestOption.new_builder().build())
+                    self.assertEqual(result.get_json_object()["path"], "/a")
+            self.assertEqual(len(gateway.requests), 1)
+            self.assertTrue(result.from_cache)
+
+    def test_unknown_length(self):
+        pulled = []
+
+        def chunks(count):
+            for i in range(count):
+                pulled.append(i)
+                yield b"x" * 50
+
+        gateway = MockGateway(lambda request: httpx.Response(200, content=chunks(int(request.url.params["n"]))))
+        with self._client(gateway, ResponseCache(ttl=60, max_body_size=100)) as client:
+            # 超出max_body_size时停止读取，剩余内容仍可以流式读取
+            result = client.get("/a", RequestOption.new_builder().add_query(n=10).build())
+            self.assertLessEqual(len(pulled), 3)
+            self.assertEqual(result.get_bytes(), b"x" * 500)
+            self.assertFalse(client.get("/a", RequestOption.new_builder().add_query(n=10).build()).from_cache)
+            # 未超出时读取全部内容并缓存
+            self.assertEqual(client.get("/a", RequestOption.new_builder().add_query(n=2).build()).get_bytes(),
+                             b"x" * 100)
+            result = client.get("/a", RequestOption.new_builder().add_query(n=2).build())
+            self.assertTrue(result.from_cache)
+            self.assertEqual(result.get_bytes(), b"x" * 100)
+        self.assertEqual(len(gateway.requests), 3)
+
+    def test_download_bypasses_cache(self):
+        gateway = MockGateway(lambda request: httpx.Response(200, content=b"data"))
+        cache = ResponseCache(ttl=60)
+        with tempfile.TemporaryDirectory() as directory:
+            with self._client(gateway, cache) as client:
+                for i in range(2):
+                    client.download_to("/a", RequestOption.new_builder().build(), directory + "/a.bin")
+        self.assertEqual(len(gateway.requests), 2)
+        self.assertEqual(len(cache.backend), 0)
+
+    def test_expired(self):
+        cache = ResponseCache(ttl=60)
+        with self._client(MockGateway(), cache) as client:
+            client.get("/a", RequestOption.new_builder().build()).get_bytes()
+        key, = cache.backend._entries.keys()
+        entry = cache.lookup(key)
+        self.assertFalse(entry.is_fresh(time.time() + 61))
+
+
+class AsyncCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_revalidate(self):
+        gateway = MockGateway(etag_handler)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(ttl=0, backend=DiskCache(directory))
+            async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+                async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, cache=cache) as client:
+                    await (await client.get("/a", RequestOption.new_builder().build())).get_bytes()
+                    result = await client.get("/a", RequestOption.new_builder().build())
+                    self.assertTrue(result.from_cache)
+                    self.assertEqual(await result.get_json_object(), {"path": "/a"})
+        self.assertEqual(len(gateway.requests), 2)
+
+    async def test_unknown_length(self):
+        async def chunks(count):
+            for i in range(count):
+                yield b"x" * 50
+
+        gateway = MockGateway(lambda request: httpx.Response(200, content=chunks(int(request.url.params["n"]))))
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            cache = ResponseCache(ttl=60, max_body_size=100)
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, cache=cache) as client:
+                for n in (10, 10, 2, 2):
+                    result = await client.get("/a", RequestOption.new_builder().add_query(n=n).build())
+                    self.assertEqual(await result.get_bytes(), b"x" * 50 * n)
+                self.assertTrue(result.from_cache)
+        self.assertEqual(len(gateway.requests), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
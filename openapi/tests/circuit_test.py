@@ -0,0 +1,157 @@
+import time
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY, NOT_FOUND_XML, json_handler
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         CircuitBreaker, CircuitState, CircuitOpenError, OpenApiClientError, OpenApiResponseError,
+                         RequestHooks, RetryPolicy)
+from openapi.sdk.utility import HttpMethod
+
+
+def failing_handler(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("refused")
+
+
+class EventHooks(RequestHooks):
+    def __init__(self):
+        self.events = []
+
+    def before_sign(self, info):
+        self.events.append("before_sign")
+
+    def error(self, info):
+        self.events.append("error")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_consecutive_failures(self):
+        breaker = CircuitBreaker(consecutive_failures=3, reset_timeout=0.05)
+        transitions = []
+        breaker.add_listener(lambda key, old, new: transitions.append((key, old, new)))
+        for i in range(3):
+            breaker.allow("k")
+            breaker.record("k", 503)
+        self.assertEqual(breaker.state("k"), CircuitState.OPEN)
+        with self.assertRaises(CircuitOpenError) as ctx:
+            breaker.allow("k")
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertIsInstance(ctx.exception, OpenApiClientError)
+
+        time.sleep(0.06)
+        breaker.allow("k")
+        # 半开状态只允许一个探测请求
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow("k")
+        breaker.record("k", 200)
+        self.assertEqual(breaker.state("k"), CircuitState.CLOSED)
+        self.assertEqual([t[2] for t in transitions], [CircuitState.OPEN, CircuitState.HALF_OPEN, CircuitState.CLOSED])
+
+    def test_failure_ratio(self):
+        breaker = CircuitBreaker(consecutive_failures=100, failure_ratio=0.5, window_size=10, min_requests=10)
+        for i in range(10):
+            breaker.allow("k")
+            breaker.record("k", 500 if i % 2 else 404)
+        self.assertEqual(breaker.states(), {"k": CircuitState.OPEN})
+
+    def test_probe_failure_reopens(self):
+        breaker = CircuitBreaker(consecutive_failures=1, reset_timeout=0)
+        breaker.allow("k")
+        breaker.record("k", error=httpx.ReadTimeout("timeout"))
+        breaker.allow("k")
+        # 取消的请求不计入结果，释放探测名额
+        breaker.record("k", error=KeyboardInterrupt())
+        breaker.allow("k")
+        breaker.record("k", 502)
+        self.assertEqual(breaker._circuits["k"].state, CircuitState.OPEN)
+
+    def test_stale_result_ignored(self):
+        breaker = CircuitBreaker(consecutive_failures=1, reset_timeout=0)
+        old = breaker.allow("k")
+        breaker.allow("k")
+        breaker.record("k", 503)
+        # 关闭状态放行的请求在半开状态才结束，结果不作为探测结果
+        self.assertEqual(breaker.state("k"), CircuitState.HALF_OPEN)
+        breaker.record("k", 200, generation=old)
+        breaker.record("k", error=KeyboardInterrupt(), generation=old)
+        self.assertEqual(breaker._circuits["k"].state, CircuitState.HALF_OPEN)
+        probe = breaker.allow("k")
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow("k")
+        breaker.record("k", 200, generation=probe)
+        self.assertEqual(breaker._circuits["k"].state, CircuitState.CLOSED)
+
+    def test_key(self):
+        breaker = CircuitBreaker(max_circuits=2)
+        self.assertEqual(breaker.key(HttpMethod.GET, "/items/1?x=1"), "GET /items/{id}")
+        self.assertEqual(breaker.key(HttpMethod.GET, "/items/2"), "GET /items/{id}")
+        for key in ("a", "b", "a", "c"):
+            breaker.allow(key)
+        # 最久未使用的b被淘汰，淘汰后记录的结果被忽略
+        self.assertEqual(list(breaker.states()), ["a", "c"])
+        breaker.record("b", 503)
+
+    def test_client_fails_fast(self):
+        gateway = MockGateway(failing_handler)
+        breaker = CircuitBreaker(consecutive_failures=2, reset_timeout=60)
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, circuit_breaker=breaker) as client:
+                for i in range(2):
+                    with self.assertRaises(httpx.ConnectError):
+                        client.get("/a", RequestOption.new_builder().build())
+                with self.assertRaises(CircuitOpenError):
+                    client.get("/a", RequestOption.new_builder().build())
+                # 其他api_path不受影响
+                with self.assertRaises(httpx.ConnectError):
+                    client.get("/b", RequestOption.new_builder().build())
+        self.assertEqual(len(gateway.requests), 3)
+        self.assertEqual(breaker.state("GET /a"), CircuitState.OPEN)
+
+    def test_open_circuit_skips_hooks(self):
+        hooks = EventHooks()
+        breaker = CircuitBreaker(consecutive_failures=1, reset_timeout=60)
+        with ConnectionPool(transport=MockGateway(failing_handler).transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, circuit_breaker=breaker, hooks=[hooks],
+                               retry=RetryPolicy(max_attempts=3, backoff_base=0)) as client:
+                # 第一次失败后熔断，重试和之后的请求不再签名，hooks看不到这些请求
+                for i in range(2):
+                    with self.assertRaises(CircuitOpenError):
+                        client.get("/a", RequestOption.new_builder().build())
+        self.assertEqual(hooks.events, ["before_sign", "error"])
+
+
+class AsyncCircuitBreakerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_half_open_probe(self):
+        def handler(request):
+            if len(gateway.requests) == 1:
+                return httpx.Response(503, text=NOT_FOUND_XML)
+            return json_handler(request)
+
+        gateway = MockGateway(handler)
+        breaker = CircuitBreaker(consecutive_failures=1, reset_timeout=0.05)
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool,
+                                          circuit_breaker=breaker) as client:
+                with self.assertRaises(OpenApiResponseError):
+                    await client.get("/a", RequestOption.new_builder().build())
+                with self.assertRaises(CircuitOpenError):
+                    await client.get("/a", RequestOption.new_builder().build())
+                time.sleep(0.06)
+                result = await client.get("/a", RequestOption.new_builder().build())
+                await result.get_bytes()
+        self.assertEqual(breaker.state("GET /a"), CircuitState.CLOSED)
+
+    async def test_open_circuit_skips_hooks(self):
+        hooks = EventHooks()
+        breaker = CircuitBreaker(consecutive_failures=1, reset_timeout=60)
+        async with AsyncConnectionPool(transport=MockGateway(failing_handler).async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, circuit_breaker=breaker,
+                                          hooks=[hooks], retry=RetryPolicy(max_attempts=3, backoff_base=0)) as client:
+                for i in range(2):
+                    with self.assertRaises(CircuitOpenError):
+                        await client.get("/a", RequestOption.new_builder().build())
+        self.assertEqual(hooks.events, ["before_sign", "error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import httpx
+
+from email.utils import formatdate
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, ConnectionPool, Signer, SignedByHeader, SignedByQuery,
+                         QuerySignatureParams, SigningClock)
+from openapi.sdk.utility import HttpMethod, SignatureOption, generate_signature
+
+NOW = 1704067200.25
+
+
+class FakeTime:
+    def __init__(self, now: float = NOW):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SigningClockTest(unittest.TestCase):
+    def test_deterministic_signature(self):
+        option = SignatureOption("id", "secret", "http://gw/api/items", HttpMethod.GET, None, httpx.Headers())
+        clock = SigningClock(FakeTime())
+        first = generate_signature(SignedByHeader(), option, Signer("id", "secret"), clock)
+        second = generate_signature(SignedByHeader(), option, None, clock)
+        self.assertEqual(first.headers["Date"], "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual(first.headers, second.headers)
+
+        query = generate_signature(SignedByQuery(QuerySignatureParams(60)), option, None, clock)
+        self.assertEqual(query.query["Expires"], str(int(NOW) + 60))
+
+    def test_date_cached_per_second(self):
+        fake = FakeTime()
+        clock = SigningClock(fake)
+        date = clock.http_date()
+        fake.now += 0.5
+        self.assertIs(clock.http_date(), date)
+        fake.now += 0.5
+        self.assertEqual(clock.http_date(), "Mon, 01 Jan 2024 00:00:01 GMT")
+
+    def test_skew(self):
+        fake = FakeTime()
+        clock = SigningClock(fake, skew=-30)
+        self.assertEqual(clock.timestamp(), int(NOW) - 30)
+        # 未启用自动校正时忽略网关时间
+        clock.observe(formatdate(NOW + 600, usegmt=True))
+        self.assertEqual(clock.skew, -30)
+
+        clock = SigningClock(fake, tolerance=5)
+        clock.observe(formatdate(NOW + 3, usegmt=True))
+        clock.observe("not a date")
+        self.assertEqual(clock.skew, 0)
+        clock.observe(formatdate(NOW + 600, usegmt=True))
+        self.assertEqual(clock.skew, 600)
+
+    def test_client_adjusts(self):
+        fake = FakeTime()
+        date = formatdate(NOW + 3600, usegmt=True)
+        gateway = MockGateway(lambda request: httpx.Response(200, json={}, headers={"Date": date}))
+        clock = SigningClock(fake, tolerance=30)
+        with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=ConnectionPool(transport=gateway.transport()),
+                           clock=clock) as client:
+            for _ in range(2):
+                with client.get("/a", RequestOption.new_builder().build()):
+                    pass
+        self.assertEqual(gateway.requests[0].headers["Date"], formatdate(NOW, usegmt=True))
+        self.assertEqual(gateway.requests[1].headers["Date"], date)
+
+
+if __name__ == '__main__':
+    unittest.main()
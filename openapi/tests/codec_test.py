@@ -0,0 +1,87 @@
+import importlib.util
+import unittest
+import httpx
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, List, Optional
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, ConnectionPool, JsonCodec, StdJsonCodec, OrjsonCodec,
+                         MsgspecCodec)
+
+
+@dataclass
+class Item:
+    id: int
+    name: str
+
+
+@dataclass
+class Page:
+    items: List[Item]
+    total: Optional[int] = None
+    tags: List[str] = field(default_factory=list)
+
+
+class RecordingCodec(StdJsonCodec):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, value: Any) -> bytes:
+        self.encoded.append(value)
+        return super().encode(value)
+
+
+class CodecTest(unittest.TestCase):
+    PAGE = b'{"items": [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}], "total": 2, "extra": true}'
+
+    def _check_codec(self, codec: JsonCodec):
+        value = {"name": "中文", "items": [1, 2.5, None, True]}
+        self.assertEqual(codec.decode(codec.encode(value)), value)
+        page = codec.decode(self.PAGE, Page)
+        self.assertEqual(page, Page([Item(1, "a"), Item(2, "b")], 2))
+        # 与标准库一致，nan、inf不能序列化
+        for number in (float("nan"), float("inf"), -float("inf")):
+            with self.assertRaises(ValueError):
+                codec.encode({"items": [1, None, number]})
+        self.assertEqual(codec.decode(codec.encode([2 ** 64, -2 ** 70])), [2 ** 64, -2 ** 70])
+
+    def test_std(self):
+        codec = StdJsonCodec()
+        self._check_codec(codec)
+        value = {"a": "中文", "b": [1, None]}
+        self.assertEqual(codec.encode(value), httpx.Request("POST", BASE_URL, json=value).content)
+
+    @unittest.skipUnless(importlib.util.find_spec("orjson"), "orjson未安装")
+    def test_orjson(self):
+        codec = OrjsonCodec()
+        self._check_codec(codec)
+        # orjson不支持的类型回退到标准库
+        self.assertEqual(codec.decode(codec.encode({1: "a"})), {"1": "a"})
+        self.assertEqual(codec.decode(b"[18446744073709551616]"), [2 ** 64])
+
+    @unittest.skipUnless(importlib.util.find_spec("msgspec"), "msgspec未安装")
+    def test_msgspec(self):
+        self._check_codec(MsgspecCodec())
+
+    def test_client(self):
+        def handle(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=request.content, headers={"Content-Type": "application/json"})
+        codec = RecordingCodec()
+        gateway = MockGateway(handle)
+        with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=ConnectionPool(transport=gateway.transport()),
+                           json_codec=codec) as client:
+            body = {"items": [{"id": 1, "name": "a"}]}
+            option = RequestOption.new_builder().json(body).build()
+            with client.post("/a", option) as result:
+                self.assertEqual(result.get_json_object(Page), Page([Item(1, "a")]))
+            with client.post("/a", option) as result:
+                value = result.get_json_object(parse_int=Decimal)
+                self.assertEqual(value, {"items": [{"id": Decimal(1), "name": "a"}]})
+        self.assertEqual(codec.encoded, [body, body])
+        self.assertEqual(gateway.requests[0].headers["Content-Type"], "application/json; charset=UTF-8")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import importlib.util
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         CompressionOption, OpenApiClientError)
+from openapi.sdk.utility import HttpMethod
+
+BODY = b"[" + b",\n".join(b'{"id": %d, "name": "item"}' % i for i in range(2000)) + b"]"
+COMPRESSED = gzip.compress(BODY)
+CHUNKS = [COMPRESSED[i:i + 512] for i in range(0, len(COMPRESSED), 512)]
+
+
+def gzip_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=iter(CHUNKS), headers={"Content-Encoding": "gzip"})
+
+
+def echo_handler(request: httpx.Request) -> httpx.Response:
+    content = request.content
+    if request.headers.get("Content-Encoding") == "gzip":
+        content = gzip.decompress(content)
+    return httpx.Response(200, content=content)
+
+
+class CompressionOptionTest(unittest.TestCase):
+    def test_accept_encoding(self):
+        self.assertEqual(CompressionOption(accept=("gzip",)).accept_encoding(), "gzip")
+        self.assertIn("gzip", CompressionOption().accept_encoding())
+        self.assertEqual(CompressionOption(accept=()).accept_encoding(), "identity")
+
+    def test_check(self):
+        with self.assertRaises(OpenApiClientError):
+            CompressionOption(request_encoding="lzma").check()
+        if importlib.util.find_spec("zstandard") is None:
+            with self.assertRaises(OpenApiClientError):
+                CompressionOption(accept=("zstd",)).check()
+
+    def test_compress(self):
+        option = CompressionOption(request_encoding="gzip", min_size=100)
+        self.assertIsNone(option.compress(b"short"))
+        self.assertEqual(gzip.decompress(option.compress(BODY)), BODY)
+
+
+class CompressionTest(unittest.TestCase):
+    def _client(self, handler, compression=None) -> OpenApiClient:
+        gateway = MockGateway(handler)
+        pool = ConnectionPool(transport=gateway.transport())
+        client = OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, compression=compression)
+        self.addCleanup(pool.close)
+        self.addCleanup(client.close)
+        return client, gateway
+
+    def test_open_stream_decodes(self):
+        client, gateway = self._client(gzip_handler, CompressionOption(accept=("gzip",)))
+        with client.get("/file", RequestOption.new_builder().build()) as result:
+            stream = result.open_stream(1000)
+            self.assertEqual(stream.read(10), BODY[:10])
+            self.assertEqual(stream.read(), BODY[10:])
+        self.assertEqual(gateway.requests[0].headers["Accept-Encoding"], "gzip")
+        with client.get("/file", RequestOption.new_builder().build()) as result:
+            self.assertEqual(result.open_stream(decode=False).read(), COMPRESSED)
+        with client.get("/file", RequestOption.new_builder().build()) as result:
+            self.assertEqual(len(list(result.iter_json_items("*"))), 2000)
+
+    def test_request_compression(self):
+        client, gateway = self._client(echo_handler, CompressionOption(request_encoding="gzip", min_size=1000))
+        value = {"items": ["x" * 100] * 50}
+        with client.post("/a", RequestOption.new_builder().json(value).build()) as result:
+            self.assertEqual(result.get_json_object(), value)
+        with client.post("/a", RequestOption.new_builder().json({"a": 1}).build()) as result:
+            self.assertEqual(result.get_json_object(), {"a": 1})
+        template = client.template(HttpMethod.POST, "/items/{id}")
+        with template.request(id=1, content=BODY) as result:
+            self.assertEqual(result.get_bytes(), BODY)
+
+        compressed, small, templated = gateway.requests
+        self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+        self.assertEqual(compressed.headers["Content-Type"], "application/json; charset=UTF-8")
+        self.assertIn("Authorization", compressed.headers)
+        self.assertLess(len(compressed.content), 1000)
+        self.assertNotIn("Content-Encoding", small.headers)
+        self.assertEqual(templated.headers["Content-Encoding"], "gzip")
+
+    def test_async_open_stream(self):
+        async def run():
+            async def handle(request: httpx.Request) -> httpx.Response:
+                async def chunks():
+                    for chunk in CHUNKS:
+                        yield chunk
+                return httpx.Response(200, content=chunks(), headers={"Content-Encoding": "gzip"})
+            pool = AsyncConnectionPool(transport=httpx.MockTransport(handle))
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                async with await client.get("/file", RequestOption.new_builder().build()) as result:
+                    stream = await result.open_stream(4096)
+                    self.assertEqual(await stream.read(), BODY)
+            await pool.aclose()
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
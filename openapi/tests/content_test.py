@@ -0,0 +1,89 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, NOT_FOUND_XML, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         FileContent, RetryPolicy, OpenApiClientError)
+
+DATA = os.urandom(300 * 1024)
+
+
+class FileContentTest(unittest.TestCase):
+    def setUp(self):
+        handle, self._path = tempfile.mkstemp()
+        with os.fdopen(handle, "wb") as f:
+            f.write(DATA)
+        self.addCleanup(os.remove, self._path)
+
+    def test_chunks(self):
+        for use_mmap in (False, True):
+            content = FileContent(self._path, chunk_size=64 * 1024, use_mmap=use_mmap)
+            self.assertEqual(len(content), len(DATA))
+            chunks = list(content)
+            self.assertEqual(b"".join(chunks), DATA)
+            self.assertTrue(all(len(c) == 64 * 1024 for c in chunks[:-1]))
+            # 可重复读取
+            self.assertEqual(b"".join(content), DATA)
+
+    def test_file_object_range(self):
+        with open(self._path, "rb") as f:
+            content = FileContent(f, offset=1000, length=5000)
+            self.assertEqual(len(content), 5000)
+            self.assertEqual(b"".join(content), DATA[1000:6000])
+            self.assertFalse(f.closed)
+
+    def test_bytes_io(self):
+        source = io.BytesIO(b"abcdef")
+        content = FileContent(source, offset=1)
+        self.assertEqual(len(content), 5)
+        self.assertEqual(b"".join(content), b"bcdef")
+        # 内存中的文件对象没有fileno，不能使用mmap
+        with self.assertRaises(OpenApiClientError):
+            FileContent(source, use_mmap=True)
+
+    def test_upload_with_retry(self):
+        bodies = []
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            bodies.append(request.read())
+            if len(bodies) == 1:
+                return httpx.Response(503, text=NOT_FOUND_XML)
+            return httpx.Response(200, json={})
+
+        gateway = MockGateway(handle)
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool,
+                               retry=RetryPolicy(backoff_base=0)) as client:
+                option = RequestOption.new_builder() \
+                    .content_type("application/octet-stream") \
+                    .content(FileContent(self._path, use_mmap=True)) \
+                    .build()
+                with client.put("/models", option) as result:
+                    self.assertEqual(result.attempts, 2)
+
+        self.assertEqual(bodies, [DATA, DATA])
+        request = gateway.requests[-1]
+        self.assertEqual(request.headers["Content-Length"], str(len(DATA)))
+        self.assertNotIn("Transfer-Encoding", request.headers)
+
+    def test_async_upload(self):
+        async def upload():
+            gateway = MockGateway()
+            async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+                async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                    option = RequestOption.new_builder().content(FileContent(self._path)).build()
+                    async with await client.post("/models", option):
+                        pass
+            return gateway.requests[0]
+
+        request = asyncio.run(upload())
+        self.assertEqual(request.content, DATA)
+        self.assertEqual(request.headers["Content-Length"], str(len(DATA)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import os
+import tempfile
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         DownloadOption, OpenApiClientError, OpenApiResponseError)
+from openapi.sdk import download
+
+DATA = bytes(range(256)) * 4096
+
+
+class RangeServer:
+    '''
+    支持Range请求的模拟下载服务，可以在指定位置中断连接
+    '''
+    def __init__(self, data: bytes, fail_at: int = -1, is_async: bool = False, etag: str = '"v1"'):
+        self.data = data
+        self.fail_at = fail_at
+        self.is_async = is_async
+        self.etag = etag
+        self.ranges = []
+        self.if_ranges = []
+
+    def _chunks(self, start: int, end: int):
+        if start <= self.fail_at <= end:
+            fail_at, self.fail_at = self.fail_at, -1
+            yield self.data[start:fail_at]
+            raise httpx.ReadError("connection reset")
+        yield self.data[start:end + 1]
+
+    def _body(self, start: int, end: int):
+        if not self.is_async:
+            return self._chunks(start, end)
+
+        async def chunks():
+            for chunk in self._chunks(start, end):
+                yield chunk
+        return chunks()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        value = request.headers.get("Range")
+        self.ranges.append(value)
+        if_range = request.headers.get("If-Range")
+        self.if_ranges.append(if_range)
+        if not value or (if_range is not None and if_range != self.etag):
+            return httpx.Response(200, headers={"Content-Length": str(len(self.data)), "ETag": self.etag},
+                                  content=self._body(0, len(self.data) - 1))
+        start, _, end = value[len("bytes="):].partition("-")
+        start = int(start)
+        end = int(end) if end else len(self.data) - 1
+        if start >= len(self.data):
+            return httpx.Response(416, headers={"Content-Range": "bytes */%d" % len(self.data)},
+                                  text="<Error><Code>RANGE</Code><Message>range</Message></Error>")
+        headers = {
+            "Content-Range": "bytes %d-%d/%d" % (start, end, len(self.data)),
+            "Content-Length": str(end - start + 1),
+            "ETag": self.etag
+        }
+        return httpx.Response(206, headers=headers, content=self._body(start, end))
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self._path = os.path.join(self._dir.name, "export.bin")
+
+    def _client(self, server: RangeServer) -> OpenApiClient:
+        pool = ConnectionPool(transport=MockGateway(server).transport())
+        client = OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool)
+        self.addCleanup(pool.close)
+        self.addCleanup(client.close)
+        return client
+
+    def _read(self) -> bytes:
+        with open(self._path, "rb") as f:
+            return f.read()
+
+    def test_resume_after_interruption(self):
+        server = RangeServer(DATA, fail_at=300000)
+        result = self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path,
+                                                  DownloadOption(chunk_size=65536))
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(result.size, len(DATA))
+        self.assertEqual(result.resumes, 1)
+        # 中断前不足一个chunk的数据未写入文件，从已写入的位置续传
+        self.assertEqual(server.ranges, [None, "bytes=%d-" % (300000 // 65536 * 65536)])
+
+    def test_resume_existing_file(self):
+        with open(self._path, "wb") as f:
+            f.write(DATA[:1000])
+        with open(self._path + ".validator", "w") as f:
+            f.write('"v1"')
+        server = RangeServer(DATA)
+        self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path)
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(server.ranges, ["bytes=1000-"])
+        self.assertEqual(server.if_ranges, ['"v1"'])
+
+        # If-Range匹配并且服务端返回416时，已存在的文件已经完整
+        with open(self._path + ".validator", "w") as f:
+            f.write('"v1"')
+        result = self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path)
+        self.assertEqual(result.size, len(DATA))
+
+    def test_existing_file_without_validator(self):
+        # 已经完成的文件或无法确认内容的文件不续传，重新下载
+        for existing in (DATA[:1000], DATA):
+            with open(self._path, "wb") as f:
+                f.write(existing)
+            data = DATA[::-1] + DATA[:500]
+            server = RangeServer(data, etag='"v2"')
+            result = self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path)
+            self.assertEqual(self._read(), data)
+            self.assertEqual((result.size, result.resumes), (len(data), 0))
+            self.assertEqual(server.ranges, [None])
+
+    def test_resume_changed_content(self):
+        server = RangeServer(DATA, fail_at=300000)
+        with self.assertRaises(httpx.ReadError):
+            self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path,
+                                             DownloadOption(chunk_size=65536, max_resumes=0))
+        self.assertTrue(os.path.exists(self._path + ".validator"))
+
+        # 服务端的内容已经变化，If-Range不匹配时返回完整内容，重新下载
+        data = DATA[::-1]
+        server = RangeServer(data, etag='"v2"')
+        result = self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path)
+        self.assertEqual(self._read(), data)
+        self.assertEqual(result.size, len(data))
+        self.assertEqual(server.if_ranges, ['"v1"'])
+        self.assertEqual(server.ranges, ["bytes=%d-" % (300000 // 65536 * 65536)])
+        self.assertFalse(os.path.exists(self._path + ".validator"))
+
+    def test_parallel(self):
+        data = DATA * 20
+        server = RangeServer(data, fail_at=len(data) // 2 + 10)
+        result = self._client(server).download_to("/export", RequestOption.new_builder().build(), self._path,
+                                                  DownloadOption(parallel=3))
+        self.assertEqual(self._read(), data)
+        self.assertEqual(result.resumes, 1)
+        self.assertEqual(server.ranges[0], "bytes=0-0")
+        # 探测请求 + 2个分段(每段不小于MIN_PART_SIZE) + 1次续传
+        self.assertEqual(len(server.ranges), 4)
+        self.assertEqual(server.if_ranges, [None] + ['"v1"'] * 3)
+
+    def test_parallel_part_failure(self):
+        data = DATA * 20
+        server = RangeServer(data)
+        failed = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            value = request.headers.get("Range")
+            if not failed and value and value != "bytes=0-0" and not value.startswith("bytes=0-"):
+                failed.append(value)
+                return httpx.Response(500, text="<Error><Code>ERROR</Code><Message>error</Message></Error>")
+            return server(request)
+
+        client = self._client(handler)
+        with self.assertRaises(OpenApiResponseError):
+            client.download_to("/export", RequestOption.new_builder().build(), self._path, DownloadOption(parallel=2))
+        # 分段失败时不留下有空洞的文件
+        self.assertFalse(os.path.exists(self._path))
+        self.assertFalse(os.path.exists(self._path + ".part"))
+        result = client.download_to("/export", RequestOption.new_builder().build(), self._path,
+                                    DownloadOption(parallel=2))
+        self.assertEqual(result.size, len(data))
+        self.assertEqual(self._read(), data)
+
+    def test_split_ranges(self):
+        total = download.MIN_PART_SIZE * 3 + 5
+        ranges = download.split_ranges(total, 4)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], total - 1)
+        self.assertTrue(all(a[1] + 1 == b[0] for a, b in zip(ranges, ranges[1:])))
+
+    def test_length_mismatch(self):
+        def short(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, headers={"Content-Length": "100"}, content=iter([b"x" * 50]))
+        with self.assertRaises((OpenApiClientError, httpx.TransportError)):
+            self._client(short).download_to("/export", RequestOption.new_builder().build(), self._path,
+                                            DownloadOption(max_resumes=0))
+
+
+class AsyncDownloadTest(unittest.IsolatedAsyncioTestCase):
+    async def test_parallel(self):
+        data = DATA * 20
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "export.bin")
+            server = RangeServer(data, fail_at=100, is_async=True)
+            async with AsyncConnectionPool(transport=MockGateway(server).async_transport()) as pool:
+                async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                    result = await client.download_to("/export", RequestOption.new_builder().build(), path,
+                                                      DownloadOption(parallel=2))
+            self.assertEqual(result.size, len(data))
+            self.assertEqual(result.resumes, 1)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, NOT_FOUND_XML, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         OpenApiResponseError, ApiGatewayErrorData)
+from openapi.sdk.error_decoder import MAX_ERROR_BODY, decode_error
+
+
+class DecodeErrorTest(unittest.TestCase):
+    def test_xml(self):
+        error = ApiGatewayErrorData.from_content(NOT_FOUND_XML.encode())
+        self.assertEqual(error.code, "SERVICE_NOT_FOUND")
+        self.assertEqual(error.message, "service not found")
+        self.assertEqual(error.client_ip, "127.0.0.1")
+        self.assertIsNone(error.string_to_sign)
+        self.assertIsNone(error.get_property("Error"))
+
+    def test_xml_entities_and_cdata(self):
+        fields = decode_error("<Error><Code>A</Code><StringToSign>a=1&amp;b=&lt;2&gt;</StringToSign><Empty/></Error>")
+        self.assertEqual(fields, {"Code": "A", "StringToSign": "a=1&b=<2>", "Empty": None})
+        fields = decode_error("<Error><Message><![CDATA[a <b>]]></Message></Error>")
+        self.assertEqual(fields, {"Message": "a <b>"})
+
+    def test_json(self):
+        error = ApiGatewayErrorData.from_content(b'{"error": {"code": "QUOTA", "message": "too many", "extra": 1}}')
+        self.assertEqual(error.code, "QUOTA")
+        self.assertEqual(error.message, "too many")
+        self.assertEqual(error.get_property("extra"), "1")
+
+    def test_other_content(self):
+        self.assertEqual(decode_error(b""), {})
+        self.assertEqual(decode_error(b"Bad Gateway\n"), {"Message": "Bad Gateway"})
+        self.assertEqual(decode_error(b"<Error><Code>A</Code><Message>trunc"), {"Code": "A"})
+        # 未知的charset按utf-8解析
+        self.assertEqual(decode_error(b"<Error><Code>A</Code></Error>", "bogus"), {"Code": "A"})
+
+
+class ErrorResponseTest(unittest.TestCase):
+    def test_empty_body(self):
+        gateway = MockGateway(lambda request: httpx.Response(502))
+        with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY,
+                           pool=ConnectionPool(transport=gateway.transport())) as client:
+            with self.assertRaises(OpenApiResponseError) as ctx:
+                client.get("/a", RequestOption.new_builder().build())
+        self.assertEqual(ctx.exception.status, 502)
+        self.assertIsNone(ctx.exception.error.code)
+        self.assertIn("502", str(ctx.exception))
+
+    def test_unknown_charset(self):
+        gateway = MockGateway(lambda request: httpx.Response(
+            404, content=NOT_FOUND_XML.encode(), headers={"Content-Type": "application/xml; charset=bogus"}))
+        with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY,
+                           pool=ConnectionPool(transport=gateway.transport())) as client:
+            with self.assertRaises(OpenApiResponseError) as ctx:
+                client.get("/a", RequestOption.new_builder().build())
+        self.assertEqual(str(ctx.exception), "service not found")
+
+    def test_large_body_is_capped(self):
+        body = NOT_FOUND_XML.encode() + b" " * (MAX_ERROR_BODY * 4)
+        chunks = [body[i:i + 4096] for i in range(0, len(body), 4096)]
+        sent = []
+
+        def stream():
+            for chunk in chunks:
+                sent.append(chunk)
+                yield chunk
+        gateway = MockGateway(lambda request: httpx.Response(404, content=stream()))
+        with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY,
+                           pool=ConnectionPool(transport=gateway.transport())) as client:
+            with self.assertRaises(OpenApiResponseError) as ctx:
+                client.get("/a", RequestOption.new_builder().build())
+        self.assertEqual(str(ctx.exception), "service not found")
+        self.assertLess(len(sent), len(chunks))
+
+    def test_async(self):
+        async def run():
+            async def stream():
+                yield b'{"Code": "QUOTA", "Message": "slow down"}'
+            gateway = MockGateway(lambda request: httpx.Response(429, content=stream()))
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY,
+                                          pool=AsyncConnectionPool(transport=gateway.async_transport())) as client:
+                with self.assertRaises(OpenApiResponseError) as ctx:
+                    await client.get("/a", RequestOption.new_builder().build())
+            self.assertEqual(ctx.exception.error.code, "QUOTA")
+            self.assertEqual(str(ctx.exception), "slow down")
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, NOT_FOUND_XML, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, ConnectionPool, RequestExecutor, OpenApiResponseError,
+                         CircuitBreaker, CircuitOpenError)
+
+
+class RequestExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self._threads = set()
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            self._threads.add(threading.get_ident())
+            if request.url.path == "/missing":
+                return httpx.Response(404, text=NOT_FOUND_XML)
+            if request.url.path == "/down":
+                return httpx.Response(503, text=NOT_FOUND_XML)
+            time.sleep(0.002)
+            return httpx.Response(200, json={"id": request.url.params["id"]})
+
+        self._pool = ConnectionPool(transport=MockGateway(handle).transport())
+        self._client = OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=self._pool)
+        self.addCleanup(self._pool.close)
+        self.addCleanup(self._client.close)
+
+    def test_map_ordered(self):
+        items = [("GET", "/missing" if i == 2 else "/items", RequestOption.new_builder().add_query(id=i).build())
+                 for i in range(16)]
+        with RequestExecutor(self._client, max_workers=4) as executor:
+            results = list(executor.map(items))
+
+        self.assertEqual([r.index for r in results], list(range(16)))
+        self.assertIsInstance(results[2].error, OpenApiResponseError)
+        self.assertEqual(results[7].result.get_json_object()["id"], "7")
+        self.assertGreater(len(self._threads), 1)
+
+    def test_open_circuit(self):
+        items = [("GET", "/down" if i < 3 else "/items", RequestOption.new_builder().add_query(id=i).build())
+                 for i in range(6)]
+        breaker = CircuitBreaker(consecutive_failures=2)
+        with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=self._pool, circuit_breaker=breaker) as client:
+            with RequestExecutor(client, max_workers=1) as executor:
+                results = list(executor.map(items))
+        self.assertIsInstance(results[2].error, CircuitOpenError)
+        self.assertEqual([r.ok for r in results], [False] * 3 + [True] * 3)
+
+    def test_submit(self):
+        with RequestExecutor(self._client, max_workers=2) as executor:
+            ok = executor.submit("GET", "/items", RequestOption.new_builder().add_query(id=1).build())
+            failed = executor.submit("GET", "/missing", RequestOption.new_builder().build())
+            self.assertEqual(ok.result().get_json_object()["id"], "1")
+            with self.assertRaises(OpenApiResponseError):
+                failed.result()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY, NOT_FOUND_XML
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, OpenApiResponseError, ConnectionPool,
+                         AsyncConnectionPool, RequestHooks, RequestInfo, LatencyAggregator, RetryPolicy)
+
+
+class RecordingHooks(RequestHooks):
+    def __init__(self):
+        self.events = []
+        self.infos = []
+
+    def _record(self, name, info):
+        self.events.append(name)
+        if info not in self.infos:
+            self.infos.append(info)
+
+    def before_sign(self, info):
+        self._record("before_sign", info)
+
+    def after_sign(self, info):
+        self._record("after_sign", info)
+
+    def request_sent(self, info):
+        self._record("request_sent", info)
+
+    def response_headers(self, info):
+        self._record("response_headers", info)
+
+    def body_complete(self, info):
+        self._record("body_complete", info)
+
+    def error(self, info):
+        self._record("error", info)
+
+
+class HooksTest(unittest.TestCase):
+    def test_events(self):
+        hooks = RecordingHooks()
+        aggregator = LatencyAggregator()
+        option = RequestOption.new_builder().json({"name": "x"}).build()
+        with ConnectionPool(transport=MockGateway().transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, hooks=[hooks, aggregator]) as client:
+                with client.post("/a", option) as result:
+                    data = result.get_bytes()
+
+        self.assertEqual(hooks.events,
+                         ["before_sign", "after_sign", "request_sent", "response_headers", "body_complete"])
+        info = hooks.infos[0]
+        self.assertEqual((info.method, info.api_path, info.status), ("POST", "/a", 200))
+        self.assertEqual(info.bytes_sent, len(b'{"name":"x"}'))
+        self.assertEqual(info.bytes_received, len(data))
+        self.assertLessEqual(info.elapsed(RequestInfo.EVENT_RESPONSE_HEADERS),
+                             info.elapsed(RequestInfo.EVENT_BODY_COMPLETE))
+
+        histogram = aggregator.snapshot()[("POST", "/a")]
+        self.assertEqual(histogram.count, 1)
+        self.assertEqual(histogram.errors, 0)
+        self.assertEqual(sum(histogram.counts), 1)
+        self.assertIn(("POST", "/a"), aggregator.ttfb_snapshot())
+
+    def test_streamed_body(self):
+        gateway = MockGateway(lambda request: httpx.Response(200, content=iter([b"abc", b"de"])))
+        hooks = RecordingHooks()
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, hooks=[hooks]) as client:
+                with client.get("/a", RequestOption.new_builder().build()) as result:
+                    self.assertNotIn("body_complete", hooks.events)
+                    self.assertEqual(b"".join(result.open_stream()), b"abcde")
+                    self.assertEqual(hooks.events[-1], "body_complete")
+        self.assertEqual(hooks.infos[0].bytes_received, 5)
+
+    def test_error_per_attempt(self):
+        def handler(request):
+            if len(gateway.requests) == 1:
+                raise httpx.ConnectError("refused")
+            return httpx.Response(404, text=NOT_FOUND_XML)
+
+        gateway = MockGateway(handler)
+        hooks = RecordingHooks()
+        aggregator = LatencyAggregator()
+        retry = RetryPolicy(backoff_base=0, jitter=False)
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, retry=retry,
+                               hooks=[hooks, aggregator]) as client:
+                with self.assertRaises(OpenApiResponseError):
+                    client.get("/a", RequestOption.new_builder().build())
+
+        self.assertEqual([info.attempt for info in hooks.infos], [1, 2])
+        self.assertIsInstance(hooks.infos[0].error, httpx.ConnectError)
+        self.assertIsInstance(hooks.infos[1].error, OpenApiResponseError)
+        self.assertEqual(hooks.infos[1].status, 404)
+        histogram = aggregator.snapshot()[("GET", "/a")]
+        self.assertEqual((histogram.count, histogram.errors), (2, 2))
+
+    def test_percentile(self):
+        aggregator = LatencyAggregator(bounds=[0.1, 1.0])
+        for elapsed in (0.05, 0.05, 0.5, 2.0):
+            info = RequestInfo("GET", "/a", 1)
+            info.timings[RequestInfo.EVENT_BODY_COMPLETE] = info.timings[RequestInfo.EVENT_START] + elapsed
+            aggregator.body_complete(info)
+        histogram = aggregator.snapshot()[("GET", "/a")]
+        self.assertEqual(histogram.counts, (2, 1, 1))
+        self.assertEqual(histogram.percentile(50), 0.1)
+        self.assertEqual(histogram.percentile(99), histogram.max)
+
+
+class AsyncHooksTest(unittest.IsolatedAsyncioTestCase):
+    async def test_events(self):
+        hooks = RecordingHooks()
+        async with AsyncConnectionPool(transport=MockGateway().async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, hooks=[hooks]) as client:
+                result = await client.get("/a", RequestOption.new_builder().build())
+                data = await result.get_bytes()
+
+        self.assertEqual(hooks.events,
+                         ["before_sign", "after_sign", "request_sent", "response_headers", "body_complete"])
+        self.assertEqual(hooks.infos[0].bytes_received, len(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
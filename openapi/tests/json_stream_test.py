@@ -0,0 +1,87 @@
+import json
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool
+from openapi.sdk import OpenApiClientError
+from openapi.sdk.json_stream import iter_json_items, aiter_json_items
+
+DOCUMENT = {
+    "updateAt": 12,
+    "skip": {"nested": [1, 2, {"a": "]}"}]},
+    "data": [{"id": i, "name": "名称%d" % i, "value": i * 1.5} for i in range(50)] + [123456, None, True],
+    "after": "x"
+}
+
+
+NUMBERS = b'{"pre": 2.5, "skip": [-0.25E-2, 1e+2], "data": [1.5, 12e3, -0.25E-2, 7E+2, 10, {"v": 3.75}]}'
+
+
+def split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+async def agen(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class JsonStreamTest(unittest.TestCase):
+    def test_chunk_sizes(self):
+        data = json.dumps(DOCUMENT, ensure_ascii=False).encode()
+        for size in (1, 3, 7, 64, len(data)):
+            items = list(iter_json_items(split(data, size), "data.*"))
+            self.assertEqual(items, DOCUMENT["data"], size)
+
+    def test_top_level_array(self):
+        data = b' [ {"a": 1} , 2, "s" , [] ] '
+        self.assertEqual(list(iter_json_items(split(data, 2))), [{"a": 1}, 2, "s", []])
+        self.assertEqual(list(iter_json_items([b"[]"])), [])
+
+    def test_split_numbers(self):
+        expected = json.loads(NUMBERS)
+        for i in range(1, len(NUMBERS)):
+            chunks = [NUMBERS[:i], NUMBERS[i:]]
+            self.assertEqual(list(iter_json_items(chunks, "data.*")), expected["data"], i)
+            self.assertEqual(list(iter_json_items(chunks, "skip.*")), expected["skip"], i)
+
+    def test_errors(self):
+        with self.assertRaises(OpenApiClientError):
+            list(iter_json_items([b'{"data": [1, 2'], "data.*"))
+        with self.assertRaises(OpenApiClientError):
+            list(iter_json_items([b'{"other": []}'], "data.*"))
+        with self.assertRaises(OpenApiClientError):
+            iter_json_items([b'[]'], "data")
+
+
+class AsyncJsonStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_split_numbers(self):
+        expected = json.loads(NUMBERS)
+        for i in range(1, len(NUMBERS)):
+            chunks = [NUMBERS[:i], NUMBERS[i:]]
+            items = [item async for item in aiter_json_items(agen(chunks), "data.*")]
+            self.assertEqual(items, expected["data"], i)
+
+
+class ResultJsonStreamTest(unittest.TestCase):
+    def test_iter_json_items(self):
+        gateway = MockGateway(lambda request: httpx.Response(200, json=DOCUMENT))
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                with client.get("/items", RequestOption.new_builder().build()) as result:
+                    self.assertEqual(list(result.iter_json_items("data.*", chunk_size=16)), DOCUMENT["data"])
+
+
+class AsyncResultJsonStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_iter_json_items(self):
+        gateway = MockGateway(lambda request: httpx.Response(200, json=DOCUMENT))
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                async with await client.get("/items", RequestOption.new_builder().build()) as result:
+                    items = [item async for item in result.iter_json_items("data.*", chunk_size=16)]
+                    self.assertEqual(items, DOCUMENT["data"])
+
+
+if __name__ == "__main__":
+    unittest.main()
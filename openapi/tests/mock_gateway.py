@@ -0,0 +1,45 @@
+import httpx
+
+from typing import Callable, List, Optional
+
+BASE_URL = "http://gateway.mock"
+ACCESS_ID = "mock-access-id"
+SECRET_KEY = "mock-secret-key"
+
+NOT_FOUND_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Error>
+  <Code>SERVICE_NOT_FOUND</Code>
+  <Message>service not found</Message>
+  <ClientIP>127.0.0.1</ClientIP>
+</Error>"""
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def json_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"path": request.url.path, "query": dict(request.url.params)})
+
+
+class MockGateway:
+    '''
+    本地模拟api网关，记录收到的请求并按handler返回结果
+    '''
+    requests: List[httpx.Request]
+    _handler: Handler
+
+    def __init__(self, handler: Optional[Handler] = None):
+        self.requests = []
+        self._handler = handler or json_handler
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self._handler(request)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._handle)
+
+    def async_transport(self) -> httpx.MockTransport:
+        async def handle(request: httpx.Request) -> httpx.Response:
+            await request.aread()
+            return self._handle(request)
+        return httpx.MockTransport(handle)
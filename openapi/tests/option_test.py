@@ -0,0 +1,47 @@
+import unittest
+
+from openapi.sdk import RequestOption, SignedByQuery
+
+
+class RequestOptionTest(unittest.TestCase):
+    def test_content_type(self):
+        option = RequestOption.new_builder().content(b"<a/>").content_type("application/xml").build()
+        self.assertEqual(option.entity.content_type, "application/xml")
+
+    def test_immutable(self):
+        option = RequestOption.new_builder().add_query(a=1).add_header({"X-A": "1"}).build()
+        with self.assertRaises(TypeError):
+            option.query["b"] = "2"
+        with self.assertRaises(AttributeError):
+            option.timeout = 5
+        with self.assertRaises(AttributeError):
+            option.extra = 1
+
+    def test_builder_reuse(self):
+        builder = RequestOption.new_builder().add_query(a=1)
+        first = builder.build()
+        second = builder.add_query(b=2).build()
+        self.assertEqual(dict(first.query), {"a": "1"})
+        self.assertEqual(dict(second.query), {"a": "1", "b": "2"})
+
+    def test_with_query(self):
+        option = RequestOption.new_builder().signed_by(SignedByQuery()).add_header(a="1").json({"x": 1}).build()
+        derived = option.with_query({"page": 2}, size=10)
+        self.assertEqual(dict(derived.query), {"page": "2", "size": "10"})
+        self.assertEqual(option.query, {})
+        self.assertIs(derived.headers, option.headers)
+        self.assertIs(derived.entity, option.entity)
+        self.assertIs(derived.signed_by, option.signed_by)
+        self.assertIs(option.with_query(), option)
+        self.assertEqual(derived, option.with_query(page=2, size=10))
+
+    def test_shared_empty(self):
+        first = RequestOption.new_builder().build()
+        second = RequestOption()
+        self.assertIs(first.query, second.headers)
+        self.assertIs(first.entity, second.entity)
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import importlib.util
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY, NOT_FOUND_XML
+from openapi.sdk import (RequestOption, OpenApiClient, OpenApiClientError, OpenApiResponseError, ConnectionPool,
+                         OpenTelemetryHooks)
+from openapi.sdk.otel import template_path
+
+HAS_OTEL = importlib.util.find_spec("opentelemetry.sdk") is not None
+
+
+class TemplatePathTest(unittest.TestCase):
+    def test_template_path(self):
+        self.assertEqual(template_path("/project/1024/wbs"), "/project/{id}/wbs")
+        self.assertEqual(template_path("/doc/6f1c2a3b-1d2e-4f5a-8b9c-0d1e2f3a4b5c?x=1"), "/doc/{id}")
+        self.assertEqual(template_path("/v2/users"), "/v2/users")
+
+
+@unittest.skipIf(HAS_OTEL, "opentelemetry已安装")
+class MissingOpenTelemetryTest(unittest.TestCase):
+    def test_requires_opentelemetry(self):
+        with self.assertRaises(OpenApiClientError):
+            OpenTelemetryHooks()
+
+
+@unittest.skipUnless(HAS_OTEL, "需要安装opentelemetry-sdk")
+class OpenTelemetryHooksTest(unittest.TestCase):
+    def setUp(self):
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+        self.exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.reader = InMemoryMetricReader()
+        self.hooks = OpenTelemetryHooks(tracer_provider, MeterProvider(metric_readers=[self.reader]))
+
+    def _metrics(self):
+        data = self.reader.get_metrics_data()
+        return {metric.name: metric for rm in data.resource_metrics for sm in rm.scope_metrics
+                for metric in sm.metrics}
+
+    def test_span(self):
+        gateway = MockGateway()
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, hooks=[self.hooks]) as client:
+                with client.get("/project/12/wbs", RequestOption.new_builder().build()) as result:
+                    result.get_bytes()
+
+        span, = self.exporter.get_finished_spans()
+        self.assertEqual(span.name, "GET /project/{id}/wbs")
+        self.assertEqual(span.attributes["http.response.status_code"], 200)
+        self.assertGreater(span.attributes["http.response.body.size"], 0)
+        self.assertIn("traceparent", gateway.requests[0].headers)
+
+        metrics = self._metrics()
+        self.assertEqual(metrics["openapi.client.request.duration"].data.data_points[0].count, 1)
+        self.assertEqual(metrics["openapi.client.active_requests"].data.data_points[0].value, 0)
+
+    def test_gateway_error(self):
+        gateway = MockGateway(lambda request: httpx.Response(404, text=NOT_FOUND_XML))
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, hooks=[self.hooks]) as client:
+                with self.assertRaises(OpenApiResponseError):
+                    client.get("/a", RequestOption.new_builder().build())
+
+        span, = self.exporter.get_finished_spans()
+        self.assertEqual(span.attributes["openapi.error.code"], "SERVICE_NOT_FOUND")
+        self.assertEqual(span.attributes["error.type"], "OpenApiResponseError")
+        self.assertFalse(span.status.is_ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         PageNumberStrategy, OffsetStrategy, CursorStrategy)
+
+TOTAL = 25
+
+
+def page_handler(request: httpx.Request) -> httpx.Response:
+    params = request.url.params
+    if "cursor" in params or request.url.path == "/cursor":
+        start = int(params.get("cursor", "0"))
+        size = int(params["size"])
+        items = list(range(start, min(start + size, TOTAL)))
+        next_cursor = str(start + size) if start + size < TOTAL else None
+        return httpx.Response(200, json={"data": items, "next": next_cursor})
+    if "page" in params:
+        size = int(params["size"])
+        start = (int(params["page"]) - 1) * size
+    else:
+        size = int(params["limit"])
+        start = int(params["start"])
+    return httpx.Response(200, json={"result": {"items": list(range(start, min(start + size, TOTAL))),
+                                                "total": TOTAL}, "tenant": params.get("tenant")})
+
+
+class PaginateTest(unittest.TestCase):
+    def _client(self, gateway):
+        return OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=ConnectionPool(transport=gateway.transport()))
+
+    def test_page_number(self):
+        gateway = MockGateway(page_handler)
+        option = RequestOption.new_builder().add_query(tenant="t1").build()
+        with self._client(gateway) as client:
+            items = list(client.paginate("/list", option, PageNumberStrategy(size=10, items="result.items")))
+        self.assertEqual(items, list(range(TOTAL)))
+        self.assertEqual(len(gateway.requests), 3)
+        self.assertEqual(gateway.requests[0].url.params["tenant"], "t1")
+
+    def test_offset_total(self):
+        gateway = MockGateway(page_handler)
+        strategy = OffsetStrategy(limit=5, items="result.items", total="result.total")
+        with self._client(gateway) as client:
+            items = list(client.paginate("/list", RequestOption.new_builder().build(), strategy))
+        self.assertEqual(items, list(range(TOTAL)))
+        # 根据total判断结束，不需要再请求一个空页
+        self.assertEqual(len(gateway.requests), 5)
+
+    def test_cursor_lazy(self):
+        gateway = MockGateway(page_handler)
+        strategy = CursorStrategy(next_cursor="next", size=10, items="data")
+        with self._client(gateway) as client:
+            items = client.paginate("/cursor", RequestOption.new_builder().build(), strategy)
+            self.assertEqual(next(items), 0)
+            self.assertEqual(len(gateway.requests), 1)
+            self.assertEqual(list(items), list(range(1, TOTAL)))
+        self.assertEqual(gateway.requests[2].url.params["cursor"], "20")
+
+
+class AsyncPaginateTest(unittest.IsolatedAsyncioTestCase):
+    async def test_prefetch(self):
+        gateway = MockGateway(page_handler)
+        in_flight = []
+        active = 0
+
+        async def handle(request: httpx.Request) -> httpx.Response:
+            nonlocal active
+            gateway.requests.append(request)
+            active += 1
+            in_flight.append(active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return page_handler(request)
+
+        strategy = PageNumberStrategy(size=5, items="result.items")
+        async with AsyncConnectionPool(transport=httpx.MockTransport(handle)) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                items = [item async for item in client.paginate("/list", RequestOption.new_builder().build(),
+                                                                strategy, prefetch=3)]
+        self.assertEqual(items, list(range(TOTAL)))
+        self.assertEqual(max(in_flight), 4)
+        # 预取最多超出最后一页prefetch个请求
+        self.assertLessEqual(len(gateway.requests), 6 + 3)
+
+    async def test_cursor_without_prefetch(self):
+        gateway = MockGateway(page_handler)
+        strategy = CursorStrategy(next_cursor="next", size=10, items="data")
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                pages = [page async for page in client.pages("/cursor", RequestOption.new_builder().build(),
+                                                             strategy, prefetch=2)]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(gateway.requests), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import importlib.util
+import unittest
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, OpenApiClientError,
+                         PoolOption, ConnectionPool, AsyncConnectionPool)
+from openapi.sdk.pool import _StreamLimitTransport
+
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
+
+class PoolTest(unittest.TestCase):
+    def test_pool_option_limits(self):
+        limits = PoolOption(max_connections=200, max_keepalive_connections=80, keepalive_expiry=60).limits()
+        self.assertEqual(limits.max_connections, 200)
+        self.assertEqual(limits.max_keepalive_connections, 80)
+        self.assertEqual(limits.keepalive_expiry, 60)
+
+    def test_shared_pool(self):
+        gateway = MockGateway()
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                client.get("/a", RequestOption.new_builder().build()).get_json_object()
+            # 关闭第一个客户端后，共享连接池仍可被其他客户端使用
+            with OpenApiClient(BASE_URL, "other-id", "other-secret", pool=pool) as client:
+                client.get("/b", RequestOption.new_builder().build()).get_json_object()
+
+        self.assertEqual(len(gateway.requests), 2)
+        self.assertIn("IWOP mock-access-id:", gateway.requests[0].headers["Authorization"])
+        self.assertIn("IWOP other-id:", gateway.requests[1].headers["Authorization"])
+
+    @unittest.skipIf(HAS_H2, "h2已安装")
+    def test_http2_requires_h2(self):
+        with self.assertRaises(OpenApiClientError):
+            OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=PoolOption(http2=True))
+
+    @unittest.skipUnless(HAS_H2, "需要安装h2")
+    def test_http2_stream_limit(self):
+        transport = PoolOption(max_connections=2, http2=True, max_concurrent_streams=50).create_transport()
+        self.assertIsInstance(transport, _StreamLimitTransport)
+        transport.close()
+
+    def test_stream_limit_released_on_close(self):
+        gateway = MockGateway()
+        transport = _StreamLimitTransport(gateway.transport(), 1)
+        with ConnectionPool(transport=transport) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                for i in range(3):
+                    # 名额为1，上一个返回结果关闭后才能发送下一个请求
+                    with client.get("/a", RequestOption.new_builder().build()) as result:
+                        result.get_json_object()
+        self.assertEqual(len(gateway.requests), 3)
+
+
+class AsyncPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def test_shared_pool(self):
+        gateway = MockGateway()
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            for access_id in ("id-1", "id-2"):
+                async with AsyncOpenApiClient(BASE_URL, access_id, SECRET_KEY, pool=pool) as client:
+                    result = await client.get("/a", RequestOption.new_builder().build())
+                    await result.get_json_object()
+
+        self.assertEqual(len(gateway.requests), 2)
+        self.assertIn("IWOP id-2:", gateway.requests[1].headers["Authorization"])
+
+
+if __name__ == "__main__":
+    unittest.main()
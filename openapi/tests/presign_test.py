@@ -0,0 +1,51 @@
+import unittest
+import httpx
+
+from urllib.parse import parse_qs, urlsplit
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, ConnectionPool, SignedByQuery, QuerySignatureParams,
+                         SigningClock)
+from openapi.sdk.utility import HttpMethod
+
+NOW = 1704067200.0
+
+
+class PresignTest(unittest.TestCase):
+    def _client(self, gateway: MockGateway) -> OpenApiClient:
+        pool = ConnectionPool(transport=gateway.transport())
+        client = OpenApiClient(BASE_URL + "/base/", ACCESS_ID, SECRET_KEY, pool=pool, clock=SigningClock(lambda: NOW))
+        self.addCleanup(pool.close)
+        self.addCleanup(client.close)
+        return client
+
+    def test_matches_client_request(self):
+        gateway = MockGateway()
+        client = self._client(gateway)
+        query = {"name": "a b/中文", "x-iwop-tenant": "t1", "n": 3}
+        option = RequestOption.new_builder().signed_by(SignedByQuery(QuerySignatureParams(600))) \
+            .add_query(query).build()
+        for api_path in ("/files/1?v=2", "/files/1?n=2&v=a%20b", "/files/a b.txt", "/files/../a", "/files/./a/..", "//other/x", "/.x/a.b"):
+            with client.get(api_path, option):
+                pass
+            url, = client.presign([("GET", api_path, query)], 600, "application/json; charset=UTF-8")
+            self.assertEqual(url, str(gateway.requests[-1].url))
+
+    def test_bulk(self):
+        client = self._client(MockGateway())
+        items = [(HttpMethod.GET, "/files/%d" % i, {"token": "t%d" % i}) for i in range(100)]
+        urls = client.presign(items)
+        self.assertEqual(len(urls), 100)
+        params = [parse_qs(urlsplit(url).query) for url in urls]
+        self.assertEqual({p["Expires"][0] for p in params}, {str(int(NOW) + 30)})
+        self.assertEqual(len({p["Signature"][0] for p in params}), 100)
+        self.assertTrue(urls[5].startswith(BASE_URL + "/files/5?token=t5&AccessId=" + ACCESS_ID + "&Expires="))
+
+    def test_relative_path(self):
+        client = self._client(MockGateway())
+        url, = client.presign([("get", "files/1", None)], 60)
+        self.assertTrue(url.startswith(str(httpx.URL(BASE_URL + "/base/").join("files/1")) + "?AccessId="))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import time
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY, json_handler
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         OpenApiResponseError, RateLimit, RateLimiter)
+from openapi.sdk.ratelimit import TokenBucket
+
+QUOTA_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Error><Code>QUOTA_EXCEEDED</Code><Message>quota exceeded</Message></Error>"""
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_reserve(self):
+        bucket = TokenBucket(RateLimit(rate=10, burst=2))
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # 令牌用完后按速率预约，等待时间依次增加
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.01)
+
+    def test_throttle_and_recover(self):
+        bucket = TokenBucket(RateLimit(rate=10))
+        bucket.throttle(0.5, 0.1, cooldown=0)
+        bucket.throttle(0.5, 0.3, cooldown=0)
+        self.assertEqual(bucket.rate, 3)
+        for i in range(20):
+            bucket.recover(0.1)
+        self.assertEqual(bucket.rate, 10)
+
+    def test_concurrent_throttles(self):
+        bucket = TokenBucket(RateLimit(rate=10))
+        # 同时返回的多个429只降低一次速率，暂停时间不累加
+        for i in range(10):
+            bucket.throttle(0.5, 0.1, pause=2)
+        self.assertEqual(bucket.rate, 5)
+        self.assertAlmostEqual(bucket.reserve(), 2.2, delta=0.05)
+        self.assertAlmostEqual(bucket.reserve(), 2.4, delta=0.05)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_buckets(self):
+        limiter = RateLimiter(RateLimit(100), {"/report/*": RateLimit(1), "/*": RateLimit(50)})
+        self.assertEqual([b.rate for b in limiter.buckets("id", "/report/daily?x=1")], [100, 1])
+        self.assertEqual([b.rate for b in limiter.buckets("id", "/items")], [100, 50])
+        # 不同的accessId分别计算
+        self.assertIsNot(limiter.buckets("id", "/items")[0], limiter.buckets("other", "/items")[0])
+
+    def test_client_rate(self):
+        limiter = RateLimiter(RateLimit(rate=50, burst=1))
+        with ConnectionPool(transport=MockGateway().transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, rate_limiter=limiter) as client:
+                start = time.monotonic()
+                for i in range(6):
+                    client.get("/a", RequestOption.new_builder().build()).get_bytes()
+                self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_throttle_on_quota_code(self):
+        def handler(request):
+            if len(gateway.requests) == 1:
+                return httpx.Response(403, text=QUOTA_XML)
+            return json_handler(request)
+
+        gateway = MockGateway(handler)
+        limiter = RateLimiter(RateLimit(rate=100), throttle_codes=["QUOTA_EXCEEDED"])
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, rate_limiter=limiter) as client:
+                with self.assertRaises(OpenApiResponseError):
+                    client.get("/a", RequestOption.new_builder().build())
+                self.assertEqual(limiter.buckets(ACCESS_ID, "/a")[0].rate, 50)
+                client.get("/a", RequestOption.new_builder().build()).get_bytes()
+                self.assertEqual(limiter.buckets(ACCESS_ID, "/a")[0].rate, 55)
+
+
+class AsyncRateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_retry_after(self):
+        def handler(request):
+            if len(gateway.requests) == 1:
+                return httpx.Response(429, text=QUOTA_XML, headers={"Retry-After": "0.1"})
+            return json_handler(request)
+
+        gateway = MockGateway(handler)
+        limiter = RateLimiter(RateLimit(rate=100))
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, rate_limiter=limiter) as client:
+                with self.assertRaises(OpenApiResponseError):
+                    await client.get("/a", RequestOption.new_builder().build())
+                start = time.monotonic()
+                await (await client.get("/a", RequestOption.new_builder().build())).get_bytes()
+                # 429之后按Retry-After暂停发送
+                self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
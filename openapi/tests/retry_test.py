@@ -0,0 +1,75 @@
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, NOT_FOUND_XML, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         RetryPolicy, OpenApiResponseError)
+
+
+def flaky_handler(failures: int, status: int = 503):
+    count = 0
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        nonlocal count
+        count += 1
+        if count <= failures:
+            return httpx.Response(status, text=NOT_FOUND_XML, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"ok": True})
+    return handle
+
+
+class RetryTest(unittest.TestCase):
+    def _client(self, gateway: MockGateway, retry: RetryPolicy) -> OpenApiClient:
+        pool = ConnectionPool(transport=gateway.transport())
+        client = OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool, retry=retry)
+        self.addCleanup(pool.close)
+        self.addCleanup(client.close)
+        return client
+
+    def test_retry_and_resign(self):
+        gateway = MockGateway(flaky_handler(2))
+        client = self._client(gateway, RetryPolicy(max_attempts=3, backoff_base=0))
+        option = RequestOption.new_builder().build()
+        with client.get("/items", option) as result:
+            self.assertEqual(result.attempts, 3)
+            self.assertTrue(result.get_json_object()["ok"])
+        self.assertEqual(len(gateway.requests), 3)
+        # 每次尝试都重新签名
+        self.assertTrue(all("Authorization" in req.headers for req in gateway.requests))
+
+    def test_exhausted(self):
+        gateway = MockGateway(lambda request: httpx.Response(404, text=NOT_FOUND_XML))
+        client = self._client(gateway, RetryPolicy(max_attempts=3, backoff_base=0, codes=["SERVICE_NOT_FOUND"]))
+        with self.assertRaises(OpenApiResponseError) as ctx:
+            client.get("/items", RequestOption.new_builder().build())
+        self.assertEqual(ctx.exception.attempts, 3)
+        self.assertEqual(ctx.exception.error.code, "SERVICE_NOT_FOUND")
+
+    def test_streamed_content_not_retried(self):
+        gateway = MockGateway(flaky_handler(1))
+        client = self._client(gateway, RetryPolicy(max_attempts=3, backoff_base=0))
+        option = RequestOption.new_builder().content(iter([b"a", b"b"])).build()
+        with self.assertRaises(OpenApiResponseError) as ctx:
+            client.put("/items", option)
+        self.assertEqual(ctx.exception.status, 503)
+        self.assertEqual(len(gateway.requests), 1)
+
+    def test_retry_after(self):
+        response = httpx.Response(429, headers={"Retry-After": "7"})
+        self.assertEqual(RetryPolicy(backoff_max=30).get_delay(1, response), 7)
+        self.assertLessEqual(RetryPolicy(backoff_base=1, jitter=False).get_delay(3), 4)
+
+
+class AsyncRetryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_retry(self):
+        gateway = MockGateway(flaky_handler(1, 502))
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool,
+                                          retry=RetryPolicy(backoff_base=0)) as client:
+                async with await client.get("/items", RequestOption.new_builder().build()) as result:
+                    self.assertEqual(result.attempts, 2)
+        self.assertEqual(len(gateway.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
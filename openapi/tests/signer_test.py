@@ -0,0 +1,47 @@
+import base64
+import hashlib
+import hmac
+import unittest
+import httpx
+
+from openapi.sdk import Signer, SignedByHeader, SignedByQuery
+from openapi.sdk.utility import HttpMethod, SignatureOption, generate_signature
+
+
+class SignerTest(unittest.TestCase):
+    def test_sign(self):
+        signer = Signer("id", "secret")
+        expected = base64.b64encode(hmac.digest(b"secret", "GET\n中文".encode(), hashlib.sha1)).decode()
+        # 复用同一密钥状态多次签名结果一致
+        self.assertEqual(signer.sign("GET\n中文"), expected)
+        self.assertEqual(signer.sign("GET\n中文"), expected)
+
+    def test_generate_with_signer(self):
+        headers = httpx.Headers({"x-IWOP-b": "2", "X-iwop-a": "1"})
+        option = SignatureOption("id", "secret", "http://gw/api/items?z=1&a=2&x-iwop-c=3",
+                                 HttpMethod.GET, None, headers)
+        info = Signer("id", "secret").generate(SignedByHeader(), option)
+        self.assertEqual(info.signed.signable.split("\n")[2:],
+                         ["x-iwop-a:1", "x-iwop-b:2", "http://gw/api/items?a=2&z=1"])
+        self.assertEqual(info.headers["Authorization"], "IWOP id:" + info.signed.signature)
+
+        query_info = generate_signature(SignedByQuery(), option, Signer("id", "secret"))
+        self.assertEqual(query_info.signed.signable.split("\n")[2:],
+                         ["x-iwop-c:3", "http://gw/api/items?a=2&z=1"])
+        self.assertEqual(query_info.query["AccessId"], "id")
+
+    def test_header_name_case(self):
+        # http2会把头名称转为小写，签名结果不应受头名称大小写影响
+        url = "http://gw/api/items?a=1"
+        signer = Signer("id", "secret")
+        signables = []
+        for headers in ({"X-IWOP-Integration-Id": "1", "Content-Type": "application/json"},
+                        {"x-iwop-integration-id": "1", "content-type": "application/json"}):
+            h = httpx.Headers(headers)
+            option = SignatureOption("id", "secret", url, HttpMethod.GET, h.get("Content-Type"), h)
+            signables.append(signer.generate(SignedByHeader(), option).signed.signable.split("\n", 3)[3])
+        self.assertEqual(signables[0], signables[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY, NOT_FOUND_XML
+from openapi.sdk import RequestOption, AsyncOpenApiClient, AsyncConnectionPool, OpenApiResponseError
+from openapi.sdk.cache import DEFAULT_MAX_BODY_SIZE
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def _gather(self, handler, options, single_flight=True):
+        gateway = MockGateway()
+        release = asyncio.Event()
+
+        async def handle(request: httpx.Request) -> httpx.Response:
+            gateway.requests.append(request)
+            # 等所有调用方都发出请求后再返回
+            await release.wait()
+            return handler(request)
+
+        async with AsyncConnectionPool(transport=httpx.MockTransport(handle)) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool,
+                                          single_flight=single_flight) as client:
+                async def fetch(option):
+                    result = await client.get("/a", option)
+                    return await result.get_json_object()
+
+                tasks = [asyncio.ensure_future(fetch(option)) for option in options]
+                await asyncio.sleep(0.01)
+                release.set()
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+        return gateway, results
+
+    async def test_shared(self):
+        options = [RequestOption.new_builder().add_query(a=1, b=2).build() for i in range(50)]
+        options.append(RequestOption.new_builder().add_query(b=2, a=1).add_header({"X-IWOP-Tenant": "t1"}).build())
+        gateway, results = await self._gather(lambda request: httpx.Response(200, json={"n": 1}), options)
+        # 参与签名的x-iwop-头不同的请求单独发送
+        self.assertEqual(len(gateway.requests), 2)
+        self.assertEqual(results, [{"n": 1}] * 51)
+
+    async def test_shared_error(self):
+        options = [RequestOption.new_builder().build() for i in range(3)]
+        gateway, results = await self._gather(lambda request: httpx.Response(404, text=NOT_FOUND_XML), options)
+        self.assertEqual(len(gateway.requests), 1)
+        for result in results:
+            self.assertIsInstance(result, OpenApiResponseError)
+
+    async def test_large_body_not_shared(self):
+        def handler(request):
+            # 超过DEFAULT_MAX_BODY_SIZE的内容不在调用方之间共享
+            return httpx.Response(200, content=b"[" + b"0," * DEFAULT_MAX_BODY_SIZE + b"1]")
+
+        options = [RequestOption.new_builder().build() for i in range(3)]
+        gateway, results = await self._gather(handler, options)
+        self.assertEqual(len(gateway.requests), 3)
+        for result in results:
+            self.assertEqual(len(result), DEFAULT_MAX_BODY_SIZE + 1)
+
+    async def test_disabled(self):
+        options = [RequestOption.new_builder().build() for i in range(3)]
+        gateway, results = await self._gather(lambda request: httpx.Response(200, json={}), options, False)
+        self.assertEqual(len(gateway.requests), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool
+
+LINES = [b"first line", b"", "第二行".encode(), b"x" * 3000, b"last"]
+BODY = b"\r\n".join(LINES)
+
+
+CHUNKS = [BODY[i:i + 7] for i in range(0, len(BODY), 7)]
+
+
+def chunked_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=iter(CHUNKS))
+
+
+def async_chunked_handler(request: httpx.Request) -> httpx.Response:
+    async def chunks():
+        for chunk in CHUNKS:
+            yield chunk
+    return httpx.Response(200, content=chunks())
+
+
+class StreamTest(unittest.TestCase):
+    def setUp(self):
+        self._pool = ConnectionPool(transport=MockGateway(chunked_handler).transport())
+        self._client = OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=self._pool)
+        self.addCleanup(self._pool.close)
+        self.addCleanup(self._client.close)
+
+    def _open(self, chunk_size=None):
+        result = self._client.get("/file", RequestOption.new_builder().build())
+        self.addCleanup(result.__exit__)
+        return result.open_stream(chunk_size)
+
+    def test_iter_chunks(self):
+        chunks = list(self._open(chunk_size=1024))
+        self.assertEqual(b"".join(chunks), BODY)
+        self.assertTrue(all(len(c) == 1024 for c in chunks[:-1]))
+
+    def test_readinto(self):
+        stream = self._open()
+        buffer = bytearray(100)
+        data = bytearray()
+        while True:
+            count = stream.readinto(memoryview(buffer))
+            if count == 0:
+                break
+            data += buffer[:count]
+        self.assertEqual(bytes(data), BODY)
+
+    def test_read_and_lines(self):
+        stream = self._open()
+        self.assertEqual(stream.read(5), b"first")
+        self.assertEqual(list(stream.iter_lines()), [b" line"] + LINES[1:])
+        stream.close()
+        self.assertTrue(stream.closed)
+
+    def test_buffered_reader(self):
+        stream = self._open()
+        with io.BufferedReader(stream.as_file()) as reader:
+            self.assertEqual(reader.read(), BODY)
+        self.assertTrue(stream.closed)
+
+    def test_file_lines(self):
+        # 文件对象按行迭代，与直接迭代流(逐块返回)不同
+        expected = BODY.splitlines(keepends=True)
+        self.assertEqual(self._open().as_file().readlines(), expected)
+        file = io.BufferedReader(self._open().as_file())
+        self.assertEqual(next(file), expected[0])
+        self.assertEqual(list(file), expected[1:])
+
+
+class AsyncStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_stream(self):
+        async with AsyncConnectionPool(transport=MockGateway(async_chunked_handler).async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                async with await client.get("/file", RequestOption.new_builder().build()) as result:
+                    async with await result.open_stream(chunk_size=64) as stream:
+                        buffer = bytearray(10)
+                        self.assertEqual(await stream.readinto(buffer), 10)
+                        self.assertEqual(bytes(buffer), BODY[:10])
+                        self.assertEqual(await stream.read(2), BODY[10:12])
+                        lines = [line async for line in stream.iter_lines()]
+                        self.assertEqual(lines, LINES[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import httpx
+
+from openapi.tests.mock_gateway import MockGateway, BASE_URL, ACCESS_ID, SECRET_KEY
+from openapi.sdk import (RequestOption, OpenApiClient, AsyncOpenApiClient, ConnectionPool, AsyncConnectionPool,
+                         Signer, SignedByQuery)
+from openapi.sdk import utility
+from openapi.sdk.utility import HttpMethod, SignatureMode, SignatureOption
+
+compute_signature = vars(utility)["__compute_signature"]
+
+
+def expected_authorization(request: httpx.Request) -> str:
+    option = SignatureOption(ACCESS_ID, SECRET_KEY, str(request.url), HttpMethod[request.method],
+                             request.headers.get("Content-Type"), request.headers)
+    signed = compute_signature(SignatureMode.HEADER, option, request.headers["Date"], Signer(ACCESS_ID, SECRET_KEY))
+    return "IWOP " + ACCESS_ID + ":" + signed.signature
+
+
+class TemplateTest(unittest.TestCase):
+    def test_matches_regular_request(self):
+        gateway = MockGateway()
+        option = RequestOption.new_builder().add_query(z=1, a="x y").add_header(
+            {"X-IWOP-B": "2", "x-iwop-a": "1", "X-Trace": "t"}).build()
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                template = client.template(HttpMethod.GET, "/project/{project_id}/wbs/{id}", option)
+                data = template.request(project_id=12, id="a/b", query={"page": 2}).get_json_object()
+                client.get("/project/12/wbs/a%2Fb", RequestOption.new_builder().add_query(z=1, a="x y", page=2)
+                           .add_header({"X-IWOP-B": "2", "x-iwop-a": "1", "X-Trace": "t"}).build()).get_bytes()
+
+        self.assertEqual(gateway.requests[0].url.raw_path, b"/project/12/wbs/a%2Fb?z=1&a=x+y&page=2")
+        templated, regular = gateway.requests
+        self.assertEqual(templated.url, regular.url)
+        skip = ("date", "authorization")
+        self.assertEqual({k: v for k, v in templated.headers.items() if k not in skip},
+                         {k: v for k, v in regular.headers.items() if k not in skip})
+        for request in gateway.requests:
+            self.assertEqual(request.headers["Authorization"], expected_authorization(request))
+
+    def test_override_query(self):
+        gateway = MockGateway()
+        option = RequestOption.new_builder().add_query(a=1, b=2).build()
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                template = client.template(HttpMethod.GET, "/items/{id}", option)
+                template.request(id=5, query={"a": "x", "c": 3}).get_bytes()
+                client.get("/items/5", option.with_query(a="x", c=3)).get_bytes()
+        templated, regular = gateway.requests
+        # 同名的query使用每次请求的值，不会重复出现
+        self.assertEqual(templated.url.raw_path, b"/items/5?a=x&b=2&c=3")
+        self.assertEqual(templated.url, regular.url)
+
+    def test_format_and_body(self):
+        gateway = MockGateway()
+        with ConnectionPool(transport=gateway.transport()) as pool:
+            with OpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                template = client.template(HttpMethod.POST, "/items/{id}")
+                self.assertEqual(template.format({"id": 7}, {"q": 1}), ("/items/7", BASE_URL + "/items/7?q=1"))
+                template.request({"id": 7}, json={"name": "x"}).get_bytes()
+        request = gateway.requests[0]
+        self.assertEqual(request.content, b'{"name":"x"}')
+        self.assertEqual(request.headers["Content-Type"], "application/json; charset=UTF-8")
+        self.assertEqual(request.headers["Authorization"], expected_authorization(request))
+
+
+class AsyncTemplateTest(unittest.IsolatedAsyncioTestCase):
+    async def test_signed_by_query(self):
+        gateway = MockGateway()
+        option = RequestOption.new_builder().signed_by(SignedByQuery()).build()
+        async with AsyncConnectionPool(transport=gateway.async_transport()) as pool:
+            async with AsyncOpenApiClient(BASE_URL, ACCESS_ID, SECRET_KEY, pool=pool) as client:
+                template = client.template(HttpMethod.GET, "/items/{id}", option)
+                for i in range(2):
+                    result = await template.request(id=i)
+                    self.assertEqual((await result.get_json_object())["path"], "/items/%d" % i)
+        self.assertEqual(gateway.requests[1].url.params["AccessId"], ACCESS_ID)
+        self.assertIn("Signature", gateway.requests[1].url.params)
+
+
+if __name__ == "__main__":
+    unittest.main()